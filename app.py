@@ -4,6 +4,7 @@ Streamlit Web Interface for Knowledge Assistant
 
 import streamlit as st
 import sys
+import uuid
 from pathlib import Path
 
 # Add src to path
@@ -12,6 +13,7 @@ sys.path.insert(0, str(current_dir))
 
 from src.config import Config
 from src.knowledge_assistant import KnowledgeAssistant
+from src.scheduler import AdmissionRejected
 
 # Page configuration
 st.set_page_config(
@@ -64,6 +66,9 @@ EXAMPLE_PROMPTS = {
     ]
 }
 
+# Nombre de messages de l'historique affichés par page
+HISTORY_PAGE_SIZE = 10
+
 @st.cache_resource
 def load_assistant():
     try:
@@ -82,6 +87,16 @@ def initialize_session_state():
         st.session_state.total_queries = 0
     if 'current_prompt' not in st.session_state:
         st.session_state.current_prompt = ""
+    if 'history_visible' not in st.session_state:
+        st.session_state.history_visible = HISTORY_PAGE_SIZE
+    if 'user_id' not in st.session_state:
+        # Identifiant de session : file équitable de l'ordonnanceur de génération
+        st.session_state.user_id = uuid.uuid4().hex
+
+@st.cache_data(ttl=30, show_spinner=False)
+def load_status(_assistant):
+    """Statut du système, recalculé au plus toutes les 30 s plutôt qu'à chaque rerun"""
+    return _assistant.get_status()
 
 def display_sidebar(assistant):
     with st.sidebar:
@@ -91,7 +106,7 @@ def display_sidebar(assistant):
         st.markdown("## ")
         
         if assistant and st.session_state.assistant_initialized:
-            status = assistant.get_status()
+            status = load_status(assistant)
             st.success("✅ System Operational")
             vault_stats = status.get('vault_stats', {})
             
@@ -105,6 +120,10 @@ def display_sidebar(assistant):
             #st.metric("📚 Chunks", vs_stats.get('num_documents', 0), "Indexed")
            # st.divider()
             
+            vault_names = list(assistant.config.vaults)
+            if len(vault_names) > 1:
+                st.multiselect("🗂️ Vaults", vault_names, default=vault_names, key="selected_vaults")
+            
             with st.expander("⚙️ Configuration"):
                 config_info = status.get('config', {})
                 st.markdown(f"**LLM:** `{config_info.get('llm_model', 'N/A')}`  \n**Embeddings:** `{config_info.get('embedding_model', 'N/A')}`")
@@ -117,6 +136,7 @@ def display_sidebar(assistant):
                     with st.spinner("Rebuilding..."):
                         try:
                             assistant.rebuild_index()
+                            load_status.clear()
                             st.success("✅ Done!")
                             st.rerun()
                         except Exception as e:
@@ -124,6 +144,8 @@ def display_sidebar(assistant):
             with col2:
                 if st.button(" Clear", use_container_width=True):
                     st.session_state.messages = []
+                    st.session_state.history_visible = HISTORY_PAGE_SIZE
+                    assistant.end_conversation(st.session_state.user_id)
                     st.rerun()
         else:
             st.warning("⚠️ Not Initialized")
@@ -141,41 +163,92 @@ def display_example_prompts():
             for prompt in prompts:
                 if st.button(prompt, key=f"p_{category}_{prompt}", use_container_width=True):
                     st.session_state.current_prompt = prompt
-                    st.rerun()
 
+@st.fragment
+def display_sources(sources, key):
+    """Cartes des sources, rendues seulement quand l'utilisateur les affiche"""
+    if st.toggle(f"📚 Sources ({len(sources)})", key=key):
+        for source in sources:
+            also_in = f'<br>Also in: {", ".join(source["also_in"])}' if source.get("also_in") else ""
+            st.markdown(f'<div class="source-card"><strong>📄 {source["file_name"]}</strong><br>Score: {source.get("score", 0):.4f}{also_in}<br>{source.get("preview", "")[:200]}</div>', unsafe_allow_html=True)
+
+def display_message(message, index):
+    with st.chat_message(message["role"], avatar="🧑‍💻" if message["role"] == "user" else "🤖"):
+        st.markdown(message["content"])
+        if message["role"] == "assistant" and message.get("sources"):
+            display_sources(message["sources"], key=f"sources_{index}")
+
+def display_history():
+    """Affiche la dernière page de l'historique ; les messages plus anciens sont chargés à la demande"""
+    messages = st.session_state.messages
+    hidden = len(messages) - st.session_state.history_visible
+    if hidden > 0 and st.button(f"⬆️ Show {min(hidden, HISTORY_PAGE_SIZE)} earlier messages ({hidden} hidden)"):
+        st.session_state.history_visible += HISTORY_PAGE_SIZE
+    
+    start = max(0, len(messages) - st.session_state.history_visible)
+    for index in range(start, len(messages)):
+        display_message(messages[index], index)
+
+@st.fragment
 def display_chat_interface(assistant):
+    """Conversation : seul ce fragment est ré-exécuté à chaque question (pas la barre latérale)"""
     st.markdown('<h1 class="main-header">💬 Ask Your Knowledge Base</h1>', unsafe_allow_html=True)
     st.markdown('<p class="subtitle">Get answers from your Obsidian notes</p>', unsafe_allow_html=True)
     
     if len(st.session_state.messages) == 0:
         display_example_prompts()
     
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"], avatar="🧑‍💻" if message["role"] == "user" else "🤖"):
-            st.markdown(message["content"])
-            if message["role"] == "assistant" and "sources" in message:
-                with st.expander("📚 Sources"):
-                    for source in message["sources"]:
-                        st.markdown(f'<div class="source-card"><strong>📄 {source["file_name"]}</strong><br>Score: {source.get("score", 0):.4f}</div>', unsafe_allow_html=True)
+    display_history()
+    
+    prompt = st.chat_input("💭 Ask your question...") or st.session_state.current_prompt
+    st.session_state.current_prompt = ""
+    if not prompt:
+        return
     
-    if prompt := st.chat_input("💭 Ask your question..."):
-        st.session_state.messages.append({"role": "user", "content": prompt})
-        with st.chat_message("user", avatar="🧑‍💻"):
-            st.markdown(prompt)
+    # Nouveau tour : rendu sur place, ajouté à l'historique (sans rerun complet)
+    # seulement avec sa réponse, pour ne pas laisser de question sans réponse
+    question = {"role": "user", "content": prompt}
+    display_message(question, len(st.session_state.messages))
+    
+    with st.chat_message("assistant", avatar="🤖"):
+        # Réponse diffusée : si l'onglet est fermé, Streamlit interrompt le script,
+        # le flux est fermé et la génération s'arrête
+        response = {}
+        def tokens():
+            events = assistant.ask_stream(
+                prompt,
+                vaults=st.session_state.get('selected_vaults') or None,
+                user=st.session_state.user_id,
+                session_id=st.session_state.user_id
+            )
+            for event in events:
+                if event['type'] == 'token':
+                    yield event['text']
+                else:
+                    response.update(event['response'])
+                    # Réponse extractive : aucun fragment diffusé, elle arrive d'un bloc
+                    if response.get('answer_mode') == 'extractive':
+                        yield response['answer']
         
-        with st.chat_message("assistant", avatar="🤖"):
-            with st.spinner("🤔 Searching..."):
-                try:
-                    response = assistant.ask(prompt, include_scores=True)
-                    st.markdown(response['answer'])
-                    st.session_state.messages.append({"role": "assistant", "content": response['answer'], "sources": response['sources']})
-                    with st.expander("📚 Sources", expanded=True):
-                        for source in response['sources']:
-                            st.markdown(f'<div class="source-card"><strong>📄 {source["file_name"]}</strong><br>Score: {source.get("score", 0):.4f}<br>{source.get("preview", "")[:200]}</div>', unsafe_allow_html=True)
-                    st.session_state.total_queries += 1
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"❌ {e}")
+        try:
+            st.write_stream(tokens())
+        except AdmissionRejected:
+            st.warning("⏳ The assistant is busy right now. Please retry in a moment.")
+            return
+        except Exception as e:
+            st.error(f"❌ {e}")
+            return
+        
+        routing = response.get('routing', {})
+        if routing.get('reason', 'single_model') != 'single_model':
+            st.caption(f"🧭 {routing['model']} ({routing['reason'].replace('_', ' ')})")
+        prefill = response.get('prefill', {})
+        if 'prefill_ms' in prefill:
+            st.caption(f"⚡ Prefill {prefill['prefill_ms']:.0f} ms ({prefill['prefill_saved_ms']:.0f} ms saved by prompt cache)")
+        st.session_state.messages.append(question)
+        st.session_state.messages.append({"role": "assistant", "content": response['answer'], "sources": response['sources']})
+        display_sources(response['sources'], key=f"sources_{len(st.session_state.messages) - 1}")
+        st.session_state.total_queries += 1
 
 def main():
     initialize_session_state()
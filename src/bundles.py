@@ -0,0 +1,279 @@
+"""
+Bundles d'index
+Manifeste des snapshots et archive portable (compressée, avec sommes de contrôle) d'un index
+
+Usage :
+    python -m src.bundles export index.tar.gz [--vault nom] [--compression gz|xz|bz2]
+    python -m src.bundles import index.tar.gz [--vault nom] [--force]
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import pickle
+import re
+import shutil
+import tarfile
+import time
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, List, Optional, Tuple
+
+
+MANIFEST_FILE = "manifest.json"
+BUNDLE_MANIFEST = "bundle.json"
+BUNDLE_FORMAT = 1
+COMPRESSIONS = ("gz", "xz", "bz2")
+
+# Paramètres qui déterminent le contenu de l'index : un index construit avec
+# d'autres valeurs renverrait des vecteurs incompatibles ou d'autres chunks
+CHECKED_FIELDS = ("embedding_model", "embedding_dim", "chunk_size", "chunk_overlap", "include_pdfs", "dedup_mode")
+
+# Version de snapshot : nom de dossier simple (ni séparateur, ni remontée, ni dossier caché)
+_SAFE_VERSION = re.compile(r"\w[\w.-]*")
+
+_BLOCK_SIZE = 1024 * 1024
+
+
+class IndexMismatchError(ValueError):
+    """Index construit avec d'autres paramètres (modèle d'embeddings, chunking) que la configuration"""
+
+
+def write_manifest(snapshot_dir: Path, manifest: Dict[str, Any]):
+    """Écrit le manifeste d'un snapshot"""
+    with open(Path(snapshot_dir) / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+
+def read_manifest(snapshot_dir: Path) -> Optional[Dict[str, Any]]:
+    """
+    Lit le manifeste d'un snapshot
+
+    Args:
+        snapshot_dir: Dossier du snapshot
+
+    Returns:
+        Manifeste, métadonnées de l'ancien format (metadata.pkl) à défaut, ou None
+    """
+    snapshot_dir = Path(snapshot_dir)
+    manifest_path = snapshot_dir / MANIFEST_FILE
+    if manifest_path.exists():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    metadata_path = snapshot_dir / "metadata.pkl"
+    if metadata_path.exists():
+        with open(metadata_path, 'rb') as f:
+            return pickle.load(f)
+    return None
+
+
+def _normalize(field: str, value: Any) -> Any:
+    # "nomic-embed-text" et "nomic-embed-text:latest" désignent le même modèle Ollama
+    if field == "embedding_model" and isinstance(value, str) and value.endswith(":latest"):
+        return value[:-len(":latest")]
+    return value
+
+
+def manifest_mismatches(manifest: Dict[str, Any], expected: Dict[str, Any]) -> List[str]:
+    """
+    Compare le manifeste d'un index aux paramètres attendus
+
+    Seuls les champs présents des deux côtés sont comparés (un ancien
+    snapshot sans paramètres de chunking n'est vérifié que sur son modèle).
+
+    Args:
+        manifest: Manifeste de l'index
+        expected: Paramètres de la configuration courante
+
+    Returns:
+        Liste des différences (vide si l'index est compatible)
+    """
+    mismatches = []
+    for field in CHECKED_FIELDS:
+        if manifest.get(field) is None or expected.get(field) is None:
+            continue
+        if _normalize(field, manifest[field]) != _normalize(field, expected[field]):
+            mismatches.append(f"{field} : index {manifest[field]!r}, configuration {expected[field]!r}")
+    return mismatches
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_bundle(snapshot_dir: Path, output_path: Path, compression: str = "gz") -> Dict[str, Any]:
+    """
+    Exporte un snapshot dans une archive unique
+
+    L'archive commence par bundle.json : manifeste de l'index, puis taille et
+    SHA-256 de chaque fichier, vérifiés à l'import.
+
+    Args:
+        snapshot_dir: Dossier du snapshot publié
+        output_path: Fichier d'archive à créer
+        compression: "gz", "xz" ou "bz2"
+
+    Returns:
+        Manifeste du bundle
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Compression non supportée : {compression} (attendu : {', '.join(COMPRESSIONS)})")
+
+    snapshot_dir = Path(snapshot_dir)
+    output_path = Path(output_path)
+    files = sorted(p for p in snapshot_dir.rglob("*") if p.is_file())
+    bundle = {
+        'format': BUNDLE_FORMAT,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'index': read_manifest(snapshot_dir) or {},
+        'files': {
+            p.relative_to(snapshot_dir).as_posix(): {'size': p.stat().st_size, 'sha256': _sha256(p)}
+            for p in files
+        }
+    }
+
+    print(f"📦 Export de {len(files)} fichiers vers {output_path}...")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    with tarfile.open(tmp_path, f"w:{compression}") as tar:
+        data = json.dumps(bundle, indent=2, ensure_ascii=False).encode('utf-8')
+        info = tarfile.TarInfo(BUNDLE_MANIFEST)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        tar.addfile(info, io.BytesIO(data))
+        for path in files:
+            tar.add(path, arcname=path.relative_to(snapshot_dir).as_posix(), recursive=False)
+    tmp_path.replace(output_path)
+
+    print(f"✅ Bundle exporté ({output_path.stat().st_size / (1024 * 1024):.1f} Mo)")
+    return bundle
+
+
+def _safe_name(name: str) -> bool:
+    """Chemin relatif sans remontée de dossier"""
+    path = PurePosixPath(name)
+    return bool(name) and not path.is_absolute() and '..' not in path.parts
+
+
+def import_bundle(
+    bundle_path: Path,
+    snapshots_dir: Path,
+    expected: Optional[Dict[str, Any]] = None,
+    force: bool = False
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Importe une archive dans un nouveau dossier de snapshot (non publié)
+
+    L'archive est lue en flux, fichier par fichier et par blocs : ni
+    l'archive ni l'index ne sont chargés en mémoire. Chaque fichier est
+    vérifié (taille et SHA-256) ; au moindre écart le snapshot partiel est
+    supprimé. Les sommes de contrôle garantissent l'intégrité, pas
+    l'authenticité : l'index contient des fichiers pickle, n'importer que
+    des bundles de confiance.
+
+    Args:
+        bundle_path: Fichier d'archive
+        snapshots_dir: Dossier des snapshots du vault
+        expected: Paramètres de la configuration courante (voir manifest_mismatches)
+        force: Importer malgré des paramètres différents
+
+    Returns:
+        Tuple (version du snapshot créé, manifeste de l'index)
+
+    Raises:
+        IndexMismatchError: Index construit avec d'autres paramètres (sans force)
+        ValueError: Archive invalide ou corrompue
+    """
+    snapshots_dir = Path(snapshots_dir)
+    print(f"📦 Import du bundle {bundle_path}...")
+
+    # Mode flux ("r|*") : lecture séquentielle, compression détectée automatiquement
+    with tarfile.open(bundle_path, "r|*") as tar:
+        first = tar.next()
+        if first is None or first.name != BUNDLE_MANIFEST:
+            raise ValueError("Bundle invalide : bundle.json doit être le premier fichier de l'archive")
+        bundle = json.load(tar.extractfile(first))
+        if bundle.get('format') != BUNDLE_FORMAT:
+            raise ValueError(f"Format de bundle non supporté : {bundle.get('format')}")
+
+        manifest = bundle.get('index', {})
+        mismatches = manifest_mismatches(manifest, expected or {})
+        if mismatches:
+            if not force:
+                raise IndexMismatchError("Bundle incompatible avec la configuration : " + " ; ".join(mismatches))
+            print("⚠️ Import forcé malgré : " + " ; ".join(mismatches))
+
+        remaining = dict(bundle.get('files', {}))
+        unsafe = [name for name in remaining if not _safe_name(name)]
+        if unsafe:
+            raise ValueError(f"Bundle invalide : chemins refusés {unsafe}")
+
+        version = manifest.get('version') or datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        if not isinstance(version, str) or not _SAFE_VERSION.fullmatch(version):
+            raise ValueError(f"Bundle invalide : version refusée {version!r}")
+        if (snapshots_dir / version).exists():
+            version = f"{version}-import-{datetime.now().strftime('%H%M%S-%f')}"
+        staging_dir = snapshots_dir / f".tmp-{version}"
+        staging_dir.mkdir(parents=True)
+
+        try:
+            # tar.next() et non `for member in tar`, qui reprendrait depuis bundle.json
+            for member in iter(tar.next, None):
+                entry = remaining.pop(member.name, None)
+                if entry is None or not member.isfile():
+                    raise ValueError(f"Bundle invalide : fichier inattendu {member.name}")
+
+                target = staging_dir / member.name
+                target.parent.mkdir(parents=True, exist_ok=True)
+                digest = hashlib.sha256()
+                size = 0
+                with tar.extractfile(member) as source, open(target, 'wb') as destination:
+                    for block in iter(lambda: source.read(_BLOCK_SIZE), b''):
+                        digest.update(block)
+                        destination.write(block)
+                        size += len(block)
+
+                if size != entry['size'] or digest.hexdigest() != entry['sha256']:
+                    raise ValueError(f"Bundle corrompu : somme de contrôle invalide pour {member.name}")
+
+            if remaining:
+                raise ValueError(f"Bundle incomplet : fichiers manquants {sorted(remaining)}")
+
+            os.rename(staging_dir, snapshots_dir / version)
+        except BaseException:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+
+    print(f"✅ Bundle importé (snapshot {version}, {manifest.get('num_documents', 'N/A')} documents)")
+    return version, manifest
+
+
+def main(argv: Optional[List[str]] = None):
+    """Point d'entrée en ligne de commande"""
+    from .config import Config
+    from .knowledge_assistant import KnowledgeAssistant
+
+    parser = argparse.ArgumentParser(description="Exporte ou importe l'index d'un vault sous forme d'archive unique")
+    parser.add_argument("action", choices=("export", "import"))
+    parser.add_argument("path", type=Path, help="Fichier d'archive")
+    parser.add_argument("--vault", default=None, help="Nom du vault (défaut : vault par défaut)")
+    parser.add_argument("--compression", choices=COMPRESSIONS, default="gz", help="Compression à l'export")
+    parser.add_argument("--force", action="store_true", help="Importer malgré une configuration différente")
+    args = parser.parse_args(argv)
+
+    assistant = KnowledgeAssistant(Config())
+    if args.action == "export":
+        assistant.export_index_bundle(args.path, vault=args.vault, compression=args.compression)
+    else:
+        assistant.import_index_bundle(args.path, vault=args.vault, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
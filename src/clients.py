@@ -0,0 +1,211 @@
+"""
+Clients LLM et embeddings partagés
+Pool de connexions HTTP keep-alive borné, commun à tous les appels Ollama/OpenAI
+"""
+
+import os
+import threading
+from typing import Any, Dict, Optional
+import httpx
+from langchain_ollama import OllamaEmbeddings, OllamaLLM
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+
+class ClientPool:
+    """
+    Pool de connexions HTTP et clients LangChain partagés
+
+    Un seul transport httpx (et donc un seul pool de connexions keep-alive,
+    borné) est utilisé par tous les clients d'embeddings et de LLM créés par
+    le pool. Les clients identiques (même fournisseur, modèle et paramètres)
+    sont créés une seule fois et réutilisés par tous les vaults et toutes les
+    chaînes RAG du processus.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 16,
+        max_keepalive_connections: int = 8,
+        keepalive_expiry: float = 30.0,
+        timeout: Optional[float] = None
+    ):
+        """
+        Initialise le pool
+
+        Args:
+            max_connections: Nombre maximum de connexions ouvertes simultanément
+            max_keepalive_connections: Nombre de connexions inactives conservées
+            keepalive_expiry: Durée de conservation d'une connexion inactive (secondes)
+            timeout: Timeout des requêtes (secondes, None = illimité comme le client Ollama)
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = timeout
+        self._transport = httpx.HTTPTransport(limits=self.limits)
+        self._http_client: Optional[httpx.Client] = None
+        self._clients: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def http_client(self) -> httpx.Client:
+        """Client httpx synchrone sur le transport partagé (clients OpenAI)"""
+        with self._lock:
+            if self._http_client is None:
+                self._http_client = httpx.Client(transport=self._transport, timeout=self.timeout)
+            return self._http_client
+
+    def _ollama_kwargs(self) -> Dict[str, Any]:
+        """Arguments du client httpx synchrone d'Ollama"""
+        return {'transport': self._transport, 'timeout': self.timeout}
+
+    def _get_or_create(self, key: tuple, factory):
+        """Retourne le client associé à la clé, en le créant au premier appel"""
+        with self._lock:
+            client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        client = factory()
+        with self._lock:
+            return self._clients.setdefault(key, client)
+
+    def embeddings(
+        self,
+        model: str,
+        use_ollama: bool = True,
+        base_url: str = "http://localhost:11434",
+        api_key: Optional[str] = None
+    ):
+        """
+        Retourne le client d'embeddings partagé
+
+        Args:
+            model: Nom du modèle d'embedding
+            use_ollama: Utiliser Ollama au lieu d'OpenAI
+            base_url: URL de base d'Ollama
+            api_key: Clé API OpenAI (si use_ollama=False)
+
+        Returns:
+            Client d'embeddings LangChain
+        """
+        if use_ollama:
+            return self._get_or_create(
+                ('ollama-embeddings', model, base_url),
+                lambda: OllamaEmbeddings(model=model, base_url=base_url, sync_client_kwargs=self._ollama_kwargs())
+            )
+        return self._get_or_create(
+            ('openai-embeddings', model, api_key),
+            lambda: OpenAIEmbeddings(model=model, openai_api_key=api_key, http_client=self.http_client)
+        )
+
+    def llm(
+        self,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        use_ollama: bool = True,
+        base_url: str = "http://localhost:11434",
+        api_key: Optional[str] = None,
+        keep_alive: Optional[Any] = None
+    ):
+        """
+        Retourne le client LLM partagé
+
+        Args:
+            model: Nom du modèle
+            temperature: Température du LLM
+            max_tokens: Nombre maximum de tokens dans la réponse
+            use_ollama: Utiliser Ollama au lieu d'OpenAI
+            base_url: URL de base d'Ollama
+            api_key: Clé API OpenAI (si use_ollama=False)
+            keep_alive: Durée pendant laquelle Ollama garde le modèle chargé
+
+        Returns:
+            Client LLM LangChain
+        """
+        if use_ollama:
+            return self._get_or_create(
+                ('ollama-llm', model, temperature, max_tokens, base_url, keep_alive),
+                lambda: OllamaLLM(
+                    model=model,
+                    temperature=temperature,
+                    base_url=base_url,
+                    num_predict=max_tokens,
+                    keep_alive=keep_alive,
+                    sync_client_kwargs=self._ollama_kwargs()
+                )
+            )
+        return self._get_or_create(
+            ('openai-llm', model, temperature, max_tokens, api_key),
+            lambda: ChatOpenAI(
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                api_key=api_key,
+                http_client=self.http_client
+            )
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiques du pool"""
+        pool = getattr(self._transport, '_pool', None)
+        connections = getattr(pool, 'connections', [])
+        return {
+            'max_connections': self.limits.max_connections,
+            'max_keepalive_connections': self.limits.max_keepalive_connections,
+            'open_connections': len(connections),
+            'idle_connections': sum(1 for c in connections if c.is_idle()),
+            'clients': len(self._clients)
+        }
+
+    def close(self):
+        """Ferme les connexions du pool"""
+        with self._lock:
+            self._clients.clear()
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+        self._transport.close()
+
+
+_shared_pool: Optional[ClientPool] = None
+_shared_lock = threading.Lock()
+
+
+def get_client_pool(
+    max_connections: int = 16,
+    max_keepalive_connections: int = 8,
+    keepalive_expiry: float = 30.0
+) -> ClientPool:
+    """
+    Retourne le pool partagé par tout le processus
+
+    Les paramètres ne sont pris en compte qu'à la création du pool.
+
+    Args:
+        max_connections: Nombre maximum de connexions ouvertes simultanément
+        max_keepalive_connections: Nombre de connexions inactives conservées
+        keepalive_expiry: Durée de conservation d'une connexion inactive (secondes)
+
+    Returns:
+        Pool de clients
+    """
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = ClientPool(max_connections, max_keepalive_connections, keepalive_expiry)
+        return _shared_pool
+
+
+def _reset_after_fork():
+    """Un processus forké ne doit pas réutiliser les connexions de son parent"""
+    global _shared_pool, _shared_lock
+    _shared_pool = None
+    _shared_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,309 @@
+"""
+Docstore compact
+Stocke les chunks dans un buffer contigu et déduplique les métadonnées par note
+"""
+
+import copy
+import json
+import mmap
+import pickle
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+import numpy as np
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_community.docstore.document import Document
+
+
+def deep_sizeof(obj: Any, seen: Optional[set] = None) -> int:
+    """
+    Estime la taille mémoire d'un objet Python et de ses références
+
+    Args:
+        obj: Objet à mesurer
+        seen: IDs des objets déjà comptés (objets partagés comptés une fois)
+
+    Returns:
+        Taille estimée en octets
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+
+class CompactDocstore(Docstore, AddableMixin):
+    """
+    Docstore compact pour FAISS
+
+    Les textes des chunks sont concaténés dans un seul buffer UTF-8 indexé par
+    des tableaux d'offsets ; les métadonnées identiques (celles d'une même note)
+    sont stockées une seule fois et référencées par un ID entier. Les objets
+    Document ne sont matérialisés qu'à la lecture.
+
+    Un docstore sauvegardé peut être rouvert en lecture seule par memory-mapping
+    (open) : le buffer de textes et les offsets sont alors partagés par le cache
+    de pages entre tous les processus qui lisent le même fichier.
+    """
+
+    BUFFER_FILE = "docstore.bin"
+    RECORDS_FILE = "docstore_records.npy"
+    TABLE_FILE = "docstore_table.pkl"
+
+    def __init__(self):
+        """Initialise un docstore vide"""
+        self._read_only = False
+        self._buffer = bytearray()
+        self._starts = array('Q')
+        self._lengths = array('I')
+        self._meta_ids = array('I')
+        self._ids: List[Optional[str]] = []
+        self._positions: Dict[str, int] = {}
+        self._meta_table: List[Dict[str, Any]] = []
+        self._meta_keys: Dict[str, int] = {}
+
+    @classmethod
+    def from_docstore(cls, docstore: Docstore, ids: Iterable[str]) -> "CompactDocstore":
+        """
+        Convertit un docstore existant (InMemoryDocstore)
+
+        Args:
+            docstore: Docstore source
+            ids: IDs des documents, dans l'ordre de l'index FAISS
+
+        Returns:
+            Docstore compact
+        """
+        compact = cls()
+        for doc_id in ids:
+            doc = docstore.search(doc_id)
+            if isinstance(doc, Document):
+                compact._append(doc_id, doc)
+        return compact
+
+    def _intern_metadata(self, metadata: Dict[str, Any]) -> int:
+        """Retourne l'ID des métadonnées, en les ajoutant à la table si nouvelles"""
+        key = json.dumps(metadata, sort_keys=True, default=str)
+        meta_id = self._meta_keys.get(key)
+        if meta_id is None:
+            meta_id = len(self._meta_table)
+            self._meta_table.append(copy.deepcopy(metadata))
+            self._meta_keys[key] = meta_id
+        return meta_id
+
+    def _append(self, doc_id: str, doc: Document):
+        """Ajoute un chunk à la fin du buffer"""
+        if self._read_only:
+            raise ValueError("Docstore ouvert en lecture seule (memory-mapped)")
+        text = doc.page_content.encode('utf-8')
+        self._positions[doc_id] = len(self._ids)
+        self._ids.append(doc_id)
+        self._starts.append(len(self._buffer))
+        self._lengths.append(len(text))
+        self._meta_ids.append(self._intern_metadata(doc.metadata))
+        self._buffer.extend(text)
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        """
+        Ajoute des documents
+
+        Args:
+            texts: Dictionnaire {ID: Document}
+        """
+        overlapping = set(texts).intersection(self._positions)
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+        for doc_id, doc in texts.items():
+            self._append(doc_id, doc)
+
+    def delete(self, ids: List) -> None:
+        """
+        Supprime des documents
+
+        Args:
+            ids: IDs des documents à supprimer
+        """
+        if self._read_only:
+            raise ValueError("Docstore ouvert en lecture seule (memory-mapped)")
+        overlapping = set(ids).intersection(self._positions)
+        if not overlapping:
+            raise ValueError(f"Tried to delete ids that does not  exist: {ids}")
+        for doc_id in ids:
+            slot = self._positions.pop(doc_id)
+            self._ids[slot] = None
+
+        # Compacter le buffer quand la moitié des chunks est supprimée
+        if len(self._positions) < len(self._ids) / 2:
+            self.compact()
+
+    def search(self, search: str) -> Union[str, Document]:
+        """
+        Matérialise le Document associé à un ID
+
+        Args:
+            search: ID du document
+
+        Returns:
+            Document, ou message d'erreur si l'ID est inconnu
+        """
+        slot = self._positions.get(search)
+        if slot is None:
+            return f"ID {search} not found."
+
+        start = int(self._starts[slot])
+        text = bytes(self._buffer[start:start + int(self._lengths[slot])]).decode('utf-8')
+        metadata = copy.deepcopy(self._meta_table[int(self._meta_ids[slot])])
+        return Document(id=search, page_content=text, metadata=metadata)
+
+    def compact(self):
+        """Réécrit le buffer sans les chunks supprimés"""
+        live = [(doc_id, self.search(doc_id)) for doc_id in self._ids if doc_id is not None]
+        self.__init__()
+        for doc_id, doc in live:
+            self._append(doc_id, doc)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def save(self, directory: Path, ids: List[str]):
+        """
+        Sauvegarde le docstore dans des fichiers pouvant être memory-mappés
+
+        Args:
+            directory: Dossier de destination
+            ids: IDs des documents, dans l'ordre de l'index FAISS
+        """
+        ordered = self if self._ids == ids else CompactDocstore.from_docstore(self, ids)
+        directory = Path(directory)
+
+        with open(directory / self.BUFFER_FILE, 'wb') as f:
+            f.write(ordered._buffer)
+
+        records = np.stack([
+            np.frombuffer(ordered._starts, dtype=np.uint64).astype(np.int64),
+            np.frombuffer(ordered._lengths, dtype=np.uint32).astype(np.int64),
+            np.frombuffer(ordered._meta_ids, dtype=np.uint32).astype(np.int64)
+        ], axis=1) if ids else np.zeros((0, 3), dtype=np.int64)
+        np.save(directory / self.RECORDS_FILE, records)
+
+        with open(directory / self.TABLE_FILE, 'wb') as f:
+            pickle.dump({'ids': ordered._ids, 'meta_table': ordered._meta_table}, f)
+
+    @classmethod
+    def exists(cls, directory: Path) -> bool:
+        """Indique si un docstore compact a été sauvegardé dans le dossier"""
+        directory = Path(directory)
+        return all((directory / name).exists() for name in (cls.BUFFER_FILE, cls.RECORDS_FILE, cls.TABLE_FILE))
+
+    @classmethod
+    def open(cls, directory: Path) -> Tuple["CompactDocstore", List[str]]:
+        """
+        Ouvre un docstore sauvegardé en lecture seule, par memory-mapping
+
+        Args:
+            directory: Dossier contenant les fichiers du docstore
+
+        Returns:
+            Tuple (docstore, IDs dans l'ordre de l'index FAISS)
+        """
+        directory = Path(directory)
+        docstore = cls()
+        docstore._read_only = True
+
+        with open(directory / cls.TABLE_FILE, 'rb') as f:
+            table = pickle.load(f)
+        docstore._ids = table['ids']
+        docstore._meta_table = table['meta_table']
+        docstore._positions = {doc_id: slot for slot, doc_id in enumerate(docstore._ids)}
+
+        records = np.load(directory / cls.RECORDS_FILE, mmap_mode='r')
+        docstore._starts = records[:, 0]
+        docstore._lengths = records[:, 1]
+        docstore._meta_ids = records[:, 2]
+
+        buffer_path = directory / cls.BUFFER_FILE
+        if buffer_path.stat().st_size > 0:
+            with open(buffer_path, 'rb') as f:
+                docstore._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            docstore._buffer = b''
+
+        return docstore, list(docstore._ids)
+
+    def memory_bytes(self) -> int:
+        """Estime la mémoire privée occupée par le docstore (octets, hors fichiers memory-mappés)"""
+        if self._read_only:
+            shared = 0
+        else:
+            shared = (
+                sys.getsizeof(self._buffer)
+                + sum(sys.getsizeof(a) for a in (self._starts, self._lengths, self._meta_ids))
+            )
+        return (
+            shared
+            + deep_sizeof(self._ids)
+            + sys.getsizeof(self._positions)
+            + deep_sizeof(self._meta_table)
+            + deep_sizeof(self._meta_keys)
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiques du docstore"""
+        return {
+            'num_chunks': len(self),
+            'num_metadata_entries': len(self._meta_table),
+            'text_buffer_mb': len(self._buffer) / (1024 * 1024),
+            'memory_mapped': self._read_only
+        }
+
+
+def docstore_memory_report(docstore: Docstore, ids: List[str], sample_size: int = 200) -> Dict[str, float]:
+    """
+    Compare la mémoire par chunk d'un docstore de Documents et du docstore compact
+
+    Les valeurs sont extrapolées à partir d'un échantillon réparti sur l'index.
+
+    Args:
+        docstore: Docstore actuel
+        ids: IDs des documents, dans l'ordre de l'index
+        sample_size: Taille de l'échantillon
+
+    Returns:
+        Dictionnaire avec les octets par chunk avant et après compaction
+    """
+    if not ids:
+        return {}
+
+    step = max(1, len(ids) // sample_size)
+    sample_ids = ids[::step][:sample_size]
+    docs = {doc_id: docstore.search(doc_id) for doc_id in sample_ids}
+    docs = {doc_id: doc for doc_id, doc in docs.items() if isinstance(doc, Document)}
+    if not docs:
+        return {}
+
+    # Avant : un Document complet (texte + copie des métadonnées) par chunk
+    documents_bytes = deep_sizeof(docs) / len(docs)
+
+    # Après : mesure exacte si déjà compact, sinon estimation sur l'échantillon
+    if isinstance(docstore, CompactDocstore):
+        compact_bytes = docstore.memory_bytes() / max(len(docstore), 1)
+    else:
+        sample = CompactDocstore()
+        sample.add(docs)
+        compact_bytes = sample.memory_bytes() / len(docs)
+
+    return {
+        'documents_bytes_per_chunk': round(documents_bytes, 1),
+        'compact_bytes_per_chunk': round(compact_bytes, 1)
+    }
@@ -5,7 +5,7 @@ Charge et valide les variables d'environnement
 
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 from dotenv import load_dotenv
 
 
@@ -46,6 +46,13 @@ class Config:
         vault_path = os.getenv("OBSIDIAN_VAULT_PATH", "./obsidian_vault")
         self.obsidian_vault_path = Path(vault_path)
         
+        # Vaults multiples : "perso=/chemin/a;equipe=/chemin/b" (un index par vault)
+        self.vaults = self._parse_vaults(os.getenv("OBSIDIAN_VAULTS", ""))
+        if self.vaults:
+            self.obsidian_vault_path = next(iter(self.vaults.values()))
+        else:
+            self.vaults = {"default": self.obsidian_vault_path}
+        
         # Configuration des modèles
         if self.llm_provider == "ollama":
             self.embedding_model = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
@@ -57,15 +64,98 @@ class Config:
         self.llm_temperature = float(os.getenv("LLM_TEMPERATURE", "0.7"))
         self.max_tokens = int(os.getenv("MAX_TOKENS", "2000"))
         
+        # Routage : modèle rapide pour les questions simples, LLM_MODEL pour les autres (vide = désactivé)
+        self.fast_llm_model = os.getenv("FAST_LLM_MODEL", "") or None
+        self.router_max_distance = float(os.getenv("ROUTER_MAX_DISTANCE", "0.7"))
+        self.router_max_question_words = int(os.getenv("ROUTER_MAX_QUESTION_WORDS", "20"))
+        self.router_max_context_chars = int(os.getenv("ROUTER_MAX_CONTEXT_CHARS", "6000"))
+        # Bascule vers le modèle rapide : file de génération profonde ou latence p95 au-delà de l'objectif
+        self.router_downgrade_queue_depth = int(os.getenv("ROUTER_DOWNGRADE_QUEUE_DEPTH", "4"))
+        self.router_latency_slo_ms = float(os.getenv("ROUTER_LATENCY_SLO_MS", "0"))
+        
+        # Génération : "default" ou "prefix_cache" (réutilisation du cache KV d'Ollama)
+        self.generation_mode = os.getenv("GENERATION_MODE", "default").lower()
+        if self.generation_mode not in ("default", "prefix_cache"):
+            raise ValueError(f"GENERATION_MODE non supporté : {self.generation_mode}")
+        keep_alive = os.getenv("OLLAMA_KEEP_ALIVE") or None
+        # Ollama attend un nombre de secondes (entier) ou une durée ("30m")
+        self.ollama_keep_alive = int(keep_alive) if keep_alive and keep_alive.lstrip("-").isdigit() else keep_alive
+        # Réponse : "generate" (LLM), "extractive" (phrases des notes, sans LLM) ou "auto"
+        self.answer_mode = os.getenv("ANSWER_MODE", "generate").lower()
+        if self.answer_mode not in ("generate", "extractive", "auto"):
+            raise ValueError(f"ANSWER_MODE non supporté : {self.answer_mode}")
+        self.extractive_max_sentences = int(os.getenv("EXTRACTIVE_MAX_SENTENCES", "3"))
+        # Mode auto : similarité cosinus minimale de la meilleure phrase, sinon génération
+        self.extractive_min_confidence = float(os.getenv("EXTRACTIVE_MIN_CONFIDENCE", "0.6"))
+        # Index de sujets : questions sur tout le vault ("Summarize all my notes").
+        # Désactivé par défaut : sa construction résume chaque note avec le LLM
+        self.topic_index = os.getenv("TOPIC_INDEX", "false").lower() == "true"
+        self.topic_clusters = int(os.getenv("TOPIC_CLUSTERS", "12"))
+        self.topic_context_chars = int(os.getenv("TOPIC_CONTEXT_CHARS", "6000"))
+        # Conversations : les questions de suite réutilisent les chunks des tours précédents
+        self.conversation_memory = os.getenv("CONVERSATION_MEMORY", "true").lower() == "true"
+        self.conversation_memory_mb = float(os.getenv("CONVERSATION_MEMORY_MB", "64"))
+        self.conversation_ttl_s = float(os.getenv("CONVERSATION_TTL_S", "1800"))
+        
+        # Pool de connexions HTTP partagé par les clients LLM et embeddings
+        self.http_max_connections = int(os.getenv("HTTP_MAX_CONNECTIONS", "16"))
+        self.http_max_keepalive = int(os.getenv("HTTP_MAX_KEEPALIVE", "8"))
+        self.http_keepalive_expiry = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+        # Coalescence des questions identiques posées simultanément
+        self.request_coalescing = os.getenv("REQUEST_COALESCING", "true").lower() == "true"
+        # Ordonnanceur de génération : concurrence, file d'attente et échéances (secondes, 0 = aucune)
+        self.scheduler_max_concurrency = int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "2"))
+        self.scheduler_max_queue = int(os.getenv("SCHEDULER_MAX_QUEUE", "32"))
+        self.scheduler_batch_concurrency = int(os.getenv("SCHEDULER_BATCH_CONCURRENCY", "1"))
+        self.scheduler_interactive_deadline_s = float(os.getenv("SCHEDULER_INTERACTIVE_DEADLINE_S", "30"))
+        self.scheduler_batch_deadline_s = float(os.getenv("SCHEDULER_BATCH_DEADLINE_S", "0"))
+        
         # Configuration du vector store
         self.vector_store_path = Path(os.getenv("VECTOR_STORE_PATH", "./data/vector_store"))
         self.chunk_size = int(os.getenv("CHUNK_SIZE", "1000"))
         self.chunk_overlap = int(os.getenv("CHUNK_OVERLAP", "200"))
+        self.compact_docstore = os.getenv("COMPACT_DOCSTORE", "true").lower() == "true"
+        # Chunks en double (copier-coller) : "none", "exact" ou "near" (quasi-doublons, MinHash/LSH, sur demande)
+        self.chunk_dedup = os.getenv("CHUNK_DEDUP", "exact").lower()
+        if self.chunk_dedup not in ("none", "exact", "near"):
+            raise ValueError(f"CHUNK_DEDUP non supporté : {self.chunk_dedup}")
+        self.dedup_threshold = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
+        self.snapshot_retention = int(os.getenv("SNAPSHOT_RETENTION", "3"))
+        # Index incompatible avec la configuration (modèle d'embeddings, chunking) : "rebuild" ou "refuse"
+        self.index_mismatch = os.getenv("INDEX_MISMATCH", "rebuild").lower()
+        if self.index_mismatch not in ("rebuild", "refuse"):
+            raise ValueError(f"INDEX_MISMATCH non supporté : {self.index_mismatch}")
+        self.index_mmap = os.getenv("INDEX_MMAP", "false").lower() == "true"
+        self.serving_workers = int(os.getenv("SERVING_WORKERS", str(os.cpu_count() or 1)))
+        self.shard_memory_budget_mb = float(os.getenv("SHARD_MEMORY_BUDGET_MB", "1024"))
+        self.search_workers = int(os.getenv("SEARCH_WORKERS", "4"))
+        
+        # Quantification de l'index : "none" (float32), "fp16" ou "int8", PCA optionnelle
+        self.index_quantization = os.getenv("INDEX_QUANTIZATION", "none").lower()
+        if self.index_quantization not in ("none", "fp16", "int8"):
+            raise ValueError(f"INDEX_QUANTIZATION non supporté : {self.index_quantization}")
+        self.index_pca_dim = int(os.getenv("INDEX_PCA_DIM", "0"))
+        self.rescore_factor = int(os.getenv("RESCORE_FACTOR", "4"))
+        
+        # Ingestion des PDF du vault
+        self.include_pdfs = os.getenv("INCLUDE_PDFS", "true").lower() == "true"
+        self.pdf_workers = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.pdf_pages_per_task = int(os.getenv("PDF_PAGES_PER_TASK", "25"))
+        self.pdf_worker_memory_mb = int(os.getenv("PDF_WORKER_MEMORY_MB", "1024"))
         
         # Configuration de recherche
         self.top_k_results = int(os.getenv("TOP_K_RESULTS", "5"))
         self.similarity_threshold = float(os.getenv("SIMILARITY_THRESHOLD", "0.7"))
         
+        # Mode de récupération : "vector" (top-k) ou "graph" (top-k + notes liées)
+        self.retrieval_mode = os.getenv("RETRIEVAL_MODE", "vector").lower()
+        if self.retrieval_mode not in ("vector", "graph"):
+            raise ValueError(f"RETRIEVAL_MODE non supporté : {self.retrieval_mode}")
+        self.graph_max_extra_chunks = int(os.getenv("GRAPH_MAX_EXTRA_CHUNKS", "3"))
+        self.graph_time_budget_ms = float(os.getenv("GRAPH_TIME_BUDGET_MS", "50"))
+        self.graph_link_penalty = float(os.getenv("GRAPH_LINK_PENALTY", "0.1"))
+        self.graph_backlink_penalty = float(os.getenv("GRAPH_BACKLINK_PENALTY", "0.2"))
+        
         # Configuration du cache
         self.enable_cache = os.getenv("ENABLE_CACHE", "true").lower() == "true"
         self.cache_dir = Path(os.getenv("CACHE_DIR", "./data/cache"))
@@ -73,6 +163,39 @@ class Config:
         # Créer les répertoires nécessaires
         self._create_directories()
     
+    @staticmethod
+    def _parse_vaults(value: str) -> Dict[str, Path]:
+        """
+        Parse la liste des vaults nommés
+        
+        Args:
+            value: Chaîne "nom=chemin;nom=chemin"
+            
+        Returns:
+            Dictionnaire ordonné {nom: chemin}
+        """
+        vaults = {}
+        for entry in filter(None, (part.strip() for part in value.split(";"))):
+            name, sep, path = entry.partition("=")
+            if not sep or not name.strip() or not path.strip():
+                raise ValueError(f"Entrée OBSIDIAN_VAULTS invalide : {entry} (attendu : nom=chemin)")
+            vaults[name.strip()] = Path(path.strip())
+        return vaults
+    
+    def get_vault_store_path(self, name: str) -> Path:
+        """
+        Retourne le dossier de l'index d'un vault
+        
+        Args:
+            name: Nom du vault
+            
+        Returns:
+            Dossier de stockage (VECTOR_STORE_PATH pour un vault unique)
+        """
+        if len(self.vaults) == 1:
+            return self.vector_store_path
+        return self.vector_store_path / name
+    
     def _create_directories(self):
         """Crée les répertoires nécessaires s'ils n'existent pas"""
         self.vector_store_path.mkdir(parents=True, exist_ok=True)
@@ -86,10 +209,11 @@ class Config:
         Returns:
             True si la configuration est valide
         """
-        if not self.obsidian_vault_path.exists():
-            print(f"⚠️ Le chemin du vault Obsidian n'existe pas : {self.obsidian_vault_path}")
-            print(f"Veuillez vérifier la variable OBSIDIAN_VAULT_PATH dans le fichier .env")
-            return False
+        for name, path in self.vaults.items():
+            if not path.exists():
+                print(f"⚠️ Le chemin du vault Obsidian '{name}' n'existe pas : {path}")
+                print(f"Veuillez vérifier les variables OBSIDIAN_VAULT_PATH / OBSIDIAN_VAULTS dans le fichier .env")
+                return False
         
         return True
     
@@ -98,8 +222,11 @@ class Config:
         return f"""Config(
     LLM Provider: {self.llm_provider}
     Vault Obsidian: {self.obsidian_vault_path}
+    Vaults: {', '.join(self.vaults)}
     Modèle LLM: {self.llm_model}
+    Modèle rapide: {self.fast_llm_model or 'aucun'}
     Modèle Embedding: {self.embedding_model}
     Vector Store: {self.vector_store_path}
     Top K: {self.top_k_results}
+    Récupération: {self.retrieval_mode}
 )"""
\ No newline at end of file
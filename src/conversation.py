@@ -0,0 +1,387 @@
+"""
+Sessions de conversation
+Les questions de suite réutilisent les chunks et les vecteurs de question des tours précédents
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Sequence, Tuple
+import numpy as np
+from langchain_community.docstore.document import Document
+
+
+# Indices d'une question de suite : conjonction en tête ou pronom renvoyant au tour précédent
+_FOLLOW_UP_START = re.compile(
+    r"^\s*(and|but|also|so|then|what about|how about|compared?|versus|vs\.?|why|how so|"
+    r"et|mais|aussi|alors|puis|et pour|et si|compar\w*|pourquoi)\b",
+    re.IGNORECASE
+)
+_FOLLOW_UP_REFERENCE = re.compile(
+    r"\b(it|its|this|that|these|those|they|them|their|the same|"
+    r"ça|cela|ceci|celui|celle|ceux|celles|leur|leurs|le même|la même)\b",
+    re.IGNORECASE
+)
+
+# Clé d'un chunk dans l'ensemble de travail : (vault, ID du chunk)
+ChunkKey = Tuple[Optional[str], str]
+
+
+def chunk_key(doc: Document) -> ChunkKey:
+    """Clé d'un chunk récupéré (ID du docstore, ou source et contenu à défaut)"""
+    doc_id = getattr(doc, 'id', None) or f"{doc.metadata.get('source', '')}#{hash(doc.page_content)}"
+    return doc.metadata.get('vault'), doc_id
+
+
+class _Turn:
+    """Tour de conversation : question, vecteur de la question et chunks retenus"""
+
+    __slots__ = ('question', 'query_vector', 'chunk_keys')
+
+    def __init__(self, question: str, query_vector: np.ndarray, chunk_keys: List[ChunkKey]):
+        self.question = question
+        self.query_vector = query_vector
+        self.chunk_keys = chunk_keys
+
+
+class ConversationSession:
+    """
+    Session de conversation d'un utilisateur
+
+    Garde les derniers tours (question, vecteur de la question, chunks
+    retenus) et un ensemble de travail : les chunks déjà récupérés, avec
+    leurs vecteurs, du plus récemment utilisé au plus ancien.
+    """
+
+    def __init__(self, session_id: Hashable, max_turns: int = 8, working_set_size: int = 32):
+        """
+        Initialise une session vide
+
+        Args:
+            session_id: Identifiant de la session
+            max_turns: Nombre de tours conservés
+            working_set_size: Nombre maximum de chunks dans l'ensemble de travail
+        """
+        self.session_id = session_id
+        self.turns: Deque[_Turn] = deque(maxlen=max_turns)
+        self.working_set: "OrderedDict[ChunkKey, Tuple[Document, np.ndarray]]" = OrderedDict()
+        self.working_set_size = working_set_size
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+        # Mémoire estimée, mise à jour par record() sous self.lock : le magasin
+        # la lit sans parcourir les tours pendant qu'un autre thread les modifie
+        self._memory_bytes = 0
+
+    def is_follow_up(
+        self,
+        question: str,
+        query_vector: np.ndarray,
+        min_similarity: float,
+        cue_similarity: float
+    ) -> bool:
+        """
+        Question de suite : question proche de la précédente
+
+        La similarité des vecteurs est toujours requise ; un indice lexical
+        (conjonction en tête, pronom dans une question courte) abaisse
+        seulement le seuil : "why is the sky blue?" après une question sur
+        Rust reste une nouvelle question.
+
+        Args:
+            question: Nouvelle question
+            query_vector: Vecteur de la nouvelle question
+            min_similarity: Similarité cosinus minimale avec la question précédente
+            cue_similarity: Seuil abaissé quand la question porte un indice lexical
+
+        Returns:
+            True si la question prolonge la conversation
+        """
+        if not self.turns:
+            return False
+
+        previous = self.turns[-1].query_vector
+        norms = float(np.linalg.norm(previous) * np.linalg.norm(query_vector))
+        if norms == 0:
+            return False
+
+        cue = bool(_FOLLOW_UP_START.search(question)) or (
+            len(question.split()) <= 12 and bool(_FOLLOW_UP_REFERENCE.search(question))
+        )
+        threshold = min(cue_similarity, min_similarity) if cue else min_similarity
+        return float(previous @ query_vector) / norms >= threshold
+
+    def context_vector(self, query_vector: np.ndarray, weight: float) -> np.ndarray:
+        """
+        Vecteur de recherche d'une question de suite
+
+        Combinaison convexe du vecteur de la question et de la moyenne des
+        questions précédentes (les plus récentes pèsent le plus) : "et par
+        rapport à RMSE ?" est cherché près de "RMSE" et de la question sur MSE.
+
+        Args:
+            query_vector: Vecteur de la nouvelle question
+            weight: Poids des questions précédentes (0 à 1)
+
+        Returns:
+            Vecteur de recherche, de même échelle que les vecteurs de question
+        """
+        vectors = np.stack([turn.query_vector for turn in self.turns])
+        recency = 0.5 ** np.arange(len(vectors))[::-1]
+        previous = (recency[:, None] * vectors).sum(axis=0) / recency.sum()
+        return ((1 - weight) * query_vector + weight * previous).astype(np.float32)
+
+    def rank_working_set(
+        self,
+        vector: np.ndarray,
+        k: int,
+        vaults: Optional[List[str]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Classe les chunks de l'ensemble de travail par distance au vecteur
+
+        Args:
+            vector: Vecteur de recherche
+            k: Nombre de chunks retournés
+            vaults: Vaults interrogés (tous par défaut) ; les chunks des autres sont ignorés
+
+        Returns:
+            Liste de tuples (Document, distance L2 au carré), comme une recherche FAISS
+        """
+        entries = [
+            (doc, vector) for (vault, _), (doc, vector) in self.working_set.items()
+            if not vaults or vault is None or vault in vaults
+        ]
+        if not entries:
+            return []
+        docs, vectors = zip(*entries)
+        distances = ((np.stack(vectors) - vector) ** 2).sum(axis=1)
+        return [(docs[i], float(distances[i])) for i in np.argsort(distances)[:k]]
+
+    def record(self, question: str, query_vector: np.ndarray, hits: Sequence[Tuple[Document, np.ndarray]]):
+        """
+        Enregistre un tour et ajoute ses chunks à l'ensemble de travail
+
+        Args:
+            question: Question posée
+            query_vector: Vecteur de la question
+            hits: Chunks retenus avec leurs vecteurs
+        """
+        keys = []
+        for doc, vector in hits:
+            key = chunk_key(doc)
+            keys.append(key)
+            self.working_set[key] = (doc, vector)
+            self.working_set.move_to_end(key)
+        while len(self.working_set) > self.working_set_size:
+            self.working_set.popitem(last=False)
+
+        self.turns.append(_Turn(question, query_vector, keys))
+        self._memory_bytes = self._measure()
+        self.last_used = time.monotonic()
+
+    def previous_questions(self, limit: int = 2) -> List[str]:
+        """Dernières questions posées, de la plus ancienne à la plus récente"""
+        return [turn.question for turn in list(self.turns)[-limit:]]
+
+    def memory_bytes(self) -> int:
+        """Mémoire estimée au dernier tour enregistré (lecture sans verrou)"""
+        return self._memory_bytes
+
+    def _measure(self) -> int:
+        """Estime la mémoire occupée : vecteurs, textes des chunks et questions (verrou tenu)"""
+        size = sum(turn.query_vector.nbytes + len(turn.question) for turn in self.turns)
+        size += sum(vector.nbytes + len(doc.page_content) + 256 for doc, vector in self.working_set.values())
+        return size
+
+
+class ConversationStore:
+    """
+    Sessions de conversation en mémoire, avec expiration
+
+    Une question de suite est cherchée avec un vecteur qui combine la
+    question et les tours précédents. La recherche dans l'index est réduite
+    (incremental_k résultats) et complétée par l'ensemble de travail de la
+    session, re-classé exactement en NumPy sans toucher à l'index. Seuls
+    les chunks en mémoire proches des résultats de l'index sont retenus ;
+    s'ils ne suffisent pas à compléter les k résultats, la recherche
+    complète est faite dans l'index. Les sessions inactives depuis ttl_s expirent, et les moins récemment
+    utilisées sont évincées au-delà du budget mémoire.
+    """
+
+    def __init__(
+        self,
+        memory_budget_mb: float = 64.0,
+        ttl_s: float = 1800.0,
+        max_turns: int = 8,
+        working_set_size: int = 32,
+        follow_up_similarity: float = 0.6,
+        cue_similarity: float = 0.35,
+        context_weight: float = 0.3,
+        incremental_k: int = 2,
+        cached_distance_margin: float = 0.25
+    ):
+        """
+        Initialise le magasin de sessions
+
+        Args:
+            memory_budget_mb: Mémoire maximale de toutes les sessions (Mo)
+            ttl_s: Durée d'inactivité avant expiration d'une session (secondes)
+            max_turns: Nombre de tours conservés par session
+            working_set_size: Nombre maximum de chunks gardés par session
+            follow_up_similarity: Similarité cosinus avec la question précédente au-delà
+                de laquelle une question sans indice lexical est traitée comme une suite
+            cue_similarity: Même seuil pour une question avec indice lexical ("and RMSE?")
+            context_weight: Poids des questions précédentes dans le vecteur de recherche
+            incremental_k: Nombre de résultats de la recherche dans l'index pour une suite
+            cached_distance_margin: Marge relative, au-delà de la distance du moins bon
+                résultat de l'index, dans laquelle un chunk en mémoire est retenu
+        """
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        self.ttl_s = ttl_s
+        self.max_turns = max_turns
+        self.working_set_size = working_set_size
+        self.follow_up_similarity = follow_up_similarity
+        self.cue_similarity = cue_similarity
+        self.context_weight = context_weight
+        self.incremental_k = incremental_k
+        self.cached_distance_margin = cached_distance_margin
+
+        self._sessions: "OrderedDict[Hashable, ConversationSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.follow_ups = 0
+        self.reused_chunks = 0
+        self.full_searches = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def get(self, session_id: Hashable) -> ConversationSession:
+        """Retourne la session, créée au premier appel (ou après expiration)"""
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = ConversationSession(session_id, self.max_turns, self.working_set_size)
+                self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            session.last_used = time.monotonic()
+            return session
+
+    def end(self, session_id: Hashable):
+        """Supprime une session (nouvelle conversation)"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def retrieve(
+        self,
+        session: ConversationSession,
+        question: str,
+        query_vector: Sequence[float],
+        search: Callable[[List[float], int], List[Tuple[Document, float]]],
+        vectors: Callable[[List[Document]], Dict[ChunkKey, np.ndarray]],
+        k: int,
+        vaults: Optional[List[str]] = None
+    ) -> Tuple[List[Tuple[Document, float]], bool]:
+        """
+        Récupère les chunks d'une question dans le contexte de la session
+
+        Args:
+            session: Session de la conversation
+            question: Question posée
+            query_vector: Vecteur de la question
+            search: Recherche dans l'index (vecteur, k) -> [(Document, distance)]
+            vectors: Vecteurs des chunks récupérés, par clé (voir chunk_key)
+            k: Nombre de chunks à retenir
+            vaults: Vaults interrogés (tous par défaut)
+
+        Returns:
+            Tuple (chunks retenus avec distances, question de suite ou non)
+        """
+        query = np.asarray(query_vector, dtype=np.float32)
+        with session.lock:
+            follow_up = session.is_follow_up(question, query, self.follow_up_similarity, self.cue_similarity)
+            if follow_up:
+                vector = session.context_vector(query, self.context_weight)
+                cached = session.rank_working_set(vector, k, vaults)
+            else:
+                vector, cached = query, []
+
+        fresh = search(vector.tolist(), min(self.incremental_k, k) if cached else k)
+        merged = self._merge(fresh, cached)
+        if cached and len(merged) < k:
+            # Chunks en mémoire moins bons que l'index : recherche complète
+            fresh = search(vector.tolist(), k)
+            merged = self._merge(fresh, cached)
+            with self._lock:
+                self.full_searches += 1
+        docs_and_scores = sorted(merged.values(), key=lambda item: item[1])[:k]
+
+        with session.lock:
+            known = {key: vector for key, (_, vector) in session.working_set.items()}
+        missing = [doc for doc, _ in docs_and_scores if chunk_key(doc) not in known]
+        if missing:
+            known.update(vectors(missing))
+        hits = [(doc, known[chunk_key(doc)]) for doc, _ in docs_and_scores if chunk_key(doc) in known]
+
+        with session.lock:
+            session.record(question, query, hits)
+        with self._lock:
+            if follow_up:
+                self.follow_ups += 1
+                self.reused_chunks += len(docs_and_scores) - len(missing)
+            self._evict()
+        return docs_and_scores, follow_up
+
+    def _merge(
+        self,
+        fresh: List[Tuple[Document, float]],
+        cached: List[Tuple[Document, float]]
+    ) -> Dict[ChunkKey, Tuple[Document, float]]:
+        """
+        Fusionne les résultats de l'index et de l'ensemble de travail, par clé de chunk
+
+        Un chunk en mémoire n'est retenu que si sa distance reste dans la marge
+        du moins bon résultat de l'index : un chunk d'un tour précédent sans
+        rapport avec la question ne prend pas la place d'un résultat de l'index.
+        """
+        if fresh:
+            cutoff = max(float(distance) for _, distance in fresh) * (1 + self.cached_distance_margin)
+            cached = [(doc, distance) for doc, distance in cached if distance <= cutoff]
+
+        merged: Dict[ChunkKey, Tuple[Document, float]] = {}
+        for doc, distance in list(fresh) + cached:
+            key = chunk_key(doc)
+            if key not in merged or distance < merged[key][1]:
+                merged[key] = (doc, distance)
+        return merged
+
+    def _expire(self):
+        """Supprime les sessions inactives depuis ttl_s (verrou tenu)"""
+        if self.ttl_s <= 0:
+            return
+        now = time.monotonic()
+        for session_id in [sid for sid, s in self._sessions.items() if now - s.last_used > self.ttl_s]:
+            del self._sessions[session_id]
+            self.expired += 1
+
+    def _evict(self):
+        """Évince les sessions les moins récemment utilisées au-delà du budget mémoire (verrou tenu)"""
+        self._expire()
+        total = sum(session.memory_bytes() for session in self._sessions.values())
+        while total > self.memory_budget_bytes and len(self._sessions) > 1:
+            _, session = self._sessions.popitem(last=False)
+            total -= session.memory_bytes()
+            self.evicted += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiques : sessions actives, mémoire, questions de suite et chunks réutilisés"""
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'memory_mb': sum(s.memory_bytes() for s in self._sessions.values()) / (1024 * 1024),
+                'follow_ups': self.follow_ups,
+                'reused_chunks': self.reused_chunks,
+                'full_searches': self.full_searches,
+                'evicted': self.evicted,
+                'expired': self.expired
+            }
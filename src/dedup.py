@@ -0,0 +1,236 @@
+"""
+Déduplication des chunks
+Regroupe les chunks identiques (empreinte du contenu) ou quasi identiques
+(MinHash/LSH) avant l'embedding
+"""
+
+import hashlib
+import re
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from langchain_community.docstore.document import Document
+
+
+DEDUP_MODES = ("none", "exact", "near")
+
+_WORD = re.compile(r'\w+')
+
+
+def normalize_text(text: str) -> str:
+    """Texte comparé : casse et espacement ignorés"""
+    return " ".join(text.casefold().split())
+
+
+def _hash32(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=4).digest(), 'little')
+
+
+def shingles(text: str, size: int = 5) -> np.ndarray:
+    """
+    Ensemble des n-grammes de mots d'un texte, hachés sur 32 bits
+
+    Args:
+        text: Texte du chunk
+        size: Nombre de mots par n-gramme
+
+    Returns:
+        Tableau uint64 trié des empreintes distinctes (vide pour un texte sans mot)
+    """
+    words = _WORD.findall(text.casefold())
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    grams = {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+    return np.unique(np.fromiter((_hash32(gram) for gram in grams), dtype=np.uint64, count=len(grams)))
+
+
+def _jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    """Similarité de Jaccard de deux ensembles triés"""
+    if not len(a) or not len(b):
+        return 0.0
+    common = len(np.intersect1d(a, b, assume_unique=True))
+    return common / (len(a) + len(b) - common)
+
+
+def lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Découpage de la signature en bandes pour un seuil de similarité
+
+    Deux chunks de Jaccard s deviennent candidats avec une probabilité
+    1 - (1 - s^r)^b. Le point d'inflexion (1/b)^(1/r) est placé environ
+    0.1 sous le seuil : les candidats sont vérifiés par le Jaccard exact,
+    un faux positif ne coûte qu'une comparaison, un faux négatif un doublon.
+
+    Args:
+        num_perm: Taille de la signature MinHash
+        threshold: Seuil de similarité de Jaccard
+
+    Returns:
+        Tuple (bandes, lignes par bande), avec bandes * lignes = num_perm
+    """
+    target = max(threshold - 0.1, 0.05)
+    candidates = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    below = [(b, r) for b, r in candidates if (1 / b) ** (1 / r) <= target] or candidates
+    return min(below, key=lambda br: abs(target - (1 / br[0]) ** (1 / br[1])))
+
+
+class ChunkDeduplicator:
+    """
+    Déduplication des chunks avant l'embedding
+
+    Les chunks de même texte normalisé (empreinte SHA-1) sont fusionnés ; en
+    mode "near", les chunks dont la similarité de Jaccard des n-grammes de
+    mots dépasse le seuil le sont aussi. Les candidats sont trouvés par
+    MinHash/LSH (sans comparer toutes les paires), puis vérifiés par le
+    Jaccard exact. Chaque chunk est comparé aux seuls chunks canoniques déjà
+    retenus : pas de fusion en chaîne de textes de plus en plus éloignés.
+
+    Le chunk canonique (le premier rencontré) porte dans sa métadonnée
+    'sources' la liste de toutes les notes qui contiennent ce texte, et
+    l'union de leurs tags et de leurs liens.
+    """
+
+    def __init__(
+        self,
+        mode: str = "exact",
+        threshold: float = 0.9,
+        num_perm: int = 128,
+        shingle_size: int = 5,
+        seed: int = 1
+    ):
+        """
+        Initialise le dédoublonneur
+
+        Args:
+            mode: "none", "exact" (texte identique) ou "near" (exact + quasi-doublons)
+            threshold: Similarité de Jaccard minimale d'un quasi-doublon
+            num_perm: Taille des signatures MinHash
+            shingle_size: Nombre de mots par n-gramme
+            seed: Graine des fonctions de hachage
+        """
+        if mode not in DEDUP_MODES:
+            raise ValueError(f"Mode de déduplication inconnu : {mode} (attendu : {', '.join(DEDUP_MODES)})")
+        self.mode = mode
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = lsh_bands(num_perm, threshold)
+
+        # Hachage multiply-shift : a impair et b sur 64 bits
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True) | np.uint64(1)
+        self._b = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True)
+
+    def signature(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        Signature MinHash d'un ensemble de n-grammes
+
+        Args:
+            hashes: Empreintes 32 bits des n-grammes (voir shingles)
+
+        Returns:
+            Minimums des num_perm fonctions de hachage
+        """
+        # (a * h + b) modulo 2^64 (dépassement voulu), 32 bits de poids fort
+        return ((np.outer(self._a, hashes) + self._b[:, None]) >> np.uint64(32)).min(axis=1)
+
+    def deduplicate(self, documents: List[Document]) -> Tuple[List[Document], List[int], Dict[str, Any]]:
+        """
+        Fusionne les chunks en double
+
+        Args:
+            documents: Chunks dans l'ordre du chargeur
+
+        Returns:
+            Tuple (chunks canoniques, leurs positions dans documents, statistiques)
+        """
+        if self.mode == "none":
+            return list(documents), list(range(len(documents))), self._stats(len(documents), 0, 0)
+
+        canonical_of: List[int] = []          # position -> position du chunk canonique
+        exact: Dict[str, int] = {}
+        buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        sets: Dict[int, np.ndarray] = {}
+        exact_count = near_count = 0
+
+        for position, doc in enumerate(documents):
+            key = hashlib.sha1(normalize_text(doc.page_content).encode('utf-8')).hexdigest()
+            if key in exact:
+                canonical_of.append(exact[key])
+                exact_count += 1
+                continue
+
+            canonical = None
+            if self.mode == "near":
+                hashes = shingles(doc.page_content, self.shingle_size)
+                # Textes trop courts pour des n-grammes fiables : doublons exacts seulement
+                if len(hashes) >= self.shingle_size:
+                    signature = self.signature(hashes)
+                    bands = [
+                        (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                        for band in range(self.bands)
+                    ]
+                    canonical = self._match(bands, buckets, sets, hashes)
+                    if canonical is None:
+                        sets[position] = hashes
+                        for band in bands:
+                            buckets.setdefault(band, []).append(position)
+
+            if canonical is None:
+                exact[key] = position
+                canonical_of.append(position)
+            else:
+                canonical_of.append(canonical)
+                near_count += 1
+
+        kept = [position for position, canonical in enumerate(canonical_of) if canonical == position]
+        sources: Dict[int, List[str]] = {position: [] for position in kept}
+        merged: Dict[int, Dict[str, List[str]]] = {position: {'tags': [], 'links': []} for position in kept}
+        for position, canonical in enumerate(canonical_of):
+            metadata = documents[position].metadata
+            source = metadata.get('source', '')
+            if source not in sources[canonical]:
+                sources[canonical].append(source)
+            for key, values in merged[canonical].items():
+                values.extend(value for value in metadata.get(key, []) if value not in values)
+
+        result = []
+        for position in kept:
+            doc = documents[position]
+            if len(sources[position]) > 1:
+                metadata = {**doc.metadata, 'sources': sources[position]}
+                # Filtres par tag et graphe de liens : le chunk représente toutes ses notes
+                for key, values in merged[position].items():
+                    if values:
+                        metadata[key] = values
+                doc = Document(page_content=doc.page_content, metadata=metadata)
+            result.append(doc)
+
+        return result, kept, self._stats(len(documents), exact_count, near_count)
+
+    def _match(
+        self,
+        bands: List[Tuple[int, bytes]],
+        buckets: Dict[Tuple[int, bytes], List[int]],
+        sets: Dict[int, np.ndarray],
+        hashes: np.ndarray
+    ) -> Optional[int]:
+        """Chunk canonique le plus proche parmi les candidats LSH, s'il dépasse le seuil"""
+        candidates = {position for band in bands for position in buckets.get(band, ())}
+        best, best_similarity = None, 0.0
+        for position in sorted(candidates):
+            similarity = _jaccard(hashes, sets[position])
+            if similarity >= self.threshold and similarity > best_similarity:
+                best, best_similarity = position, similarity
+        return best
+
+    def _stats(self, total: int, exact_count: int, near_count: int) -> Dict[str, Any]:
+        removed = exact_count + near_count
+        return {
+            'mode': self.mode,
+            'threshold': self.threshold if self.mode == "near" else None,
+            'input_chunks': total,
+            'unique_chunks': total - removed,
+            'exact_duplicates': exact_count,
+            'near_duplicates': near_count,
+            'dedup_ratio': removed / total if total else 0.0
+        }
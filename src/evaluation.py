@@ -0,0 +1,386 @@
+"""
+Évaluation de la récupération
+Mesure recall@k, MRR et latence d'une grille de configurations (table de Pareto)
+
+Usage :
+    python -m src.evaluation --questions questions.jsonl --chunk-sizes 500,1000 --indexes flat,int8 --k 3,5,10
+    python -m src.evaluation --auto 100 --rescore-factors 2,4 --output resultats.json
+"""
+
+import argparse
+import itertools
+import json
+import random
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+import faiss
+import frontmatter
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from .clients import get_client_pool
+from .config import Config
+from .obsidian_loader import ObsidianLoader
+from .vector_store import VectorStoreManager
+
+
+INDEX_TYPES = ("flat", "fp16", "int8", "ivf")
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings mis en cache par texte : chaque chunk n'est calculé qu'une fois pour toute la grille"""
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+        self._cache: Dict[str, List[float]] = {}
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        missing = list(dict.fromkeys(text for text in texts if text not in self._cache))
+        if missing:
+            self._cache.update(zip(missing, self.embeddings.embed_documents(missing)))
+        return [self._cache[text] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        if text not in self._cache:
+            self._cache[text] = self.embeddings.embed_query(text)
+        return self._cache[text]
+
+
+def load_questions(path: Path) -> List[Dict[str, Any]]:
+    """
+    Charge un jeu de questions annotées
+
+    Le fichier est au format JSON (liste) ou JSONL (un objet par ligne) :
+    {"question": "...", "expected": ["Note.md", ...]} (chemins relatifs au vault).
+
+    Args:
+        path: Chemin du fichier
+
+    Returns:
+        Liste de questions {'question', 'expected'}
+    """
+    text = Path(path).read_text(encoding='utf-8').strip()
+    items = json.loads(text) if text.startswith('[') else [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    questions = []
+    for item in items:
+        expected = item.get('expected', [])
+        questions.append({
+            'question': item['question'],
+            'expected': [expected] if isinstance(expected, str) else list(expected)
+        })
+    return questions
+
+
+def generate_questions(vault_path: Path, limit: Optional[int] = None, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Génère un jeu de questions à partir des titres et des intitulés des notes
+
+    Chaque titre de note et chaque intitulé de section devient une question
+    dont la réponse attendue est la note qui le contient.
+
+    Args:
+        vault_path: Chemin du vault
+        limit: Nombre maximum de questions (échantillon aléatoire)
+        seed: Graine de l'échantillonnage
+
+    Returns:
+        Liste de questions {'question', 'expected'}
+    """
+    vault_path = Path(vault_path)
+    questions, seen = [], set()
+
+    for md_file in sorted(vault_path.rglob("*.md")):
+        source = str(md_file.relative_to(vault_path))
+        try:
+            post = frontmatter.loads(md_file.read_text(encoding='utf-8'))
+        except Exception:
+            continue
+
+        titles = [str(post.metadata.get('title') or md_file.stem)]
+        titles += [match.strip() for match in re.findall(r'^#{1,6}\s+(.+)$', post.content, flags=re.MULTILINE)]
+
+        for title in titles:
+            key = (title.casefold(), source)
+            if len(title) < 4 or key in seen:
+                continue
+            seen.add(key)
+            questions.append({'question': title, 'expected': [source]})
+
+    if limit and len(questions) > limit:
+        questions = random.Random(seed).sample(questions, limit)
+    return questions
+
+
+def _use_ivf(manager: VectorStoreManager, nprobe: int):
+    """Remplace l'index plat par un index IVF (nlist ≈ 4√n) interrogé sur nprobe listes"""
+    index = manager.vector_store.index
+    vectors = index.reconstruct_n(0, index.ntotal)
+    nlist = max(1, min(int(4 * np.sqrt(len(vectors))), len(vectors) // 39 or 1))
+
+    ivf = faiss.IndexIVFFlat(faiss.IndexFlatL2(index.d), index.d, nlist)
+    ivf.train(vectors)
+    ivf.add(vectors)
+    ivf.nprobe = min(nprobe, nlist)
+    manager.vector_store.index = ivf
+
+
+def _percentile(values: Sequence[float], q: float) -> float:
+    return float(np.percentile(values, q)) if len(values) else 0.0
+
+
+def pareto_front(rows: List[Dict[str, Any]], recall_key: str = 'recall_at_k', latency_key: str = 'p50_ms') -> List[Dict[str, Any]]:
+    """
+    Marque les configurations Pareto-optimales (aucune autre n'est à la fois plus rapide et meilleure)
+
+    Args:
+        rows: Résultats de la grille
+        recall_key: Métrique de qualité (plus haut = meilleur)
+        latency_key: Métrique de latence (plus bas = meilleur)
+
+    Returns:
+        Résultats triés par latence, avec la clé 'pareto'
+    """
+    rows = sorted(rows, key=lambda r: (r[latency_key], -r[recall_key]))
+    best_recall = -1.0
+    for row in rows:
+        row['pareto'] = row[recall_key] > best_recall
+        best_recall = max(best_recall, row[recall_key])
+    return rows
+
+
+def evaluate(
+    config: Config,
+    questions: List[Dict[str, Any]],
+    chunk_sizes: Sequence[int],
+    chunk_overlaps: Sequence[int],
+    indexes: Sequence[str] = ("flat",),
+    ks: Sequence[int] = (5,),
+    rescore_factors: Sequence[int] = (4,),
+    nprobes: Sequence[int] = (8,),
+    pca_dims: Sequence[int] = (0,),
+    vault_path: Optional[Path] = None
+) -> List[Dict[str, Any]]:
+    """
+    Évalue une grille de configurations de récupération
+
+    Pour chaque découpage (taille, chevauchement), un index plat exact sert de
+    référence ; chaque configuration est mesurée par rapport aux notes
+    attendues (recall@k, MRR) et aux résultats de la recherche exacte.
+
+    Args:
+        config: Configuration (modèle d'embedding, fournisseur)
+        questions: Questions annotées {'question', 'expected'}
+        chunk_sizes: Tailles de chunks à évaluer
+        chunk_overlaps: Chevauchements à évaluer
+        indexes: Types d'index ("flat", "fp16", "int8", "ivf")
+        ks: Nombres de résultats
+        rescore_factors: Facteurs de re-scoring des index quantifiés
+        nprobes: Nombres de listes interrogées des index IVF
+        pca_dims: Dimensions PCA des index quantifiés (0 = sans PCA)
+        vault_path: Vault à indexer (défaut : vault de la configuration)
+
+    Returns:
+        Une ligne de résultats par configuration
+    """
+    unknown = [index for index in indexes if index not in INDEX_TYPES]
+    if unknown:
+        raise ValueError(f"Type(s) d'index inconnu(s) : {', '.join(unknown)}")
+    if not questions:
+        raise ValueError("Aucune question à évaluer")
+
+    vault_path = Path(vault_path or config.obsidian_vault_path)
+    embeddings = CachedEmbeddings(get_client_pool().embeddings(
+        model=config.embedding_model,
+        use_ollama=config.llm_provider == "ollama",
+        base_url=getattr(config, 'ollama_base_url', 'http://localhost:11434'),
+        api_key=config.openai_api_key
+    ))
+    max_k = max(ks)
+
+    # Variantes d'index : (type, paramètre de re-scoring ou nprobe, PCA)
+    variants = []
+    for index in indexes:
+        if index == "flat":
+            variants.append((index, None, 0))
+        elif index == "ivf":
+            variants.extend((index, nprobe, 0) for nprobe in nprobes)
+        else:
+            variants.extend((index, factor, pca) for factor in rescore_factors for pca in pca_dims)
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="rag-eval-") as workdir:
+        for chunk_size, chunk_overlap in itertools.product(chunk_sizes, chunk_overlaps):
+            if chunk_overlap >= chunk_size:
+                continue
+
+            print(f"📐 Découpage {chunk_size}/{chunk_overlap}...")
+            documents = ObsidianLoader(
+                vault_path, chunk_size, chunk_overlap,
+                include_pdfs=config.include_pdfs, cache_dir=config.cache_dir if config.enable_cache else None
+            ).load_documents()
+
+            reference = None
+            for index, param, pca_dim in variants:
+                manager = VectorStoreManager(
+                    Path(workdir) / f"{chunk_size}-{chunk_overlap}-{index}-{param}-{pca_dim}",
+                    quantization=index if index in ("fp16", "int8") else "none",
+                    pca_dim=pca_dim,
+                    rescore_factor=param or 1,
+                    client_pool=get_client_pool()
+                )
+                manager.embeddings = embeddings
+                manager.create_vector_store(documents)
+                if reference is None:
+                    # Référence : recherche exacte sur les vecteurs pleine précision de ce découpage
+                    reference = _exact_results(manager, questions, max_k)
+                if index == "ivf":
+                    _use_ivf(manager, param)
+
+                for k in ks:
+                    results, latencies = [], []
+                    for item in questions:
+                        start = time.perf_counter()
+                        hits = manager.similarity_search(item['question'], k=k)
+                        latencies.append((time.perf_counter() - start) * 1000)
+                        results.append([(doc.id, doc.metadata.get('source')) for doc, _ in hits])
+
+                    rows.append({
+                        'chunk_size': chunk_size,
+                        'chunk_overlap': chunk_overlap,
+                        'index': index + (f"+pca{pca_dim}" if pca_dim else ""),
+                        'param': (f"nprobe={param}" if index == "ivf" else f"rescore={param}") if param else "",
+                        'k': k,
+                        'num_chunks': len(documents),
+                        'recall_at_k': _label_recall(questions, results, k),
+                        'mrr': _mrr(questions, results, k),
+                        'flat_recall_at_k': _overlap(reference, results, k),
+                        'p50_ms': _percentile(latencies, 50),
+                        'p95_ms': _percentile(latencies, 95)
+                    })
+                manager.unload()
+
+    return pareto_front(rows)
+
+
+def _exact_results(manager: VectorStoreManager, questions: List[Dict[str, Any]], k: int) -> List[List[tuple]]:
+    """Résultats de la recherche exacte (index plat) sur les vecteurs pleine précision"""
+    vectors = manager.full_precision_vectors()
+    flat = faiss.IndexFlatL2(vectors.shape[1])
+    flat.add(vectors)
+
+    query_vectors = np.array([manager.embeddings.embed_query(item['question']) for item in questions], dtype=np.float32)
+    _, positions = flat.search(query_vectors, k)
+    return [
+        [(manager.vector_store.index_to_docstore_id[int(p)], None) for p in row if p != -1]
+        for row in positions
+    ]
+
+
+def _label_recall(questions: List[Dict[str, Any]], results: List[List[tuple]], k: int) -> float:
+    """Part des questions dont une note attendue figure dans les k premiers résultats"""
+    hits = [
+        any(source in item['expected'] for _, source in result[:k])
+        for item, result in zip(questions, results)
+    ]
+    return float(np.mean(hits))
+
+
+def _mrr(questions: List[Dict[str, Any]], results: List[List[tuple]], k: int) -> float:
+    """Rang réciproque moyen de la première note attendue dans les k premiers résultats"""
+    reciprocal = []
+    for item, result in zip(questions, results):
+        rank = next((i for i, (_, source) in enumerate(result[:k], 1) if source in item['expected']), None)
+        reciprocal.append(1.0 / rank if rank else 0.0)
+    return float(np.mean(reciprocal))
+
+
+def _overlap(reference: List[List[tuple]], results: List[List[tuple]], k: int) -> float:
+    """Recall@k par rapport à la recherche exacte (chunks communs)"""
+    scores = []
+    for exact, result in zip(reference, results):
+        expected = {chunk for chunk, _ in exact[:k]}
+        if expected:
+            scores.append(len(expected & {chunk for chunk, _ in result[:k]}) / len(expected))
+    return float(np.mean(scores)) if scores else 0.0
+
+
+def format_table(rows: List[Dict[str, Any]]) -> str:
+    """
+    Formate les résultats en table texte (configurations Pareto-optimales marquées ★)
+
+    Args:
+        rows: Résultats de evaluate()
+
+    Returns:
+        Table alignée
+    """
+    columns = [
+        ('', 'pareto'), ('chunk', 'chunk_size'), ('overlap', 'chunk_overlap'), ('index', 'index'),
+        ('param', 'param'), ('k', 'k'), ('recall@k', 'recall_at_k'), ('MRR', 'mrr'),
+        ('vs exact', 'flat_recall_at_k'), ('p50 ms', 'p50_ms'), ('p95 ms', 'p95_ms')
+    ]
+
+    def cell(row, key):
+        value = row[key]
+        if key == 'pareto':
+            return '★' if value else ''
+        return f"{value:.3f}" if isinstance(value, float) else str(value)
+
+    table = [[title for title, _ in columns]] + [[cell(row, key) for _, key in columns] for row in rows]
+    widths = [max(len(line[i]) for line in table) for i in range(len(columns))]
+    return "\n".join("  ".join(value.rjust(width) for value, width in zip(line, widths)) for line in table)
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def main(argv: Optional[List[str]] = None):
+    """Point d'entrée en ligne de commande"""
+    config = Config()
+    parser = argparse.ArgumentParser(description="Évalue recall@k, MRR et latence d'une grille de configurations de récupération")
+    parser.add_argument("--questions", type=Path, help="Questions annotées (JSON ou JSONL : question, expected)")
+    parser.add_argument("--auto", type=int, default=100, help="Sans --questions : nombre de questions générées depuis les titres")
+    parser.add_argument("--vault", type=Path, default=None, help="Vault à évaluer (défaut : OBSIDIAN_VAULT_PATH)")
+    parser.add_argument("--chunk-sizes", type=_int_list, default=[config.chunk_size])
+    parser.add_argument("--overlaps", type=_int_list, default=[config.chunk_overlap])
+    parser.add_argument("--indexes", type=lambda v: v.split(","), default=["flat"], help="flat,fp16,int8,ivf")
+    parser.add_argument("--k", type=_int_list, default=[config.top_k_results])
+    parser.add_argument("--rescore-factors", type=_int_list, default=[config.rescore_factor])
+    parser.add_argument("--nprobe", type=_int_list, default=[8])
+    parser.add_argument("--pca-dims", type=_int_list, default=[0])
+    parser.add_argument("--output", type=Path, help="Écrit les résultats en JSON")
+    args = parser.parse_args(argv)
+
+    vault_path = args.vault or config.obsidian_vault_path
+    if args.questions:
+        questions = load_questions(args.questions)
+    else:
+        questions = generate_questions(vault_path, limit=args.auto)
+    print(f"❓ {len(questions)} questions")
+
+    rows = evaluate(
+        config, questions,
+        chunk_sizes=args.chunk_sizes,
+        chunk_overlaps=args.overlaps,
+        indexes=args.indexes,
+        ks=args.k,
+        rescore_factors=args.rescore_factors,
+        nprobes=args.nprobe,
+        pca_dims=args.pca_dims,
+        vault_path=vault_path
+    )
+
+    print()
+    print(format_table(rows))
+
+    if args.output:
+        args.output.write_text(json.dumps(rows, indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"💾 Résultats écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
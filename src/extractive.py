@@ -0,0 +1,141 @@
+"""
+Réponses extractives
+Sélectionne les phrases des chunks récupérés les plus proches de la question, sans LLM
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Sequence, Tuple
+import numpy as np
+from langchain_community.docstore.document import Document
+
+
+ANSWER_MODES = ("generate", "extractive", "auto")
+
+# Fin de phrase suivie d'un espace, ou saut de ligne (listes, titres)
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n+')
+# Puces, numéros et titres markdown en début de phrase
+_LINE_PREFIX = re.compile(r'^\s*(?:#{1,6}\s+|[-*+]\s+|\d+[.)]\s+|>\s*)')
+
+
+def split_sentences(text: str, min_chars: int = 20, max_chars: int = 400) -> List[str]:
+    """
+    Découpe un chunk en phrases
+
+    Args:
+        text: Texte du chunk
+        min_chars: Longueur minimale d'une phrase (les fragments plus courts sont ignorés)
+        max_chars: Longueur maximale d'une phrase (tronquée au-delà)
+
+    Returns:
+        Liste de phrases nettoyées
+    """
+    sentences = []
+    for part in _SENTENCE_BOUNDARY.split(text):
+        sentence = _LINE_PREFIX.sub('', part).strip()
+        if len(sentence) >= min_chars:
+            sentences.append(sentence[:max_chars])
+    return sentences
+
+
+class ExtractiveAnswerer:
+    """
+    Réponse extractive à partir des chunks récupérés
+
+    Les chunks sont découpés en phrases, embarquées en un seul appel (les
+    vecteurs des phrases déjà vues sont gardés dans un cache LRU), puis
+    comparées au vecteur de la question par similarité cosinus. Les
+    meilleures phrases forment la réponse ; le meilleur score sert d'indice
+    de confiance.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        max_sentences: int = 3,
+        max_candidates: int = 64,
+        cache_size: int = 4096
+    ):
+        """
+        Initialise le sélecteur de phrases
+
+        Args:
+            embeddings: Modèle d'embeddings (le même que celui de l'index)
+            max_sentences: Nombre de phrases retenues dans la réponse
+            max_candidates: Nombre maximum de phrases évaluées par question
+            cache_size: Nombre de vecteurs de phrases gardés en cache
+        """
+        self.embeddings = embeddings
+        self.max_sentences = max_sentences
+        self.max_candidates = max_candidates
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sentence_vectors(self, sentences: List[str]) -> np.ndarray:
+        """Vecteurs normalisés des phrases, calculés en un seul lot pour celles absentes du cache"""
+        with self._lock:
+            cached = {s: self._cache[s] for s in sentences if s in self._cache}
+            for sentence in cached:
+                self._cache.move_to_end(sentence)
+
+        missing = [s for s in dict.fromkeys(sentences) if s not in cached]
+        if missing:
+            vectors = np.asarray(self.embeddings.embed_documents(missing), dtype=np.float32)
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            with self._lock:
+                for sentence, vector in zip(missing, vectors):
+                    cached[sentence] = vector
+                    self._cache[sentence] = vector
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return np.stack([cached[s] for s in sentences])
+
+    def extract(self, query_vector: Sequence[float], docs_and_scores: List[Tuple[Document, float]]) -> Dict[str, Any]:
+        """
+        Sélectionne les phrases qui répondent le mieux à la question
+
+        Args:
+            query_vector: Vecteur de la question (déjà calculé pour la recherche)
+            docs_and_scores: Chunks récupérés, du plus pertinent au moins pertinent
+
+        Returns:
+            Dictionnaire avec la réponse, les phrases retenues (highlights) et la confiance
+        """
+        candidates: List[Tuple[str, Document]] = []
+        for doc, _ in docs_and_scores:
+            for sentence in split_sentences(doc.page_content):
+                candidates.append((sentence, doc))
+        candidates = candidates[:self.max_candidates]
+
+        if not candidates:
+            return {'answer': "", 'highlights': [], 'confidence': 0.0}
+
+        query = np.array(query_vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        similarities = self._sentence_vectors([sentence for sentence, _ in candidates]) @ query
+
+        highlights = []
+        seen = set()
+        for index in np.argsort(-similarities):
+            sentence, doc = candidates[index]
+            if sentence in seen:
+                continue
+            seen.add(sentence)
+            highlights.append({
+                'text': sentence,
+                'score': float(similarities[index]),
+                'source': doc.metadata.get('source', 'Inconnu'),
+                'file_name': doc.metadata.get('file_name', 'Inconnu'),
+                'vault': doc.metadata.get('vault')
+            })
+            if len(highlights) >= self.max_sentences:
+                break
+
+        return {
+            'answer': " ".join(h['text'] for h in highlights),
+            'highlights': highlights,
+            'confidence': highlights[0]['score']
+        }
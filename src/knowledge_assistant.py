@@ -3,12 +3,23 @@ Knowledge Assistant
 Classe principale qui orchestre le système RAG
 """
 
+import copy
+import threading
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Tuple
+from .clients import get_client_pool
+from .bundles import IndexMismatchError
 from .config import Config
+from .conversation import ConversationStore, chunk_key
+from .extractive import ANSWER_MODES, ExtractiveAnswerer
+from .model_router import ModelRouter
 from .obsidian_loader import ObsidianLoader
 from .vector_store import VectorStoreManager
+from .shard_manager import ShardManager
 from .rag_chain import RAGChain
+from .scheduler import GenerationScheduler
+from .singleflight import SingleFlight
+from .topics import TOPICS_FILE, TopicIndex, build_topic_index, is_vault_wide
 
 
 class KnowledgeAssistant:
@@ -23,26 +34,104 @@ class KnowledgeAssistant:
         """
         self.config = config
         
-        # Initialiser les composants
-        self.loader = ObsidianLoader(
-            vault_path=config.obsidian_vault_path,
-            chunk_size=config.chunk_size,
-            chunk_overlap=config.chunk_overlap
+        # Clients HTTP partagés par tous les vaults et la chaîne RAG
+        self.client_pool = get_client_pool(
+            max_connections=config.http_max_connections,
+            max_keepalive_connections=config.http_max_keepalive,
+            keepalive_expiry=config.http_keepalive_expiry
         )
+        # Questions identiques en cours, traitées une seule fois
+        self.flights = SingleFlight()
+        # Générations LLM : concurrence limitée, priorités et file équitable par utilisateur
+        self.scheduler = GenerationScheduler(
+            max_concurrency=config.scheduler_max_concurrency,
+            max_queue=config.scheduler_max_queue,
+            batch_concurrency=config.scheduler_batch_concurrency,
+            interactive_deadline_s=config.scheduler_interactive_deadline_s,
+            batch_deadline_s=config.scheduler_batch_deadline_s
+        )
+        
+        # Initialiser les composants : un shard (chargeur + index) par vault
+        self.shards = ShardManager.from_vaults(
+            config.vaults,
+            loader_factory=self._create_loader,
+            manager_factory=self._create_vector_store_manager,
+            memory_budget_mb=config.shard_memory_budget_mb,
+            max_workers=config.search_workers,
+            rebuild_on_mismatch=config.index_mismatch == "rebuild"
+        )
+        
+        # Vault par défaut
+        self.loader = self.shards.default.loader
+        self.vector_store_manager = self.shards.default.manager
+        
+        # Réponses extractives (sans LLM), avec le modèle d'embeddings de l'index
+        self.extractive = ExtractiveAnswerer(
+            self.vector_store_manager.embeddings,
+            max_sentences=config.extractive_max_sentences
+        )
+        
+        # Index de sujets par vault (questions sur tout le vault), construits en arrière-plan
+        self._topics: Dict[str, TopicIndex] = {}
+        self._topics_lock = threading.Lock()
+        self._topics_pending: set = set()
+        self._topics_thread: Optional[threading.Thread] = None
+        
+        # Sessions de conversation : chunks et vecteurs des tours précédents
+        self.conversations: Optional[ConversationStore] = None
+        if config.conversation_memory:
+            self.conversations = ConversationStore(
+                memory_budget_mb=config.conversation_memory_mb,
+                ttl_s=config.conversation_ttl_s
+            )
         
+        self.rag_chain: Optional[RAGChain] = None
+        self.is_initialized = False
+    
+    def _create_loader(self, vault_path: Path) -> ObsidianLoader:
+        """Crée le chargeur d'un vault"""
+        return ObsidianLoader(
+            vault_path=vault_path,
+            chunk_size=self.config.chunk_size,
+            chunk_overlap=self.config.chunk_overlap,
+            include_pdfs=self.config.include_pdfs,
+            cache_dir=self.config.cache_dir if self.config.enable_cache else None,
+            pdf_workers=self.config.pdf_workers,
+            pdf_pages_per_task=self.config.pdf_pages_per_task,
+            pdf_worker_memory_mb=self.config.pdf_worker_memory_mb
+        )
+    
+    def _create_vector_store_manager(self, vault_name: str) -> VectorStoreManager:
+        """Crée le gestionnaire de l'index d'un vault"""
+        config = self.config
         use_ollama = config.llm_provider == "ollama"
         ollama_base_url = getattr(config, 'ollama_base_url', 'http://localhost:11434')
         
-        self.vector_store_manager = VectorStoreManager(
-            store_path=config.vector_store_path,
+        return VectorStoreManager(
+            store_path=config.get_vault_store_path(vault_name),
             embedding_model=config.embedding_model,
             openai_api_key=config.openai_api_key,
             use_ollama=use_ollama,
-            ollama_base_url=ollama_base_url
+            ollama_base_url=ollama_base_url,
+            graph_max_extra=config.graph_max_extra_chunks,
+            graph_time_budget_ms=config.graph_time_budget_ms,
+            graph_link_penalty=config.graph_link_penalty,
+            graph_backlink_penalty=config.graph_backlink_penalty,
+            compact_docstore=config.compact_docstore,
+            snapshot_retention=config.snapshot_retention,
+            index_mmap=config.index_mmap,
+            quantization=config.index_quantization,
+            pca_dim=config.index_pca_dim,
+            rescore_factor=config.rescore_factor,
+            client_pool=self.client_pool,
+            chunk_settings={
+                'chunk_size': config.chunk_size,
+                'chunk_overlap': config.chunk_overlap,
+                'include_pdfs': config.include_pdfs
+            },
+            dedup=config.chunk_dedup,
+            dedup_threshold=config.dedup_threshold
         )
-        
-        self.rag_chain: Optional[RAGChain] = None
-        self.is_initialized = False
     
     def initialize(self, force_rebuild: bool = False) -> bool:
         """
@@ -56,37 +145,46 @@ class KnowledgeAssistant:
         """
         print("🚀 Initialisation du Knowledge Assistant...")
         
-        # Essayer de charger la base vectorielle existante
-        if not force_rebuild and self.vector_store_manager.load_vector_store():
+        # Construire les index absents ; les autres vaults sont chargés à la demande
+        self.shards.ensure_built(force_rebuild=force_rebuild)
+        
+        # Charger la base vectorielle du vault par défaut
+        default = self.shards.default.name
+        try:
+            self.shards.acquire(default)
+            self.shards.release(default)
             print("✅ Base vectorielle existante chargée")
-        else:
+        except IndexMismatchError:
+            raise
+        except ValueError:
             print("🔨 Construction d'une nouvelle base vectorielle...")
-            self._build_vector_store()
+            self.shards.build(default)
         
         # Initialiser la chaîne RAG
         self._initialize_rag_chain()
         
         self.is_initialized = True
+        self.refresh_topics()
         print("✅ Knowledge Assistant initialisé avec succès !")
         return True
     
-    def _build_vector_store(self):
-        """Construit la base vectorielle depuis le vault Obsidian"""
-        # Charger les documents
-        documents = self.loader.load_documents()
-        
-        if not documents:
-            raise ValueError("Aucun document trouvé dans le vault Obsidian")
-        
-        # Créer et sauvegarder la base vectorielle
-        self.vector_store_manager.create_vector_store(documents)
-        self.vector_store_manager.save_vector_store()
-    
     def _initialize_rag_chain(self):
         """Initialise la chaîne RAG"""
         use_ollama = self.config.llm_provider == "ollama"
         ollama_base_url = getattr(self.config, 'ollama_base_url', 'http://localhost:11434')
         
+        router = None
+        if self.config.fast_llm_model:
+            router = ModelRouter(
+                fast_model=self.config.fast_llm_model,
+                large_model=self.config.llm_model,
+                max_distance=self.config.router_max_distance,
+                max_question_words=self.config.router_max_question_words,
+                max_context_chars=self.config.router_max_context_chars,
+                downgrade_queue_depth=self.config.router_downgrade_queue_depth,
+                latency_slo_ms=self.config.router_latency_slo_ms
+            )
+        
         self.rag_chain = RAGChain(
             vector_store=self.vector_store_manager.vector_store,
             model_name=self.config.llm_model,
@@ -95,51 +193,458 @@ class KnowledgeAssistant:
             top_k=self.config.top_k_results,
             openai_api_key=self.config.openai_api_key,
             use_ollama=use_ollama,
-            ollama_base_url=ollama_base_url
+            ollama_base_url=ollama_base_url,
+            retriever=self.shards,
+            retrieval_mode=self.config.retrieval_mode,
+            generation_mode=self.config.generation_mode,
+            keep_alive=self.config.ollama_keep_alive,
+            client_pool=self.client_pool,
+            scheduler=self.scheduler,
+            extractive=self.extractive,
+            router=router
         )
     
-    def ask(self, question: str, include_scores: bool = True) -> Dict[str, Any]:
+    def ask(
+        self,
+        question: str,
+        include_scores: bool = True,
+        vaults: Optional[List[str]] = None,
+        user: Optional[str] = None,
+        priority: str = "interactive",
+        deadline: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+        answer_mode: Optional[str] = None,
+        session_id: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Pose une question au knowledge assistant
         
         Args:
             question: Question de l'utilisateur
             include_scores: Inclure les scores de similarité
+            vaults: Noms des vaults à interroger (tous par défaut)
+            user: Identifiant de l'utilisateur (file équitable de l'ordonnanceur)
+            priority: "interactive" ou "batch"
+            deadline: Échéance (time.monotonic()) pour obtenir un créneau de génération
+            cancel: Événement positionné par l'appelant pour abandonner la requête
+            answer_mode: "generate" (LLM), "extractive" (phrases des notes, sans LLM) ou
+                "auto" (extractive, LLM si la confiance est trop basse) ; défaut : config
+            session_id: Identifiant de la conversation ; une question de suite réutilise
+                les chunks des tours précédents (voir ConversationStore)
+            
+        Returns:
+            Dictionnaire avec la réponse et les métadonnées ('highlights' et
+            'confidence' en plus pour les modes extractive et auto)
+            
+        Raises:
+            AdmissionRejected: File de génération pleine ou échéance impossible à tenir
+            GenerationCancelled: cancel positionné avant la fin de la génération
+        """
+        if not self.is_initialized:
+            raise RuntimeError("Knowledge Assistant non initialisé. Appelez initialize() d'abord.")
+        
+        answer_mode = answer_mode or self.config.answer_mode
+        if answer_mode not in ANSWER_MODES:
+            raise ValueError(f"Mode de réponse inconnu : {answer_mode} (attendu : {', '.join(ANSWER_MODES)})")
+        
+        rag_chain = self.rag_chain
+        options = dict(vaults=vaults, user=user, priority=priority, deadline=deadline, cancel=cancel)
+        overview = self._overview(question, vaults)
+        if overview is not None:
+            # Question sur tout le vault : réponse à partir de l'index de sujets
+            run = lambda: rag_chain.query_overview(
+                question, *overview, user=user, priority=priority, deadline=deadline, cancel=cancel
+            )
+        else:
+            def run():
+                prompt_question, docs_and_scores, query_vector = self._conversation_turn(session_id, question, vaults)
+                if answer_mode != "generate":
+                    min_confidence = self.config.extractive_min_confidence if answer_mode == "auto" else None
+                    return rag_chain.query_extractive(
+                        prompt_question, min_confidence=min_confidence,
+                        docs_and_scores=docs_and_scores, query_vector=query_vector, **options
+                    )
+                if include_scores:
+                    return rag_chain.query_with_scores(prompt_question, docs_and_scores=docs_and_scores, **options)
+                return rag_chain.query(prompt_question, docs_and_scores=docs_and_scores, **options)
+        
+        # Une requête annulable n'est pas partagée : son annulation ne doit pas toucher les autres appelants
+        if not self.config.request_coalescing or cancel is not None:
+            return run()
+        
+        # Chaque appelant reçoit sa propre copie (profonde : listes sources et documents comprises)
+        key = self._flight_key(
+            'ask', question, vaults, priority, deadline,
+            include_scores, answer_mode, self._session_key(session_id)
+        )
+        return copy.deepcopy(self.flights.do(key, run))
+    
+    def ask_stream(
+        self,
+        question: str,
+        vaults: Optional[List[str]] = None,
+        user: Optional[str] = None,
+        priority: str = "interactive",
+        deadline: Optional[float] = None,
+        session_id: Optional[str] = None,
+        answer_mode: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Pose une question en diffusant la réponse au fil de la génération
+        
+        Fermer l'itérateur (lecteur parti) interrompt la génération, une fois
+        que tous les appelants partageant le flux l'ont fermé. Une réponse
+        extractive n'est pas diffusée : elle arrive d'un bloc dans l'événement
+        'response' ; seule la génération (ou le repli du mode "auto") l'est.
+        
+        Args:
+            question: Question de l'utilisateur
+            vaults: Noms des vaults à interroger (tous par défaut)
+            user, priority, deadline, session_id, answer_mode: Voir ask()
             
         Returns:
-            Dictionnaire avec la réponse et les métadonnées
+            Itérateur d'événements {'type': 'token', 'text': ...}, puis
+            {'type': 'response', 'response': ...} avec la réponse complète
+            
+        Raises:
+            ValueError: Mode de réponse inconnu
         """
         if not self.is_initialized:
             raise RuntimeError("Knowledge Assistant non initialisé. Appelez initialize() d'abord.")
         
-        if include_scores:
-            return self.rag_chain.query_with_scores(question)
+        answer_mode = answer_mode or self.config.answer_mode
+        if answer_mode not in ANSWER_MODES:
+            raise ValueError(f"Mode de réponse inconnu : {answer_mode} (attendu : {', '.join(ANSWER_MODES)})")
+        
+        rag_chain = self.rag_chain
+        overview = self._overview(question, vaults)
+        if overview is not None:
+            run = lambda cancel: rag_chain.stream_query_overview(
+                question, *overview, user=user, priority=priority, deadline=deadline, cancel=cancel
+            )
+        else:
+            def run(cancel):
+                prompt_question, docs_and_scores, query_vector = self._conversation_turn(session_id, question, vaults)
+                if answer_mode != "generate":
+                    min_confidence = self.config.extractive_min_confidence if answer_mode == "auto" else None
+                    return rag_chain.stream_query_extractive(
+                        prompt_question, vaults=vaults, min_confidence=min_confidence, user=user,
+                        priority=priority, deadline=deadline, cancel=cancel,
+                        docs_and_scores=docs_and_scores, query_vector=query_vector
+                    )
+                return rag_chain.stream_query_with_scores(
+                    prompt_question, vaults=vaults, user=user, priority=priority, deadline=deadline,
+                    cancel=cancel, docs_and_scores=docs_and_scores
+                )
+        
+        if not self.config.request_coalescing:
+            return run(None)
+        key = self._flight_key('stream', question, vaults, priority, deadline, answer_mode, self._session_key(session_id))
+        return self.flights.stream(key, run)
+    
+    def _conversation_turn(
+        self,
+        session_id: Optional[str],
+        question: str,
+        vaults: Optional[List[str]]
+    ) -> Tuple[str, Optional[List[tuple]], Optional[List[float]]]:
+        """
+        Récupère les chunks d'une question dans le contexte de sa conversation
+        
+        Args:
+            session_id: Identifiant de la conversation (None = question isolée)
+            question: Question de l'utilisateur
+            vaults: Noms des vaults à interroger
+            
+        Returns:
+            Tuple (question pour le prompt, documents avec scores, vecteur de la question) ;
+            (question, None, None) sans conversation : la chaîne RAG fait sa recherche habituelle
+        """
+        if session_id is None or self.conversations is None:
+            return question, None, None
+        
+        session = self.conversations.get(session_id)
+        with session.lock:
+            previous = session.previous_questions()
+        query_vector = self.shards.embed_query(question)
+        if self.config.retrieval_mode == "graph":
+            search = lambda vector, k: self.shards.similarity_search_with_links_by_vector(vector, k=k, vaults=vaults)
         else:
-            return self.rag_chain.query(question)
+            search = lambda vector, k: self.shards.similarity_search_by_vector(vector, k=k, vaults=vaults)
+        
+        docs_and_scores, follow_up = self.conversations.retrieve(
+            session, question, query_vector, search,
+            lambda docs: self.shards.vectors_by_ids([chunk_key(doc) for doc in docs]),
+            k=self.config.top_k_results,
+            vaults=vaults
+        )
+        if follow_up:
+            # Le LLM voit aussi les questions précédentes : "it" ou "and RMSE?" restent compréhensibles
+            question = f"{question}\n(Follow-up to: {' / '.join(previous)})"
+        return question, docs_and_scores, query_vector
+    
+    def _session_key(self, session_id: Optional[str]) -> Optional[str]:
+        """Conversation dans la clé de coalescence : la réponse dépend des tours précédents"""
+        return session_id if self.conversations is not None else None
+    
+    def end_conversation(self, session_id: str):
+        """Oublie les tours précédents d'une conversation (nouvelle conversation)"""
+        if self.conversations is not None:
+            self.conversations.end(session_id)
+    
+    def _overview(self, question: str, vaults: Optional[List[str]]) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Contexte de l'index de sujets pour une question sur tout le vault
+        
+        Args:
+            question: Question de l'utilisateur
+            vaults: Noms des vaults à interroger (tous par défaut)
+            
+        Returns:
+            Tuple (contexte, sources), ou None si la question est ciblée ou si
+            aucun index de sujets n'est encore disponible (recherche top-k)
+        """
+        if not self.config.topic_index or not is_vault_wide(question):
+            return None
+        
+        indexes = [(name, self.get_topic_index(name)) for name in (vaults or self.shards.shards)]
+        indexes = [(name, index) for name, index in indexes if index is not None and index.clusters]
+        if not indexes:
+            return None
+        
+        contexts = []
+        sources = []
+        for name, index in indexes:
+            context = index.overview_context(max_chars=self.config.topic_context_chars // len(indexes))
+            contexts.append(f"Vault: {name}\n\n{context}" if len(indexes) > 1 else context)
+            for cluster in index.clusters:
+                titles = [index.summaries[s]['title'] for s in cluster['notes'] if s in index.summaries]
+                sources.append({
+                    'source': cluster['label'],
+                    'file_name': cluster['label'],
+                    'vault': name,
+                    'score': 0.0,
+                    'tags': [],
+                    'links': cluster['notes'][:5],
+                    'preview': f"{len(cluster['notes'])} notes : {', '.join(titles[:8])}"
+                })
+        return "\n\n".join(contexts), sources
+    
+    def get_topic_index(self, vault: str) -> Optional[TopicIndex]:
+        """
+        Index de sujets d'un vault (chargé depuis le disque au premier appel)
+        
+        Args:
+            vault: Nom du vault
+            
+        Returns:
+            Index de sujets, ou None s'il n'a pas encore été construit
+        """
+        index = self._topics.get(vault)
+        if index is None:
+            index = TopicIndex.load(self._topics_path(vault))
+            if index is not None:
+                self._topics[vault] = index
+        return index
+    
+    def _topics_path(self, vault: str) -> Path:
+        return self.shards.shards[vault].manager.store_path / TOPICS_FILE
+    
+    def refresh_topics(self, vaults: Optional[Iterable[str]] = None):
+        """
+        Met à jour les index de sujets en arrière-plan
+        
+        Un index déjà construit pour le snapshot publié est conservé ; sinon
+        les chunks sont regroupés à nouveau, et seules les notes modifiées
+        sont résumées (générations en priorité batch). En attendant, les
+        questions sur tout le vault passent par la recherche top-k.
+        
+        Args:
+            vaults: Noms des vaults (tous par défaut)
+        """
+        if not self.config.topic_index:
+            return
+        
+        with self._topics_lock:
+            self._topics_pending.update(vaults or self.shards.shards)
+            if self._topics_thread is None:
+                self._topics_thread = threading.Thread(target=self._refresh_topics_worker, daemon=True, name="topic-index")
+                self._topics_thread.start()
+    
+    def _refresh_topics_worker(self):
+        while True:
+            with self._topics_lock:
+                if not self._topics_pending:
+                    self._topics_thread = None
+                    return
+                name = self._topics_pending.pop()
+            try:
+                self._build_topics(name)
+            except Exception as e:
+                print(f"⚠️ Index de sujets du vault '{name}' non construit : {e}")
+    
+    def _build_topics(self, name: str):
+        """Construit l'index de sujets d'un vault s'il ne correspond plus au snapshot chargé"""
+        previous = self.get_topic_index(name)
+        
+        # Une seule référence : la version du snapshot dont les chunks sont lus
+        manager = self.shards.acquire(name)
+        try:
+            version = manager.current_version
+            if previous is not None and previous.index_version == version:
+                return
+            documents = manager.all_documents()
+            vectors = manager.full_precision_vectors()
+        finally:
+            self.shards.release(name)
+        
+        print(f"🗂️ Construction de l'index de sujets du vault '{name}'...")
+        rag_chain = self.rag_chain
+        index = build_topic_index(
+            documents,
+            vectors,
+            generate=lambda prompt: rag_chain.complete(prompt, user="topic-index"),
+            previous=previous,
+            n_clusters=self.config.topic_clusters,
+            index_version=version
+        )
+        index.save(self._topics_path(name))
+        self._topics[name] = index
+    
+    @staticmethod
+    def _flight_key(
+        kind: str,
+        question: str,
+        vaults: Optional[List[str]],
+        priority: str,
+        deadline: Optional[float],
+        *options
+    ) -> tuple:
+        """
+        Clé de coalescence : question normalisée (casse, espaces), filtres et admission
+        
+        Les appelants qui rejoignent une exécution partagent le créneau du meneur :
+        la priorité et la présence d'une échéance font partie de la clé, pour
+        qu'une requête interactive n'attende pas au rang batch et qu'une requête
+        sans échéance ne reçoive pas le refus d'admission d'un meneur qui en a une.
+        """
+        normalized = " ".join(question.casefold().split())
+        return (kind, normalized, tuple(sorted(vaults or ())), priority, deadline is not None, *options)
     
-    def rebuild_index(self):
-        """Reconstruit l'index de la base vectorielle"""
+    def rebuild_index(self, vault: Optional[str] = None):
+        """
+        Reconstruit l'index de la base vectorielle
+        
+        Les requêtes continuent d'être servies par l'index actuel pendant la
+        reconstruction ; le nouveau snapshot le remplace une fois publié.
+        
+        Args:
+            vault: Nom du vault à reconstruire (tous par défaut)
+        """
         print("🔄 Reconstruction de l'index de la base vectorielle...")
-        self.vector_store_manager.clear_vector_store()
-        self._build_vector_store()
-        self._initialize_rag_chain()
+        names = [vault] if vault else list(self.shards.shards)
+        for name in names:
+            self.shards.build(name)
+        # Le ShardManager sert déjà les nouveaux snapshots : la chaîne RAG (routeur,
+        # caches de préfixe, prompt personnalisé) est conservée
+        if self.rag_chain is None:
+            self._initialize_rag_chain()
+        else:
+            self.rag_chain.update_vector_store(self.vector_store_manager.vector_store)
+        self.refresh_topics(names)
         print("✅ Index reconstruit avec succès !")
     
+    def rollback_index(self, vault: Optional[str] = None, version: Optional[str] = None) -> bool:
+        """
+        Restaure un snapshot précédent de l'index
+        
+        Args:
+            vault: Nom du vault (vault par défaut si omis)
+            version: Version à restaurer (par défaut : la précédente)
+            
+        Returns:
+            True si le snapshot a été restauré
+        """
+        shard = self.shards.shards[vault] if vault else self.shards.default
+        return shard.manager.rollback(version)
+    
+    def export_index_bundle(self, path: Path, vault: Optional[str] = None, compression: str = "gz") -> Dict[str, Any]:
+        """
+        Exporte l'index publié d'un vault dans une archive unique
+        
+        Args:
+            path: Fichier d'archive à créer
+            vault: Nom du vault (vault par défaut si omis)
+            compression: "gz", "xz" ou "bz2"
+            
+        Returns:
+            Manifeste du bundle (modèle, dimension, chunking, empreinte du vault, sommes de contrôle)
+        """
+        shard = self.shards.shards[vault] if vault else self.shards.default
+        return shard.manager.export_bundle(Path(path), compression=compression)
+    
+    def import_index_bundle(self, path: Path, vault: Optional[str] = None, force: bool = False) -> str:
+        """
+        Importe une archive d'index dans un vault et la publie
+        
+        Args:
+            path: Fichier d'archive
+            vault: Nom du vault (vault par défaut si omis)
+            force: Importer malgré un modèle ou des paramètres de chunking différents
+            
+        Returns:
+            Version du snapshot importé
+            
+        Raises:
+            IndexMismatchError: Bundle construit avec une autre configuration (sans force)
+        """
+        name = vault or self.shards.default.name
+        version = self.shards.import_bundle(name, Path(path), force=force)
+        if self.is_initialized:
+            self.refresh_topics([name])
+        return version
+    
+    def benchmark_quantization(self, vault: Optional[str] = None, queries: Optional[List[str]] = None, **kwargs) -> List[Dict[str, Any]]:
+        """
+        Compare les modes de quantification de l'index d'un vault à l'index plat
+        
+        Args:
+            vault: Nom du vault (vault par défaut si omis)
+            queries: Requêtes de test (par défaut : générées à partir de l'index)
+            **kwargs: Options de VectorStoreManager.benchmark_quantization
+            
+        Returns:
+            Une ligne par configuration : mémoire, latence et recall@k
+        """
+        name = vault or self.shards.default.name
+        manager = self.shards.acquire(name)
+        try:
+            return manager.benchmark_quantization(queries=queries, **kwargs)
+        finally:
+            self.shards.release(name)
+    
     def get_vault_stats(self) -> Dict[str, Any]:
-        """Obtient les statistiques du vault Obsidian"""
-        return self.loader.get_vault_stats()
+        """Obtient les statistiques des vaults Obsidian"""
+        per_vault = {name: shard.loader.get_vault_stats() for name, shard in self.shards.shards.items()}
+        
+        stats = dict(self.loader.get_vault_stats())
+        stats['total_files'] = sum(v['total_files'] for v in per_vault.values())
+        stats['total_size_mb'] = sum(v['total_size_mb'] for v in per_vault.values())
+        stats['vaults'] = per_vault
+        return stats
     
     def get_vector_store_stats(self) -> Dict[str, Any]:
-        """Obtient les statistiques de la base vectorielle"""
-        return self.vector_store_manager.get_stats()
+        """Obtient les statistiques des bases vectorielles"""
+        return self.shards.get_stats()
     
-    def search_documents(self, query: str, k: int = 5) -> list:
+    def search_documents(self, query: str, k: int = 5, vaults: Optional[List[str]] = None) -> list:
         """
         Recherche des documents pertinents
         
         Args:
             query: Requête de recherche
             k: Nombre de résultats
+            vaults: Noms des vaults à interroger (tous par défaut)
             
         Returns:
             Liste de documents pertinents
@@ -147,13 +652,14 @@ class KnowledgeAssistant:
         if not self.is_initialized:
             raise RuntimeError("Knowledge Assistant non initialisé")
         
-        docs_and_scores = self.vector_store_manager.similarity_search(query, k=k)
+        docs_and_scores = self.shards.similarity_search(query, k=k, vaults=vaults)
         
         results = []
         for doc, score in docs_and_scores:
             results.append({
                 'content': doc.page_content,
                 'source': doc.metadata.get('source', 'Inconnu'),
+                'vault': doc.metadata.get('vault'),
                 'score': float(score),
                 'metadata': doc.metadata
             })
@@ -175,11 +681,22 @@ class KnowledgeAssistant:
         return {
             'initialized': self.is_initialized,
             'vault_path': str(self.config.obsidian_vault_path),
+            'vaults': list(self.config.vaults),
             'vault_stats': self.get_vault_stats() if self.is_initialized else {},
             'vector_store_stats': self.get_vector_store_stats() if self.is_initialized else {},
             'config': {
                 'llm_model': self.config.llm_model,
+                'fast_llm_model': self.config.fast_llm_model,
                 'embedding_model': self.config.embedding_model,
-                'top_k': self.config.top_k_results
-            }
+                'top_k': self.config.top_k_results,
+                'retrieval_mode': self.config.retrieval_mode,
+                'generation_mode': self.config.generation_mode,
+                'answer_mode': self.config.answer_mode
+            },
+            'coalescing': self.flights.get_stats(),
+            'scheduler': self.scheduler.get_stats(),
+            'topics': {name: index.get_stats() for name, index in self._topics.items()},
+            'conversations': self.conversations.get_stats() if self.conversations else {},
+            'routing': self.rag_chain.router.get_stats() if self.rag_chain and self.rag_chain.router else {},
+            'http_pool': self.client_pool.get_stats()
         }
\ No newline at end of file
@@ -0,0 +1,211 @@
+"""
+Graphe de liens du vault
+Index d'adjacence CSR (NumPy) construit à partir des liens wiki [[...]]
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+class LinkGraph:
+    """Graphe des liens entre notes, stocké au format CSR"""
+
+    FILE_NAME = "link_graph.npz"
+
+    def __init__(
+        self,
+        files: List[str],
+        link_indptr: np.ndarray,
+        link_indices: np.ndarray,
+        chunk_indptr: np.ndarray,
+        chunk_indices: np.ndarray
+    ):
+        """
+        Initialise le graphe
+
+        Args:
+            files: Sources des notes (chemins relatifs au vault), indexées par ID
+            link_indptr: Pointeurs CSR des liens sortants (taille len(files) + 1)
+            link_indices: IDs des notes cibles des liens sortants
+            chunk_indptr: Pointeurs CSR note -> positions des chunks dans l'index FAISS
+            chunk_indices: Positions FAISS des chunks de chaque note
+        """
+        self.files = list(files)
+        self.file_ids = {source: i for i, source in enumerate(self.files)}
+        self.link_indptr = link_indptr.astype(np.int64)
+        self.link_indices = link_indices.astype(np.int32)
+        self.chunk_indptr = chunk_indptr.astype(np.int64)
+        self.chunk_indices = chunk_indices.astype(np.int64)
+
+        # Transposée : liens entrants (backlinks)
+        self.backlink_indptr, self.backlink_indices = self._transpose(
+            self.link_indptr, self.link_indices, len(self.files)
+        )
+
+        # Inverse : position FAISS -> ID de note
+        num_chunks = int(self.chunk_indices.max()) + 1 if len(self.chunk_indices) else 0
+        self.chunk_file = np.full(num_chunks, -1, dtype=np.int32)
+        for file_id in range(len(self.files)):
+            start, end = self.chunk_indptr[file_id], self.chunk_indptr[file_id + 1]
+            self.chunk_file[self.chunk_indices[start:end]] = file_id
+
+    @classmethod
+    def from_vector_store(cls, vector_store) -> "LinkGraph":
+        """
+        Construit le graphe à partir des chunks d'une base vectorielle FAISS
+
+        Args:
+            vector_store: Base vectorielle FAISS (LangChain)
+
+        Returns:
+            Graphe de liens
+        """
+        files: List[str] = []
+        file_ids: Dict[str, int] = {}
+        file_names: Dict[int, str] = {}
+        raw_links: Dict[int, set] = {}
+        chunk_owner: List[int] = []
+        chunk_position: List[int] = []
+
+        for position in range(vector_store.index.ntotal):
+            doc = vector_store.docstore.search(vector_store.index_to_docstore_id[position])
+            metadata = getattr(doc, 'metadata', {}) or {}
+            source = metadata.get('source', '')
+
+            # Un chunk dédoublonné appartient à toutes les notes de 'sources'
+            for owner in metadata.get('sources') or [source]:
+                if owner not in file_ids:
+                    file_ids[owner] = len(files)
+                    files.append(owner)
+                    name = metadata.get('file_name') if owner == source else None
+                    file_names[file_ids[owner]] = name or Path(owner).stem
+                    raw_links[file_ids[owner]] = set()
+
+                file_id = file_ids[owner]
+                raw_links[file_id].update(metadata.get('links', []))
+                chunk_owner.append(file_id)
+                chunk_position.append(position)
+
+        # Résolution des noms de liens vers les notes
+        resolver = cls._build_resolver(files, file_names)
+        sources, targets = [], []
+        for file_id, links in raw_links.items():
+            for link in links:
+                target = resolver.get(cls._normalize_link(link))
+                if target is not None and target != file_id:
+                    sources.append(file_id)
+                    targets.append(target)
+
+        link_indptr, link_indices = cls._to_csr(
+            np.array(sources, dtype=np.int64), np.array(targets, dtype=np.int64), len(files)
+        )
+        owners = np.array(chunk_owner, dtype=np.int64)
+        chunk_indptr, chunk_indices = cls._to_csr(
+            owners, np.array(chunk_position, dtype=np.int64), len(files)
+        )
+
+        return cls(files, link_indptr, link_indices, chunk_indptr, chunk_indices)
+
+    @staticmethod
+    def _normalize_link(link: str) -> str:
+        """Normalise un lien wiki (sans ancre, bloc ni extension)"""
+        link = link.split('#')[0].split('^')[0].strip()
+        if link.lower().endswith('.md'):
+            link = link[:-3]
+        return link.replace('\\', '/').lower()
+
+    @classmethod
+    def _build_resolver(cls, files: List[str], file_names: Dict[int, str]) -> Dict[str, int]:
+        """
+        Associe les noms de liens possibles aux IDs de notes
+
+        Les chemins relatifs sont prioritaires sur les noms de fichiers seuls,
+        comme dans Obsidian.
+        """
+        resolver: Dict[str, int] = {}
+        for file_id, name in file_names.items():
+            resolver.setdefault(name.lower(), file_id)
+        for file_id, source in enumerate(files):
+            resolver[cls._normalize_link(source)] = file_id
+        return resolver
+
+    @staticmethod
+    def _to_csr(rows: np.ndarray, cols: np.ndarray, num_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Convertit une liste d'arêtes (rows, cols) en tableaux CSR"""
+        if len(rows):
+            edges = np.unique(np.stack([rows, cols], axis=1), axis=0)
+            rows, cols = edges[:, 0], edges[:, 1]
+        indptr = np.zeros(num_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=num_rows), out=indptr[1:])
+        return indptr, cols.astype(np.int64)
+
+    @classmethod
+    def _transpose(cls, indptr: np.ndarray, indices: np.ndarray, num_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Transpose un graphe CSR"""
+        rows = np.repeat(np.arange(num_rows, dtype=np.int64), np.diff(indptr))
+        return cls._to_csr(indices.astype(np.int64), rows, num_rows)
+
+    def neighbors(self, file_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Retourne les voisins à 1 saut d'une note
+
+        Args:
+            file_id: ID de la note
+
+        Returns:
+            Tuple (liens sortants, backlinks) sous forme de tableaux d'IDs
+        """
+        links = self.link_indices[self.link_indptr[file_id]:self.link_indptr[file_id + 1]]
+        backlinks = self.backlink_indices[self.backlink_indptr[file_id]:self.backlink_indptr[file_id + 1]]
+        return links, backlinks
+
+    def chunks_of(self, file_id: int) -> np.ndarray:
+        """Retourne les positions FAISS des chunks d'une note"""
+        return self.chunk_indices[self.chunk_indptr[file_id]:self.chunk_indptr[file_id + 1]]
+
+    def file_of(self, position: int) -> int:
+        """Retourne l'ID de la note d'un chunk (-1 si inconnu)"""
+        if 0 <= position < len(self.chunk_file):
+            return int(self.chunk_file[position])
+        return -1
+
+    def save(self, directory: Path):
+        """Sauvegarde le graphe dans un fichier .npz"""
+        np.savez_compressed(
+            Path(directory) / self.FILE_NAME,
+            files=np.array(self.files, dtype=str),
+            link_indptr=self.link_indptr,
+            link_indices=self.link_indices,
+            chunk_indptr=self.chunk_indptr,
+            chunk_indices=self.chunk_indices
+        )
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["LinkGraph"]:
+        """
+        Charge le graphe depuis le disque
+
+        Returns:
+            Graphe de liens, ou None si le fichier n'existe pas
+        """
+        path = Path(directory) / cls.FILE_NAME
+        if not path.exists():
+            return None
+
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                files=data['files'].tolist(),
+                link_indptr=data['link_indptr'],
+                link_indices=data['link_indices'],
+                chunk_indptr=data['chunk_indptr'],
+                chunk_indices=data['chunk_indices']
+            )
+
+    def get_stats(self) -> Dict[str, int]:
+        """Statistiques du graphe"""
+        return {
+            'num_notes': len(self.files),
+            'num_links': int(len(self.link_indices)),
+            'num_chunks': int(len(self.chunk_indices))
+        }
@@ -0,0 +1,789 @@
+"""
+Test de charge
+Serveurs locaux imitant les API Ollama et OpenAI, et utilisateurs simulés
+(boucle ouverte ou fermée) sur ask, search_documents et rebuild_index
+
+Usage :
+    python -m src.load_test --users 20 --duration 60
+    python -m src.load_test --arrival open --rate 5 --mix ask=8,search=2,rebuild=0.05 --token-rate 30
+    python -m src.load_test --backend real --users 4 --duration 120 --output charge.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+
+try:
+    import psutil
+except ImportError:  # Optionnel : /proc sous Linux, sinon pic mémoire seulement
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows : pas de getrusage
+    resource = None
+
+
+OPERATIONS = ("ask", "search", "rebuild")
+ARRIVALS = ("closed", "open")
+
+_WORD = re.compile(r'\w+')
+
+
+@lru_cache(maxsize=65536)
+def _word_bucket(word: str, dim: int):
+    """Composante (indice, signe) d'un mot dans le vecteur haché"""
+    value = int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+    return value % dim, 1.0 if (value >> 63) & 1 else -1.0
+
+
+class FakeModelServer:
+    """
+    Serveur HTTP local imitant Ollama et OpenAI (embeddings et génération)
+
+    Points d'accès : /api/embed, /api/embeddings, /api/generate, /api/chat,
+    /api/tags (Ollama) et /v1/embeddings, /v1/chat/completions (OpenAI),
+    en flux ou non. Les embeddings sont des sacs de mots hachés (des textes
+    proches ont des vecteurs proches, la recherche reste pertinente) ; les
+    réponses reprennent des mots du prompt. Latences et débit de tokens sont
+    configurables, et au plus max_parallel requêtes par modèle sont servies
+    en même temps, comme OLLAMA_NUM_PARALLEL : les autres attendent.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        embedding_dim: int = 768,
+        embed_latency_ms: float = 20.0,
+        embed_per_text_ms: float = 2.0,
+        first_token_ms: float = 300.0,
+        tokens_per_s: float = 40.0,
+        response_tokens: int = 120,
+        max_parallel: int = 4,
+        error_rate: float = 0.0,
+        seed: int = 0
+    ):
+        """
+        Initialise le serveur (démarré par start())
+
+        Args:
+            host: Adresse d'écoute
+            port: Port d'écoute (0 = port libre choisi par le système)
+            embedding_dim: Dimension des embeddings
+            embed_latency_ms: Latence fixe d'une requête d'embeddings
+            embed_per_text_ms: Latence supplémentaire par texte embarqué
+            first_token_ms: Délai avant le premier token (évaluation du prompt)
+            tokens_per_s: Débit de génération
+            response_tokens: Nombre de tokens par réponse (borné par num_predict / max_tokens)
+            max_parallel: Requêtes servies simultanément par modèle (embeddings, génération)
+            error_rate: Proportion de requêtes en erreur 500
+            seed: Graine des erreurs injectées
+        """
+        self.embedding_dim = embedding_dim
+        self.embed_latency_ms = embed_latency_ms
+        self.embed_per_text_ms = embed_per_text_ms
+        self.first_token_ms = first_token_ms
+        self.tokens_per_s = tokens_per_s
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+        self._slots = {
+            'embed': threading.BoundedSemaphore(max(1, max_parallel)),
+            'generate': threading.BoundedSemaphore(max(1, max_parallel))
+        }
+        self._lock = threading.Lock()
+        self.requests: Dict[str, int] = {}
+        self.injected_errors = 0
+        self._active = {'embed': 0, 'generate': 0}
+        self.peak_active = {'embed': 0, 'generate': 0}
+
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """URL de base du serveur"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeModelServer":
+        """Démarre le serveur dans un thread dédié"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="fake-model-server")
+        self._thread.start()
+        print(f"🧪 Serveur de modèles simulé sur {self.url}")
+        return self
+
+    def stop(self):
+        """Arrête le serveur"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeModelServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def embed(self, text: str) -> List[float]:
+        """Embedding déterministe d'un texte (sac de mots haché, normalisé)"""
+        vector = np.zeros(self.embedding_dim, dtype=np.float32)
+        vector[0] = 1e-3
+        for word in _WORD.findall(text.casefold()):
+            index, sign = _word_bucket(word, self.embedding_dim)
+            vector[index] += sign
+        vector /= np.linalg.norm(vector)
+        return vector.tolist()
+
+    def tokens(self, prompt: str, limit: Optional[int] = None) -> List[str]:
+        """Tokens de la réponse : mots du prompt tirés de façon déterministe"""
+        words = _WORD.findall(prompt)[-400:] or ["réponse"]
+        count = self.response_tokens if not limit or limit <= 0 else min(self.response_tokens, limit)
+        rng = random.Random(prompt)
+        return [" " + rng.choice(words) for _ in range(count)]
+
+    def generation_delays(self, count: int):
+        """Délais avant chaque token (premier token, puis débit constant)"""
+        yield self.first_token_ms / 1000
+        for _ in range(count - 1):
+            yield 1.0 / self.tokens_per_s if self.tokens_per_s > 0 else 0.0
+
+    def embed_delay(self, count: int) -> float:
+        """Durée d'une requête d'embeddings de count textes"""
+        return (self.embed_latency_ms + self.embed_per_text_ms * count) / 1000
+
+    def _enter(self, endpoint: str, model: str) -> bool:
+        """Compte la requête, attend un créneau du modèle ; False si une erreur doit être injectée"""
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            if self.error_rate > 0 and self._random.random() < self.error_rate:
+                self.injected_errors += 1
+                return False
+        self._slots[model].acquire()
+        with self._lock:
+            self._active[model] += 1
+            self.peak_active[model] = max(self.peak_active[model], self._active[model])
+        return True
+
+    def _leave(self, model: str):
+        with self._lock:
+            self._active[model] -= 1
+        self._slots[model].release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Requêtes servies par point d'accès, parallélisme maximal atteint et erreurs injectées"""
+        with self._lock:
+            return {
+                'requests': dict(self.requests),
+                'peak_parallel': dict(self.peak_active),
+                'injected_errors': self.injected_errors
+            }
+
+
+def _openai_inputs(value: Any) -> List[str]:
+    """Entrées de /v1/embeddings : texte, liste de textes ou de tokens (OpenAIEmbeddings découpe avec tiktoken)"""
+    if isinstance(value, str):
+        return [value]
+    if value and all(isinstance(item, int) for item in value):
+        return [" ".join(map(str, value))]
+    return [item if isinstance(item, str) else " ".join(map(str, item)) for item in value]
+
+
+def _make_handler(model: FakeModelServer):
+    """Classe de gestionnaire HTTP liée au serveur simulé"""
+
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive, comme Ollama : le pool httpx réutilise ses connexions
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, payload: Dict[str, Any], status: int = 200):
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _start_stream(self, content_type: str):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+        def _send_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+            self.wfile.flush()
+
+        def _end_stream(self):
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path in ("/", "/api/version"):
+                self._send_json({'version': "0.0.0-loadtest"})
+            elif self.path == "/api/tags":
+                self._send_json({'models': []})
+            else:
+                self._send_json({'error': f"not found: {self.path}"}, 404)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            routes: Dict[str, Callable[[Dict[str, Any]], None]] = {
+                "/api/embed": self._ollama_embed,
+                "/api/embeddings": self._ollama_embed,
+                "/api/generate": self._ollama_generate,
+                "/api/chat": self._ollama_generate,
+                "/v1/embeddings": self._openai_embed,
+                "/v1/chat/completions": self._openai_chat
+            }
+            route = routes.get(self.path.split("?")[0])
+            if route is None:
+                self._send_json({'error': f"not found: {self.path}"}, 404)
+                return
+
+            kind = 'embed' if 'embed' in self.path else 'generate'
+            if not model._enter(self.path, kind):
+                self._send_json({'error': "erreur injectée par le test de charge"}, 500)
+                return
+            try:
+                route(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # Client parti (génération annulée) : le créneau est libéré
+                pass
+            finally:
+                model._leave(kind)
+
+        def _ollama_embed(self, body: Dict[str, Any]):
+            legacy = self.path == "/api/embeddings"
+            texts = body.get('input', body.get('prompt', ""))
+            texts = [texts] if isinstance(texts, str) else list(texts)
+            time.sleep(model.embed_delay(len(texts)))
+            vectors = [model.embed(text) for text in texts]
+            if legacy:
+                self._send_json({'embedding': vectors[0]})
+            else:
+                self._send_json({'model': body.get('model'), 'embeddings': vectors, 'prompt_eval_count': len(texts)})
+
+        def _ollama_generate(self, body: Dict[str, Any]):
+            chat = self.path == "/api/chat"
+            prompt = " ".join(m.get('content', "") for m in body.get('messages', [])) if chat else body.get('prompt', "")
+            tokens = model.tokens(prompt, (body.get('options') or {}).get('num_predict'))
+            base = {'model': body.get('model'), 'created_at': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+
+            def part(text: str, done: bool) -> Dict[str, Any]:
+                content = {'message': {'role': "assistant", 'content': text}} if chat else {'response': text}
+                extra = {'done_reason': "stop", 'prompt_eval_count': len(_WORD.findall(prompt)),
+                         'eval_count': len(tokens)} if done else {}
+                return {**base, **content, 'done': done, **extra}
+
+            if not body.get('stream', True):
+                time.sleep(sum(model.generation_delays(len(tokens))))
+                self._send_json(part("".join(tokens), True))
+                return
+
+            self._start_stream("application/x-ndjson")
+            for token, delay in zip(tokens, model.generation_delays(len(tokens))):
+                time.sleep(delay)
+                self._send_chunk(json.dumps(part(token, False)).encode('utf-8') + b"\n")
+            self._send_chunk(json.dumps(part("", True)).encode('utf-8') + b"\n")
+            self._end_stream()
+
+        def _openai_embed(self, body: Dict[str, Any]):
+            texts = _openai_inputs(body.get('input', ""))
+            time.sleep(model.embed_delay(len(texts)))
+            self._send_json({
+                'object': "list",
+                'model': body.get('model'),
+                'data': [
+                    {'object': "embedding", 'index': i, 'embedding': model.embed(text)}
+                    for i, text in enumerate(texts)
+                ],
+                'usage': {'prompt_tokens': 0, 'total_tokens': 0}
+            })
+
+        def _openai_chat(self, body: Dict[str, Any]):
+            prompt = " ".join(str(m.get('content', "")) for m in body.get('messages', []))
+            tokens = model.tokens(prompt, body.get('max_tokens') or body.get('max_completion_tokens'))
+            base = {'id': "chatcmpl-loadtest", 'created': int(time.time()), 'model': body.get('model')}
+
+            if not body.get('stream'):
+                time.sleep(sum(model.generation_delays(len(tokens))))
+                self._send_json({
+                    **base,
+                    'object': "chat.completion",
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': "assistant", 'content': "".join(tokens)},
+                        'finish_reason': "stop"
+                    }],
+                    'usage': {'prompt_tokens': 0, 'completion_tokens': len(tokens), 'total_tokens': len(tokens)}
+                })
+                return
+
+            def event(delta: Dict[str, Any], finish: Optional[str] = None) -> bytes:
+                chunk = {**base, 'object': "chat.completion.chunk",
+                         'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish}]}
+                return f"data: {json.dumps(chunk)}\n\n".encode('utf-8')
+
+            self._start_stream("text/event-stream")
+            for i, (token, delay) in enumerate(zip(tokens, model.generation_delays(len(tokens)))):
+                time.sleep(delay)
+                self._send_chunk(event({'role': "assistant", 'content': token} if i == 0 else {'content': token}))
+            self._send_chunk(event({}, "stop"))
+            self._send_chunk(b"data: [DONE]\n\n")
+            self._end_stream()
+
+    return Handler
+
+
+def _memory_mb() -> Optional[float]:
+    """Mémoire résidente actuelle du processus (Mo), None sans psutil ni /proc"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _peak_memory_mb() -> Optional[float]:
+    """Pic de mémoire résidente du processus (Mo), None si indisponible"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Octets sous macOS, kilo-octets sous Linux
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+    return None
+
+
+def _percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+class LoadTest:
+    """
+    Charge d'utilisateurs simultanés sur un KnowledgeAssistant initialisé
+
+    En boucle fermée, chaque utilisateur enchaîne ses requêtes, séparées par
+    un temps de réflexion : le débit s'adapte à la latence du système. En
+    boucle ouverte, les requêtes arrivent selon un processus de Poisson de
+    débit fixe, que le système suive ou non ; la latence est mesurée depuis
+    l'heure d'arrivée prévue, pour ne pas masquer l'attente accumulée
+    (coordinated omission).
+    """
+
+    def __init__(
+        self,
+        assistant,
+        questions: List[str],
+        mix: Optional[Dict[str, float]] = None,
+        arrival: str = "closed",
+        users: int = 10,
+        rate: float = 5.0,
+        duration_s: float = 60.0,
+        think_time_s: float = 1.0,
+        interval_s: float = 5.0,
+        max_in_flight: int = 256,
+        seed: int = 0
+    ):
+        """
+        Initialise le test de charge
+
+        Args:
+            assistant: KnowledgeAssistant initialisé
+            questions: Questions posées (tirées au hasard)
+            mix: Poids des opérations {"ask", "search", "rebuild"}
+            arrival: "closed" (utilisateurs en boucle) ou "open" (arrivées de Poisson)
+            users: Utilisateurs simulés (boucle fermée) ou identifiants tirés (boucle ouverte)
+            rate: Requêtes par seconde (boucle ouverte)
+            duration_s: Durée de la charge
+            think_time_s: Temps de réflexion moyen entre deux requêtes (boucle fermée)
+            interval_s: Période d'échantillonnage de la chronologie
+            max_in_flight: Requêtes simultanées maximum (boucle ouverte, au-delà : abandonnées)
+            seed: Graine des tirages
+        """
+        if arrival not in ARRIVALS:
+            raise ValueError(f"Mode d'arrivée inconnu : {arrival} (attendu : {', '.join(ARRIVALS)})")
+        mix = mix or {'ask': 1.0}
+        unknown = set(mix) - set(OPERATIONS)
+        if unknown:
+            raise ValueError(f"Opérations inconnues : {sorted(unknown)} (attendu : {', '.join(OPERATIONS)})")
+        if not questions:
+            raise ValueError("Aucune question pour le test de charge")
+
+        self.assistant = assistant
+        self.questions = questions
+        self.operations = [op for op in mix if mix[op] > 0]
+        self.weights = [mix[op] for op in self.operations]
+        self.arrival = arrival
+        self.users = max(1, users)
+        self.rate = rate
+        self.duration_s = duration_s
+        self.think_time_s = think_time_s
+        self.interval_s = interval_s
+        self.max_in_flight = max_in_flight
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+        self._lock = threading.Lock()
+        self._results: List[tuple] = []  # (fin, opération, latence s, erreur)
+        self._in_flight = 0
+        self.timeline: List[Dict[str, Any]] = []
+
+    def _draw(self):
+        """Tire une opération, une question et un utilisateur"""
+        with self._random_lock:
+            op = self._random.choices(self.operations, self.weights)[0]
+            return op, self._random.choice(self.questions), f"user-{self._random.randrange(self.users)}"
+
+    def _execute(self, op: str, question: str, user: str, started: float):
+        """Exécute une opération et enregistre sa latence (depuis started) et son erreur éventuelle"""
+        error = None
+        try:
+            if op == "ask":
+                self.assistant.ask(question, user=user)
+            elif op == "search":
+                self.assistant.search_documents(question, k=self.assistant.config.top_k_results)
+            else:
+                self.assistant.rebuild_index()
+        except Exception as e:
+            error = type(e).__name__
+
+        finished = time.monotonic()
+        with self._lock:
+            self._results.append((finished, op, finished - started, error))
+
+    def _closed_user(self, index: int, end: float):
+        rng = random.Random(index)
+        while time.monotonic() < end:
+            op, question, _ = self._draw()
+            self._execute(op, question, f"user-{index}", time.monotonic())
+            if self.think_time_s > 0:
+                time.sleep(min(rng.expovariate(1 / self.think_time_s), max(0.0, end - time.monotonic())))
+
+    def _run_closed(self, end: float):
+        threads = [
+            threading.Thread(target=self._closed_user, args=(i, end), daemon=True, name=f"load-user-{i}")
+            for i in range(self.users)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _run_open(self, end: float):
+        def task(op, question, user, scheduled):
+            try:
+                self._execute(op, question, user, scheduled)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="load-open") as executor:
+            scheduled = time.monotonic()
+            while True:
+                with self._random_lock:
+                    scheduled += self._random.expovariate(self.rate)
+                if scheduled >= end:
+                    break
+                time.sleep(max(0.0, scheduled - time.monotonic()))
+
+                op, question, user = self._draw()
+                with self._lock:
+                    overloaded = self._in_flight >= self.max_in_flight
+                    if overloaded:
+                        self._results.append((time.monotonic(), op, 0.0, "ClientOverload"))
+                    else:
+                        self._in_flight += 1
+                if not overloaded:
+                    executor.submit(task, op, question, user, scheduled)
+
+    def _sample(self, start: float, stop: threading.Event):
+        """Échantillonne débit, latence, erreurs, mémoire et file de génération à chaque période"""
+        position = 0
+        previous = start
+        while not stop.wait(self.interval_s):
+            now = time.monotonic()
+            with self._lock:
+                window = self._results[position:]
+                position = len(self._results)
+                in_flight = self._in_flight
+
+            latencies = [latency for _, _, latency, error in window if error is None]
+            scheduler = self.assistant.scheduler.get_stats()
+            entry = {
+                't_s': round(now - start, 1),
+                'completed': len(window),
+                'throughput_rps': len(window) / max(now - previous, 1e-9),
+                'p95_ms': _percentile(latencies, 95) * 1000,
+                'errors': sum(1 for *_, error in window if error is not None),
+                'queue_depth': sum(scheduler['queue_depth'].values()),
+                'in_flight': in_flight,
+                'rss_mb': _memory_mb()
+            }
+            if tracemalloc.is_tracing():
+                entry['python_heap_mb'] = tracemalloc.get_traced_memory()[0] / (1024 * 1024)
+            self.timeline.append(entry)
+            previous = now
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Lance la charge et attend la fin des requêtes en cours
+
+        Returns:
+            Rapport : statistiques par opération, erreurs, chronologie et mémoire
+        """
+        print(f"🏋️ Charge {self.arrival} : {self.users} utilisateurs"
+              + (f", {self.rate} req/s" if self.arrival == "open" else "")
+              + f", {self.duration_s:.0f} s, opérations {dict(zip(self.operations, self.weights))}")
+
+        start = time.monotonic()
+        memory_start = _memory_mb()
+        stop = threading.Event()
+        sampler = threading.Thread(target=self._sample, args=(start, stop), daemon=True, name="load-sampler")
+        sampler.start()
+
+        end = start + self.duration_s
+        if self.arrival == "closed":
+            self._run_closed(end)
+        else:
+            self._run_open(end)
+
+        elapsed = time.monotonic() - start
+        stop.set()
+        sampler.join()
+        return self._report(elapsed, memory_start)
+
+    def _report(self, elapsed: float, memory_start: float) -> Dict[str, Any]:
+        operations, errors = {}, {}
+        for op in self.operations:
+            results = [r for r in self._results if r[1] == op]
+            latencies = [latency for _, _, latency, error in results if error is None]
+            failed = sum(1 for *_, error in results if error is not None)
+            operations[op] = {
+                'count': len(results),
+                'errors': failed,
+                'error_rate': failed / len(results) if results else 0.0,
+                'throughput_rps': len(latencies) / elapsed,
+                'p50_ms': _percentile(latencies, 50) * 1000,
+                'p95_ms': _percentile(latencies, 95) * 1000,
+                'p99_ms': _percentile(latencies, 99) * 1000,
+                'max_ms': max(latencies, default=0.0) * 1000
+            }
+        for *_, error in self._results:
+            if error is not None:
+                errors[error] = errors.get(error, 0) + 1
+
+        # Croissance mémoire : pente de la RSS sur la chronologie (une fuite donne une pente durable).
+        # Sans mesure de la RSS actuelle (ni psutil ni /proc), seul le pic est rapporté
+        samples = [entry for entry in self.timeline if entry['rss_mb'] is not None]
+        slope = (
+            float(np.polyfit([e['t_s'] for e in samples], [e['rss_mb'] for e in samples], 1)[0])
+            if len(samples) >= 2 else None
+        )
+        memory_end = _memory_mb()
+        peak = _peak_memory_mb()
+        if peak is None and samples:
+            peak = max(e['rss_mb'] for e in samples)
+
+        return {
+            'arrival': self.arrival,
+            'users': self.users,
+            'rate': self.rate if self.arrival == "open" else None,
+            'duration_s': elapsed,
+            'operations': operations,
+            'errors': errors,
+            'memory': {
+                'start_mb': memory_start,
+                'end_mb': memory_end,
+                'peak_mb': peak,
+                'growth_mb': memory_end - memory_start if memory_end is not None and memory_start is not None else None,
+                'growth_mb_per_min': slope * 60 if slope is not None else None
+            },
+            'scheduler': self.assistant.scheduler.get_stats(),
+            'timeline': self.timeline
+        }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """
+    Formate le rapport en texte : table par opération, erreurs, mémoire et chronologie
+
+    Args:
+        report: Rapport de LoadTest.run()
+
+    Returns:
+        Texte aligné
+    """
+    def table(columns, rows):
+        cells = [[title for title, _ in columns]] + [
+            [f"{row[key]:.1f}" if isinstance(row[key], float) else str(row[key]) for _, key in columns]
+            for row in rows
+        ]
+        widths = [max(len(line[i]) for line in cells) for i in range(len(columns))]
+        return "\n".join("  ".join(value.rjust(width) for value, width in zip(line, widths)) for line in cells)
+
+    rows = [{'op': op, **stats, 'error_pct': stats['error_rate'] * 100} for op, stats in report['operations'].items()]
+    lines = [table(
+        [('opération', 'op'), ('requêtes', 'count'), ('req/s', 'throughput_rps'), ('erreurs %', 'error_pct'),
+         ('p50 ms', 'p50_ms'), ('p95 ms', 'p95_ms'), ('p99 ms', 'p99_ms'), ('max ms', 'max_ms')],
+        rows
+    )]
+
+    if report['errors']:
+        lines.append("\nErreurs : " + ", ".join(f"{name} × {count}" for name, count in report['errors'].items()))
+
+    memory = report['memory']
+    peak = f"pic {memory['peak_mb']:.0f} Mo" if memory['peak_mb'] is not None else "pic inconnu"
+    if memory['growth_mb'] is not None:
+        slope = memory['growth_mb_per_min']
+        lines.append(
+            f"\nMémoire : {memory['start_mb']:.0f} → {memory['end_mb']:.0f} Mo "
+            f"({peak}" + (f", pente {slope:+.1f} Mo/min)" if slope is not None else ")")
+        )
+    else:
+        lines.append(f"\nMémoire : {peak} (RSS actuelle indisponible : installez psutil)")
+
+    if report['timeline']:
+        columns = [('t s', 't_s'), ('req/s', 'throughput_rps'), ('p95 ms', 'p95_ms'), ('erreurs', 'errors'),
+                   ('file', 'queue_depth'), ('en cours', 'in_flight')]
+        if report['timeline'][0]['rss_mb'] is not None:
+            columns.append(('RSS Mo', 'rss_mb'))
+        lines.append("\n" + table(columns, report['timeline']))
+    return "\n".join(lines)
+
+
+def _parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        op, sep, weight = part.partition("=")
+        mix[op.strip()] = float(weight) if sep else 1.0
+    return mix
+
+
+def main(argv: Optional[List[str]] = None):
+    """Point d'entrée en ligne de commande"""
+    parser = argparse.ArgumentParser(description="Test de charge multi-utilisateurs du Knowledge Assistant")
+    parser.add_argument("--backend", choices=("fake", "real"), default="fake",
+                        help="fake : serveur de modèles simulé et index temporaire ; real : configuration .env")
+    parser.add_argument("--provider", choices=("ollama", "openai"), default="ollama", help="API imitée (backend fake)")
+    parser.add_argument("--vault", type=Path, default=None, help="Vault indexé (défaut : OBSIDIAN_VAULT_PATH)")
+    parser.add_argument("--arrival", choices=ARRIVALS, default="closed")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=5.0, help="Requêtes par seconde (boucle ouverte)")
+    parser.add_argument("--duration", type=float, default=60.0, help="Durée de la charge (secondes)")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Temps de réflexion moyen (boucle fermée)")
+    parser.add_argument("--mix", type=_parse_mix, default={'ask': 8.0, 'search': 2.0},
+                        help="Poids des opérations, ex. ask=8,search=2,rebuild=0.05")
+    parser.add_argument("--questions", type=Path, help="Questions (JSON ou JSONL, voir src.evaluation)")
+    parser.add_argument("--auto", type=int, default=200, help="Sans --questions : questions générées depuis les titres")
+    parser.add_argument("--interval", type=float, default=5.0, help="Période de la chronologie (secondes)")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--tracemalloc", action="store_true", help="Suivre aussi le tas Python (plus lent)")
+    parser.add_argument("--output", type=Path, help="Écrit le rapport en JSON")
+    simulated = parser.add_argument_group("serveur simulé (backend fake)")
+    simulated.add_argument("--embedding-dim", type=int, default=768)
+    simulated.add_argument("--embed-latency-ms", type=float, default=20.0)
+    simulated.add_argument("--first-token-ms", type=float, default=300.0)
+    simulated.add_argument("--token-rate", type=float, default=40.0, help="Tokens générés par seconde")
+    simulated.add_argument("--response-tokens", type=int, default=120)
+    simulated.add_argument("--server-parallel", type=int, default=4, help="Requêtes servies simultanément par modèle")
+    simulated.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    server = None
+    store_dir = None
+    if args.backend == "fake":
+        server = FakeModelServer(
+            embedding_dim=args.embedding_dim,
+            embed_latency_ms=args.embed_latency_ms,
+            first_token_ms=args.first_token_ms,
+            tokens_per_s=args.token_rate,
+            response_tokens=args.response_tokens,
+            max_parallel=args.server_parallel,
+            error_rate=args.error_rate
+        ).start()
+        # Avant Config() : load_dotenv ne remplace pas les variables déjà définies
+        os.environ["LLM_PROVIDER"] = args.provider
+        if args.provider == "ollama":
+            os.environ["OLLAMA_BASE_URL"] = server.url
+        else:
+            os.environ["OPENAI_BASE_URL"] = server.url + "/v1"
+            os.environ["OPENAI_API_KEY"] = "loadtest"
+        # Index temporaire : ne jamais écraser l'index réel avec des embeddings simulés
+        store_dir = tempfile.mkdtemp(prefix="kb-loadtest-")
+        os.environ["VECTOR_STORE_PATH"] = store_dir
+    try:
+        if args.vault:
+            os.environ["OBSIDIAN_VAULT_PATH"] = str(args.vault)
+            os.environ.pop("OBSIDIAN_VAULTS", None)
+
+        from .config import Config
+        from .evaluation import generate_questions, load_questions
+        from .knowledge_assistant import KnowledgeAssistant
+
+        config = Config()
+        if args.questions:
+            questions = [q['question'] for q in load_questions(args.questions)]
+        else:
+            questions = [q['question'] for q in generate_questions(config.obsidian_vault_path, limit=args.auto)]
+        print(f"❓ {len(questions)} questions")
+
+        if args.tracemalloc:
+            tracemalloc.start()
+        assistant = KnowledgeAssistant(config)
+        assistant.initialize()
+
+        report = LoadTest(
+            assistant, questions,
+            mix=args.mix,
+            arrival=args.arrival,
+            users=args.users,
+            rate=args.rate,
+            duration_s=args.duration,
+            think_time_s=args.think_time,
+            interval_s=args.interval,
+            max_in_flight=args.max_in_flight
+        ).run()
+        if server is not None:
+            report['server'] = server.get_stats()
+    finally:
+        if server is not None:
+            server.stop()
+        if store_dir is not None:
+            shutil.rmtree(store_dir, ignore_errors=True)
+
+    print()
+    print(format_report(report))
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"💾 Rapport écrit dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Routage des modèles
+Choisit entre un modèle rapide et un grand modèle selon la question, la
+confiance de la recherche et la charge
+"""
+
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+TIERS = ("fast", "large")
+
+# Questions qui demandent un raisonnement : comparaison, explication, analyse
+_COMPLEX_QUESTION = re.compile(
+    r"\b(compare|comparison|difference|differences|versus|vs\.?|why|explain|analy[sz]e|trade-?offs?|"
+    r"pros and cons|step by step|in detail|summari[sz]e|"
+    r"compar\w*|différence\w*|pourquoi|expliqu\w*|analys\w*|avantages|inconvénients|en détail|résum\w*)\b",
+    re.IGNORECASE
+)
+
+
+class ModelRouter:
+    """
+    Routage des générations entre un modèle rapide et un grand modèle
+
+    Une question va au modèle rapide si elle est courte, sans indice de
+    raisonnement (comparer, expliquer pourquoi...), si la recherche est
+    confiante (meilleure distance sous le seuil) et si le contexte est
+    petit ; sinon au grand modèle. Le grand modèle est remplacé par le
+    modèle rapide quand la file de l'ordonnanceur est trop profonde ou
+    quand sa latence p95 récente dépasse l'objectif : sans nouvelle mesure,
+    la fenêtre se vide et le grand modèle est de nouveau utilisé.
+    """
+
+    def __init__(
+        self,
+        fast_model: str,
+        large_model: str,
+        max_distance: float = 0.7,
+        max_question_words: int = 20,
+        max_context_chars: int = 6000,
+        downgrade_queue_depth: int = 4,
+        latency_slo_ms: float = 0.0,
+        latency_window_s: float = 60.0
+    ):
+        """
+        Initialise le routeur
+
+        Args:
+            fast_model: Nom du modèle rapide
+            large_model: Nom du grand modèle
+            max_distance: Distance L2 au carré maximale du meilleur chunk pour le modèle rapide
+            max_question_words: Nombre de mots maximum d'une question pour le modèle rapide
+            max_context_chars: Taille maximale du contexte pour le modèle rapide
+            downgrade_queue_depth: Requêtes en attente à partir desquelles le modèle rapide
+                remplace le grand modèle (0 = jamais)
+            latency_slo_ms: Latence p95 du grand modèle au-delà de laquelle le modèle rapide
+                le remplace (0 = aucun objectif)
+            latency_window_s: Fenêtre des mesures de latence prises en compte (secondes)
+        """
+        self.models = {"fast": fast_model, "large": large_model}
+        self.max_distance = max_distance
+        self.max_question_words = max_question_words
+        self.max_context_chars = max_context_chars
+        self.downgrade_queue_depth = downgrade_queue_depth
+        self.latency_slo_ms = latency_slo_ms
+        self.latency_window_s = latency_window_s
+
+        self._lock = threading.Lock()
+        # (instant de fin, durée en secondes) des dernières générations de chaque niveau
+        self._latencies: Dict[str, Deque[Tuple[float, float]]] = {tier: deque(maxlen=256) for tier in TIERS}
+        self._reasons: Dict[str, Dict[str, int]] = {tier: {} for tier in TIERS}
+        self.downgrades = {'queue_depth': 0, 'latency_slo': 0}
+
+    def classify(self, question: str, docs_and_scores: List[tuple], context_chars: int) -> Tuple[str, str]:
+        """
+        Classifieur sans modèle : niveau adapté à la question
+
+        Args:
+            question: Question de l'utilisateur
+            docs_and_scores: Chunks récupérés avec leurs distances (vide hors RAG)
+            context_chars: Taille du contexte envoyé au LLM
+
+        Returns:
+            Tuple (niveau "fast" ou "large", raison)
+        """
+        if len(question.split()) > self.max_question_words:
+            return "large", "long_question"
+        if _COMPLEX_QUESTION.search(question):
+            return "large", "complex_question"
+        if context_chars > self.max_context_chars:
+            return "large", "large_context"
+        if docs_and_scores and min(float(score) for _, score in docs_and_scores) > self.max_distance:
+            return "large", "low_confidence"
+        return "fast", "simple_question"
+
+    def route(
+        self,
+        question: str,
+        docs_and_scores: List[tuple],
+        context_chars: int,
+        queue_depth: int = 0,
+        tier: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Choisit le modèle d'une génération
+
+        Args:
+            question: Question de l'utilisateur
+            docs_and_scores: Chunks récupérés avec leurs distances
+            context_chars: Taille du contexte envoyé au LLM
+            queue_depth: Requêtes en attente dans l'ordonnanceur
+            tier: Niveau imposé par l'appelant (le classifieur n'est pas consulté)
+
+        Returns:
+            Dictionnaire {'tier', 'model', 'reason'}
+
+        Raises:
+            ValueError: Si le niveau imposé est inconnu
+        """
+        if tier is None:
+            tier, reason = self.classify(question, docs_and_scores, context_chars)
+        elif tier in TIERS:
+            reason = "requested"
+        else:
+            raise ValueError(f"Niveau de modèle inconnu : {tier} (attendu : {', '.join(TIERS)})")
+
+        with self._lock:
+            if tier == "large":
+                if self.downgrade_queue_depth and queue_depth >= self.downgrade_queue_depth:
+                    tier, reason = "fast", "queue_depth"
+                elif self.latency_slo_ms and self._recent_p95_ms("large") > self.latency_slo_ms:
+                    tier, reason = "fast", "latency_slo"
+                if tier == "fast":
+                    self.downgrades[reason] += 1
+            self._reasons[tier][reason] = self._reasons[tier].get(reason, 0) + 1
+
+        return {'tier': tier, 'model': self.models[tier], 'reason': reason}
+
+    def record(self, tier: str, elapsed_s: float):
+        """Enregistre la durée d'une génération terminée"""
+        with self._lock:
+            self._latencies[tier].append((time.monotonic(), elapsed_s))
+
+    def _recent_p95_ms(self, tier: str) -> float:
+        """Latence p95 des générations de la fenêtre récente (verrou tenu)"""
+        since = time.monotonic() - self.latency_window_s
+        recent = sorted(elapsed for ended, elapsed in self._latencies[tier] if ended >= since)
+        return _percentile(recent, 0.95) * 1000
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiques par niveau : modèle, requêtes par raison, latences, et rétrogradations"""
+        with self._lock:
+            tiers = {}
+            for tier in TIERS:
+                latencies = sorted(elapsed for _, elapsed in self._latencies[tier])
+                tiers[tier] = {
+                    'model': self.models[tier],
+                    'requests': sum(self._reasons[tier].values()),
+                    'reasons': dict(self._reasons[tier]),
+                    'latency_p50_ms': _percentile(latencies, 0.5) * 1000,
+                    'latency_p95_ms': _percentile(latencies, 0.95) * 1000,
+                    'recent_p95_ms': self._recent_p95_ms(tier)
+                }
+            return {
+                'tiers': tiers,
+                'downgrades': dict(self.downgrades),
+                'latency_slo_ms': self.latency_slo_ms or None,
+                'downgrade_queue_depth': self.downgrade_queue_depth or None
+            }
+
+
+def _percentile(values: List[float], q: float) -> float:
+    """Percentile d'une liste triée (0 si vide)"""
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
@@ -3,18 +3,30 @@ Chargeur de documents Obsidian
 Gère le chargement et le parsing des fichiers markdown
 """
 
+import hashlib
 import re
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import frontmatter
 from langchain_community.docstore.document import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from .pdf_loader import PdfLoader
 
 
 class ObsidianLoader:
-    """Chargeur pour les fichiers markdown Obsidian"""
+    """Chargeur pour les fichiers markdown (et PDF) Obsidian"""
     
-    def __init__(self, vault_path: Path, chunk_size: int = 1000, chunk_overlap: int = 200):
+    def __init__(
+        self,
+        vault_path: Path,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        include_pdfs: bool = False,
+        cache_dir: Optional[Path] = None,
+        pdf_workers: int = 2,
+        pdf_pages_per_task: int = 25,
+        pdf_worker_memory_mb: int = 1024
+    ):
         """
         Initialise le chargeur Obsidian
         
@@ -22,6 +34,11 @@ class ObsidianLoader:
             vault_path: Chemin vers le vault Obsidian
             chunk_size: Taille des chunks de texte
             chunk_overlap: Chevauchement entre les chunks
+            include_pdfs: Indexer aussi les fichiers PDF du vault
+            cache_dir: Dossier du cache de texte extrait des PDF
+            pdf_workers: Nombre de processus d'extraction PDF
+            pdf_pages_per_task: Nombre de pages par tâche d'extraction
+            pdf_worker_memory_mb: Mémoire maximale d'un processus d'extraction (Mo)
         """
         self.vault_path = Path(vault_path)
         self.chunk_size = chunk_size
@@ -31,10 +48,18 @@ class ObsidianLoader:
             chunk_overlap=chunk_overlap,
             separators=["\n\n", "\n", ". ", " ", ""]
         )
+        self.pdf_loader = PdfLoader(
+            vault_path=self.vault_path,
+            text_splitter=self.text_splitter,
+            cache_dir=cache_dir,
+            max_workers=pdf_workers,
+            pages_per_task=pdf_pages_per_task,
+            worker_memory_mb=pdf_worker_memory_mb
+        ) if include_pdfs else None
     
     def load_documents(self) -> List[Document]:
         """
-        Charge tous les documents markdown du vault Obsidian
+        Charge tous les documents markdown (et PDF si activés) du vault Obsidian
         
         Returns:
             Liste d'objets Document
@@ -56,6 +81,12 @@ class ObsidianLoader:
             except Exception as e:
                 print(f"⚠️ Erreur lors du chargement de {md_file.name}: {e}")
         
+        # PDF : extraction parallèle, chunks produits PDF par PDF
+        if self.pdf_loader is not None:
+            pdf_files = self._pdf_files()
+            print(f"📁 Trouvé {len(pdf_files)} fichiers PDF dans le vault")
+            documents.extend(self.pdf_loader.iter_documents(pdf_files))
+        
         print(f"✅ Chargé {len(documents)} chunks de documents")
         return documents
     
@@ -156,6 +187,31 @@ class ObsidianLoader:
         
         return text.strip()
     
+    def _pdf_files(self) -> List[Path]:
+        """Fichiers PDF du vault (hors dossiers cachés comme .obsidian et .trash)"""
+        return sorted(
+            path for path in self.vault_path.rglob("*.pdf")
+            if not any(part.startswith('.') for part in path.relative_to(self.vault_path).parts)
+        )
+    
+    def vault_hash(self) -> str:
+        """
+        Empreinte du contenu du vault : chemins et contenus des fichiers indexés
+        
+        Returns:
+            SHA-256 hexadécimal (identique sur deux machines pour le même vault)
+        """
+        files = list(self.vault_path.rglob("*.md"))
+        if self.pdf_loader is not None:
+            files.extend(self._pdf_files())
+        
+        digest = hashlib.sha256()
+        for path in sorted(files, key=lambda p: p.relative_to(self.vault_path).as_posix()):
+            digest.update(path.relative_to(self.vault_path).as_posix().encode('utf-8'))
+            digest.update(b'\0')
+            digest.update(PdfLoader.file_hash(path).encode('ascii'))
+        return digest.hexdigest()
+    
     def get_vault_stats(self) -> Dict[str, Any]:
         """
         Obtient des statistiques sur le vault
@@ -164,11 +220,13 @@ class ObsidianLoader:
             Dictionnaire avec les statistiques
         """
         markdown_files = list(self.vault_path.rglob("*.md"))
+        pdf_files = self._pdf_files() if self.pdf_loader is not None else []
         
-        total_size = sum(f.stat().st_size for f in markdown_files)
+        total_size = sum(f.stat().st_size for f in markdown_files + pdf_files)
         
         return {
-            'total_files': len(markdown_files),
+            'total_files': len(markdown_files) + len(pdf_files),
+            'total_pdf_files': len(pdf_files),
             'total_size_mb': total_size / (1024 * 1024),
             'vault_path': str(self.vault_path)
         }
\ No newline at end of file
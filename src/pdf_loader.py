@@ -0,0 +1,243 @@
+"""
+Chargeur de documents PDF
+Extraction page par page dans des processus workers, avec cache par hash
+"""
+
+import hashlib
+import json
+import multiprocessing as mp
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from langchain_community.docstore.document import Document
+from pypdf import PdfReader
+
+try:
+    import resource
+except ImportError:  # Windows : pas de plafond mémoire par worker
+    resource = None
+
+
+def _limit_worker_memory(max_memory_mb: int):
+    """Initialise un worker : plafonne son espace d'adressage (MemoryError au-delà)"""
+    if resource is None or max_memory_mb <= 0:
+        return
+    limit = max_memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _extract_pages(path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """
+    Extrait le texte d'une plage de pages (exécuté dans un worker)
+
+    Args:
+        path: Chemin du PDF
+        start: Première page (index à partir de 0)
+        end: Page de fin (exclue)
+
+    Returns:
+        Liste de tuples (numéro de page à partir de 1, texte)
+    """
+    reader = PdfReader(path)
+    pages = []
+    for index in range(start, end):
+        # Les pages sont lues une à une : seule la page courante est décodée
+        pages.append((index + 1, reader.pages[index].extract_text() or ""))
+    return pages
+
+
+class PdfLoader:
+    """
+    Chargeur pour les fichiers PDF d'un vault
+
+    Chaque PDF est découpé en plages de pages extraites en parallèle par un
+    pool de processus à mémoire plafonnée. Les tâches des différents PDF sont
+    entrelacées, et les chunks d'un PDF sont produits dès que toutes ses pages
+    sont extraites : un PDF volumineux ne bloque pas les autres. Le texte
+    extrait est mis en cache par hash SHA-256 du fichier, si bien qu'un PDF
+    inchangé n'est pas ré-extrait lors d'une reconstruction.
+    """
+
+    def __init__(
+        self,
+        vault_path: Path,
+        text_splitter,
+        cache_dir: Optional[Path] = None,
+        max_workers: int = 2,
+        pages_per_task: int = 25,
+        worker_memory_mb: int = 1024
+    ):
+        """
+        Initialise le chargeur PDF
+
+        Args:
+            vault_path: Chemin vers le vault
+            text_splitter: Découpeur de texte (chunks par page)
+            cache_dir: Dossier du cache de texte extrait (None = pas de cache)
+            max_workers: Nombre de processus d'extraction
+            pages_per_task: Nombre de pages par tâche d'extraction
+            worker_memory_mb: Mémoire maximale d'un processus d'extraction (Mo, 0 = illimitée)
+        """
+        self.vault_path = Path(vault_path)
+        self.text_splitter = text_splitter
+        self.cache_dir = Path(cache_dir) / "pdf" if cache_dir else None
+        self.max_workers = max(1, max_workers)
+        self.pages_per_task = max(1, pages_per_task)
+        self.worker_memory_mb = worker_memory_mb
+
+    @staticmethod
+    def file_hash(path: Path) -> str:
+        """Calcule le SHA-256 d'un fichier par blocs"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _cache_path(self, digest: str) -> Optional[Path]:
+        return self.cache_dir / f"{digest}.json" if self.cache_dir else None
+
+    def _read_cache(self, digest: str) -> Optional[Tuple[List[Tuple[int, str]], int]]:
+        """Retourne les pages en cache d'un PDF et son nombre de pages, ou None"""
+        cache_path = self._cache_path(digest)
+        if cache_path is None or not cache_path.exists():
+            return None
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            pages = [tuple(page) for page in cached['pages']]
+            return pages, cached.get('num_pages', len(pages))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_cache(self, digest: str, pages: List[Tuple[int, str]], num_pages: int):
+        """Enregistre les pages extraites d'un PDF"""
+        cache_path = self._cache_path(digest)
+        if cache_path is None:
+            return
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'pages': pages, 'num_pages': num_pages}, f, ensure_ascii=False)
+        tmp_path.replace(cache_path)
+
+    def iter_documents(self, pdf_files: Iterable[Path]) -> Iterator[Document]:
+        """
+        Charge les PDF et produit leurs chunks, PDF par PDF
+
+        Args:
+            pdf_files: Fichiers PDF du vault
+
+        Returns:
+            Itérateur de chunks Document (métadonnée 'page' : numéro de page ;
+            'partial' : extraction interrompue, seules certaines pages sont indexées)
+        """
+        pending: Dict[Path, Tuple[str, int]] = {}
+        for pdf_file in pdf_files:
+            try:
+                digest = self.file_hash(pdf_file)
+                cached = self._read_cache(digest)
+                if cached is not None:
+                    yield from self._to_documents(pdf_file, *cached)
+                    continue
+                num_pages = len(PdfReader(str(pdf_file)).pages)
+            except Exception as e:
+                print(f"⚠️ Erreur lors de la lecture de {pdf_file.name}: {e}")
+                continue
+            if num_pages:
+                pending[pdf_file] = (digest, num_pages)
+
+        if pending:
+            yield from self._extract(pending)
+
+    def _extract(self, pending: Dict[Path, Tuple[str, int]]) -> Iterator[Document]:
+        """Extrait les PDF non mis en cache dans le pool de processus"""
+        # Plages de pages de chaque PDF, puis tâches entrelacées entre PDF
+        ranges = {
+            pdf_file: [(start, min(start + self.pages_per_task, num_pages))
+                       for start in range(0, num_pages, self.pages_per_task)]
+            for pdf_file, (_, num_pages) in pending.items()
+        }
+        tasks = []
+        for round_index in range(max(len(r) for r in ranges.values())):
+            for pdf_file, pdf_ranges in ranges.items():
+                if round_index < len(pdf_ranges):
+                    tasks.append((pdf_file, *pdf_ranges[round_index]))
+
+        total_pages = sum(num_pages for _, num_pages in pending.values())
+        print(f"📄 Extraction de {total_pages} pages de {len(pending)} PDF ({self.max_workers} workers)...")
+
+        pages: Dict[Path, List[Tuple[int, str]]] = {pdf_file: [] for pdf_file in pending}
+        remaining = {pdf_file: len(pdf_ranges) for pdf_file, pdf_ranges in ranges.items()}
+        failed = set()
+
+        with self._create_pool() as pool:
+            futures = {
+                pool.submit(_extract_pages, str(pdf_file), start, end): pdf_file
+                for pdf_file, start, end in tasks
+            }
+            not_done = set(futures)
+            while not_done:
+                done, not_done = wait(not_done, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pdf_file = futures[future]
+                    remaining[pdf_file] -= 1
+                    try:
+                        pages[pdf_file].extend(future.result())
+                    except Exception as e:
+                        if pdf_file not in failed:
+                            print(f"⚠️ Erreur lors de l'extraction de {pdf_file.name}: {type(e).__name__} {e}")
+                        failed.add(pdf_file)
+
+                    if remaining[pdf_file] == 0:
+                        extracted = sorted(pages.pop(pdf_file))
+                        digest, num_pages = pending[pdf_file]
+                        if pdf_file in failed:
+                            # Extraction partielle : indexée, marquée, et retentée à la prochaine reconstruction
+                            print(f"⚠️ {pdf_file.name} : {len(extracted)} pages extraites sur {num_pages}, indexation partielle")
+                        else:
+                            self._write_cache(digest, extracted, num_pages)
+                        yield from self._to_documents(pdf_file, extracted, num_pages, partial=pdf_file in failed)
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        """Crée le pool de processus d'extraction à mémoire plafonnée"""
+        # Pas de fork depuis un processus multi-threadé (Streamlit, pool de recherche)
+        methods = mp.get_all_start_methods()
+        context = mp.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        kwargs = dict(
+            max_workers=self.max_workers,
+            mp_context=context,
+            initializer=_limit_worker_memory,
+            initargs=(self.worker_memory_mb,)
+        )
+        try:
+            # Recycler les workers pour libérer la mémoire des gros PDF (Python 3.11+)
+            return ProcessPoolExecutor(max_tasks_per_child=20, **kwargs)
+        except TypeError:
+            return ProcessPoolExecutor(**kwargs)
+
+    def _to_documents(
+        self,
+        pdf_file: Path,
+        pages: List[Tuple[int, str]],
+        num_pages: int,
+        partial: bool = False
+    ) -> Iterator[Document]:
+        """Découpe les pages d'un PDF en chunks, page par page"""
+        base_metadata = {
+            'source': str(pdf_file.relative_to(self.vault_path)),
+            'file_name': pdf_file.stem,
+            'file_path': str(pdf_file),
+            'file_type': 'pdf',
+            'num_pages': num_pages
+        }
+        if partial:
+            base_metadata['partial'] = True
+        for page_number, text in pages:
+            text = text.strip()
+            if not text:
+                continue
+            yield from self.text_splitter.create_documents(
+                texts=[text],
+                metadatas=[{**base_metadata, 'page': page_number}]
+            )
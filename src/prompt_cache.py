@@ -0,0 +1,137 @@
+"""
+Cache de préfixe de prompt
+Ordonne le prompt pour maximiser le préfixe commun entre deux générations
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_community.docstore.document import Document
+
+
+def chunk_id(doc: Document) -> str:
+    """
+    Identifiant stable d'un chunk
+
+    Args:
+        doc: Document récupéré
+
+    Returns:
+        ID du docstore, ou la source à défaut
+    """
+    return getattr(doc, 'id', None) or doc.metadata.get('source', '')
+
+
+class PromptPrefixCache:
+    """
+    Construit des prompts à préfixe stable pour la réutilisation du cache KV
+
+    Le prompt commence par une section système fixe, suivie des chunks : ceux
+    déjà envoyés au tour précédent gardent leur position, les nouveaux sont
+    ajoutés ensuite triés par ID stable. La question vient en dernier. Ollama
+    réutilise le cache KV du plus long préfixe commun avec le prompt précédent
+    tant que le modèle reste chargé (keep_alive), ce qui évite de recalculer
+    le prefill de ce préfixe.
+
+    L'ordre des chunks et le prompt précédent sont suivis par utilisateur :
+    des utilisateurs simultanés ne s'écrasent pas leur préfixe. Les chiffres
+    d'économie supposent que le serveur garde un cache KV par utilisateur
+    actif (OLLAMA_NUM_PARALLEL au moins égal au nombre d'utilisateurs
+    simultanés) ; avec moins de slots, ce sont des majorants.
+    """
+
+    SYSTEM_PROMPT = """Answer the question using the notes below. Be direct and conversational - just explain it naturally without mentioning documents or sources.
+
+Notes:
+"""
+
+    QUESTION_TEMPLATE = """
+Question: {question}
+
+Answer directly and naturally:"""
+
+    def __init__(self, max_users: int = 256):
+        """
+        Initialise le cache (vide)
+
+        Args:
+            max_users: Nombre d'utilisateurs suivis (les moins récents sont oubliés)
+        """
+        self._lock = threading.Lock()
+        # Utilisateur -> (IDs des chunks, prompt) du dernier prompt envoyé
+        self._previous: "OrderedDict[Optional[str], Tuple[List[str], str]]" = OrderedDict()
+        self.max_users = max(1, max_users)
+        self._ns_per_char: Optional[float] = None
+
+    def build_prompt(self, docs: List[Document], question: str, user: Optional[str] = None) -> Tuple[str, int]:
+        """
+        Construit le prompt ordonné pour maximiser le préfixe commun
+
+        Args:
+            docs: Documents de contexte
+            question: Question de l'utilisateur
+            user: Identifiant de l'utilisateur (None : utilisateur anonyme commun)
+
+        Returns:
+            Tuple (prompt, nombre de caractères communs avec le prompt précédent de l'utilisateur)
+        """
+        by_id = {chunk_id(doc): doc for doc in docs}
+
+        with self._lock:
+            previous_ids, previous_prompt = self._previous.get(user, ([], ""))
+            kept = [cid for cid in previous_ids if cid in by_id]
+            kept_set = set(kept)
+            added = sorted(cid for cid in by_id if cid not in kept_set)
+            ordered = kept + added
+
+            parts = [self.SYSTEM_PROMPT]
+            for cid in ordered:
+                parts.append(f"[{cid}]\n{by_id[cid].page_content}\n\n")
+            parts.append(self.QUESTION_TEMPLATE.format(question=question))
+            prompt = "".join(parts)
+
+            shared_chars = len(os.path.commonprefix([previous_prompt, prompt]))
+            self._previous[user] = (ordered, prompt)
+            self._previous.move_to_end(user)
+            while len(self._previous) > self.max_users:
+                self._previous.popitem(last=False)
+
+        return prompt, shared_chars
+
+    def prefill_report(self, prompt: str, shared_chars: int, generation_info: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Estime le temps de prefill économisé grâce au préfixe commun
+
+        Ollama ne recalcule que la partie du prompt après le préfixe en cache :
+        le coût par caractère mesuré sur cette partie est appliqué au préfixe
+        réutilisé.
+
+        Args:
+            prompt: Prompt envoyé
+            shared_chars: Caractères communs avec le prompt précédent
+            generation_info: Informations de génération renvoyées par Ollama
+
+        Returns:
+            Dictionnaire avec les durées de prefill mesurée et économisée (ms)
+        """
+        info = generation_info or {}
+        prefill_ns = info.get('prompt_eval_duration')
+        if prefill_ns is None:
+            return {'shared_prefix_chars': shared_chars}
+
+        evaluated_chars = len(prompt) - shared_chars
+        with self._lock:
+            if evaluated_chars > 0:
+                ns_per_char = prefill_ns / evaluated_chars
+                # Moyenne glissante utilisée quand tout le prompt est en cache
+                self._ns_per_char = ns_per_char if self._ns_per_char is None else 0.8 * self._ns_per_char + 0.2 * ns_per_char
+            else:
+                ns_per_char = self._ns_per_char or 0.0
+
+        return {
+            'shared_prefix_chars': shared_chars,
+            'prompt_tokens_evaluated': info.get('prompt_eval_count') or 0,
+            'prefill_ms': prefill_ns / 1e6,
+            'prefill_saved_ms': shared_chars * ns_per_char / 1e6
+        }
@@ -0,0 +1,223 @@
+"""
+Quantification des vecteurs
+Index FAISS int8/fp16 (avec PCA optionnelle) et re-scoring exact en float32
+"""
+
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import faiss
+import numpy as np
+
+
+QUANTIZATION_MODES = ("none", "fp16", "int8")
+
+FULL_VECTORS_FILE = "vectors.npy"
+
+
+def build_quantized_index(vectors: np.ndarray, mode: str, pca_dim: int = 0) -> faiss.Index:
+    """
+    Construit un index quantifié à partir des vecteurs pleine précision
+
+    Args:
+        vectors: Vecteurs float32 (n, d)
+        mode: "fp16" ou "int8" (quantification scalaire), "none" pour un index plat
+        pca_dim: Dimension après réduction PCA (0 = pas de PCA)
+
+    Returns:
+        Index FAISS entraîné et rempli
+    """
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Mode de quantification non supporté : {mode}")
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, d = vectors.shape
+
+    # La PCA a besoin d'au moins autant de vecteurs que de dimensions conservées
+    if pca_dim and (pca_dim >= d or n < pca_dim):
+        print(f"⚠️ PCA ignorée (dimension {pca_dim}, {n} vecteurs de dimension {d})")
+        pca_dim = 0
+    out_dim = pca_dim or d
+
+    if mode == "none":
+        index = faiss.IndexFlatL2(out_dim)
+    else:
+        qtype = faiss.ScalarQuantizer.QT_fp16 if mode == "fp16" else faiss.ScalarQuantizer.QT_8bit
+        index = faiss.IndexScalarQuantizer(out_dim, qtype, faiss.METRIC_L2)
+
+    if pca_dim:
+        index = faiss.IndexPreTransform(faiss.PCAMatrix(d, pca_dim), index)
+
+    index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def index_memory_bytes(index: faiss.Index) -> int:
+    """
+    Estime la mémoire d'un index FAISS (codes + transformation PCA)
+
+    Args:
+        index: Index FAISS
+
+    Returns:
+        Taille estimée en octets
+    """
+    if isinstance(index, faiss.IndexPreTransform):
+        pca_bytes = sum(
+            faiss.vector_to_array(faiss.downcast_VectorTransform(index.chain.at(i)).A).nbytes
+            for i in range(index.chain.size())
+        )
+        return pca_bytes + index_memory_bytes(faiss.downcast_index(index.index))
+    return index.ntotal * getattr(index, 'code_size', index.d * 4)
+
+
+def describe_index(index: faiss.Index) -> Dict:
+    """
+    Décrit le mode de stockage d'un index FAISS
+
+    Args:
+        index: Index FAISS
+
+    Returns:
+        Dictionnaire avec le mode de quantification et la dimension PCA
+    """
+    pca_dim = 0
+    if isinstance(index, faiss.IndexPreTransform):
+        index = faiss.downcast_index(index.index)
+        pca_dim = index.d
+
+    mode = "none"
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        mode = "fp16" if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else "int8"
+
+    return {'mode': mode, 'pca_dim': pca_dim}
+
+
+def save_full_vectors(vectors: np.ndarray, directory: Path):
+    """Écrit les vecteurs pleine précision dans le fichier annexe du snapshot"""
+    np.save(Path(directory) / FULL_VECTORS_FILE, np.ascontiguousarray(vectors, dtype=np.float32))
+
+
+def load_full_vectors(directory: Path) -> Optional[np.ndarray]:
+    """
+    Ouvre les vecteurs pleine précision par memory-mapping
+
+    Returns:
+        Tableau (n, d) memory-mappé, ou None si le snapshot n'est pas quantifié
+    """
+    path = Path(directory) / FULL_VECTORS_FILE
+    if not path.exists():
+        return None
+    return np.load(path, mmap_mode='r')
+
+
+def search_with_rescoring(
+    index: faiss.Index,
+    full_vectors: np.ndarray,
+    query_vector: np.ndarray,
+    k: int,
+    rescore_factor: int = 4
+):
+    """
+    Recherche une liste courte dans l'index quantifié puis la re-score exactement
+
+    Args:
+        index: Index quantifié
+        full_vectors: Vecteurs pleine précision (memory-mappés)
+        query_vector: Vecteur de requête (1, d)
+        k: Nombre de résultats
+        rescore_factor: Taille de la liste courte = k * rescore_factor
+
+    Returns:
+        Tuple (distances L2 au carré, positions), triés par distance croissante
+    """
+    _, positions = index.search(query_vector, k * max(rescore_factor, 1))
+    positions = positions[0][positions[0] != -1]
+    if len(positions) == 0:
+        return np.empty(0, dtype=np.float32), positions
+
+    # Lecture des seules lignes de la liste courte (accès trié pour le memory-mapping)
+    order = np.argsort(positions)
+    candidates = np.asarray(full_vectors[positions[order]], dtype=np.float32)
+    distances = np.sum((candidates - query_vector) ** 2, axis=1)
+
+    best = np.argsort(distances)[:k]
+    return distances[best], positions[order][best]
+
+
+def benchmark(
+    full_vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int = 5,
+    modes: Optional[List[str]] = None,
+    pca_dims: Optional[List[int]] = None,
+    rescore_factor: int = 4
+) -> List[Dict]:
+    """
+    Compare les modes de quantification à la recherche exacte (index plat)
+
+    Args:
+        full_vectors: Vecteurs pleine précision de l'index
+        queries: Vecteurs de requêtes (q, d)
+        k: Nombre de résultats
+        modes: Modes de quantification à comparer
+        pca_dims: Dimensions PCA à comparer (0 = sans PCA)
+        rescore_factor: Facteur de la liste courte re-scorée
+
+    Returns:
+        Une ligne par configuration : mémoire, latence et recall@k par rapport au plat
+    """
+    vectors = np.ascontiguousarray(full_vectors, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    modes = modes or ["fp16", "int8"]
+    pca_dims = pca_dims or [0]
+
+    flat = build_quantized_index(vectors, "none")
+    start = time.perf_counter()
+    _, truth = flat.search(queries, k)
+    flat_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    rows = [{
+        'config': 'flat',
+        'memory_mb': index_memory_bytes(flat) / (1024 * 1024),
+        'latency_ms': flat_ms,
+        'recall_at_k': 1.0,
+        'rescored_latency_ms': flat_ms,
+        'rescored_recall_at_k': 1.0
+    }]
+
+    for pca_dim in pca_dims:
+        for mode in modes:
+            index = build_quantized_index(vectors, mode, pca_dim)
+
+            start = time.perf_counter()
+            _, approx = index.search(queries, k)
+            latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+            start = time.perf_counter()
+            rescored = [
+                search_with_rescoring(index, vectors, queries[i:i + 1], k, rescore_factor)[1]
+                for i in range(len(queries))
+            ]
+            rescored_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+            rows.append({
+                'config': f"{mode}" + (f"+pca{pca_dim}" if pca_dim else ""),
+                'memory_mb': index_memory_bytes(index) / (1024 * 1024),
+                'latency_ms': latency_ms,
+                'recall_at_k': _recall(truth, approx),
+                'rescored_latency_ms': rescored_ms,
+                'rescored_recall_at_k': _recall(truth, rescored)
+            })
+
+    return rows
+
+
+def _recall(truth: np.ndarray, results) -> float:
+    """Recall@k moyen des résultats par rapport à la vérité terrain"""
+    hits = [
+        len(set(t[t != -1].tolist()) & set(np.asarray(r).tolist())) / max(int((t != -1).sum()), 1)
+        for t, r in zip(truth, results)
+    ]
+    return float(np.mean(hits)) if hits else 0.0
@@ -3,13 +3,18 @@ RAG Chain Implementation
 Handles retrieval-augmented generation with LangChain
 """
 
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from contextlib import nullcontext
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from langchain_openai import ChatOpenAI
 from langchain_ollama import OllamaLLM
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
 from langchain_community.docstore.document import Document
+from .prompt_cache import PromptPrefixCache
+from .scheduler import GenerationCancelled
 
 
 class RAGChain:
@@ -24,6 +29,14 @@ Question: {question}
 
 Answer directly and naturally:"""
     
+    OVERVIEW_PROMPT_TEMPLATE = """Here is an overview of the topics in my notes, with a short summary of the main notes of each topic.
+
+{context}
+
+Question: {question}
+
+Answer in a few short paragraphs, organized by topic:"""
+    
     def __init__(
         self,
         vector_store,
@@ -33,7 +46,15 @@ Answer directly and naturally:"""
         top_k: int = 5,
         openai_api_key: Optional[str] = None,
         use_ollama: bool = True,
-        ollama_base_url: str = "http://localhost:11434"
+        ollama_base_url: str = "http://localhost:11434",
+        retriever=None,
+        retrieval_mode: str = "vector",
+        generation_mode: str = "default",
+        keep_alive: Optional[str] = None,
+        client_pool=None,
+        scheduler=None,
+        extractive=None,
+        router=None
     ):
         """
         Initialise la chaîne RAG
@@ -47,29 +68,46 @@ Answer directly and naturally:"""
             openai_api_key: Clé API OpenAI (si use_ollama=False)
             use_ollama: Utiliser Ollama au lieu d'OpenAI
             ollama_base_url: URL de base d'Ollama
+            retriever: Gestionnaire de recherche (VectorStoreManager ou ShardManager), prioritaire sur vector_store
+            retrieval_mode: "vector" (top-k) ou "graph" (top-k étendu aux notes liées)
+            generation_mode: "default" ou "prefix_cache" (prompt à préfixe stable, cache KV réutilisé)
+            keep_alive: Durée pendant laquelle Ollama garde le modèle chargé (ex. "30m")
+            client_pool: Pool de clients partagé (ClientPool) ; un client dédié est créé sinon
+            scheduler: Ordonnanceur de génération (GenerationScheduler) ; générations non limitées sinon
+            extractive: Sélecteur de phrases (ExtractiveAnswerer) pour les réponses sans LLM
+            router: Routeur (ModelRouter) entre un modèle rapide et model_name ; un seul modèle sinon
         """
         self.vector_store = vector_store
+        self.retriever = retriever
+        self.retrieval_mode = retrieval_mode
+        self.generation_mode = generation_mode
+        self.use_ollama = use_ollama
+        self.scheduler = scheduler
+        self.extractive = extractive
+        self.router = router
+        self.model_name = model_name
         self.top_k = top_k
         
         # Initialize LLM based on provider
-        if use_ollama:
-            print(f"🦙 Using Ollama for LLM: {model_name}")
-            self.llm = OllamaLLM(
-                model=model_name,
-                temperature=temperature,
-                base_url=ollama_base_url,
-                num_predict=max_tokens
-            )
-        else:
-            print(f"🤖 Utilisation d'OpenAI pour le LLM : {model_name}")
-            self.llm = ChatOpenAI(
-                model=model_name,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                api_key=openai_api_key
-            )
+        llm_options = dict(
+            temperature=temperature,
+            max_tokens=max_tokens,
+            openai_api_key=openai_api_key,
+            ollama_base_url=ollama_base_url,
+            keep_alive=keep_alive,
+            client_pool=client_pool
+        )
+        self.llm = self._create_llm(model_name, **llm_options)
+        
+        # Un client et un cache de préfixe (cache KV d'Ollama) par niveau de modèle
+        self.llms = {'large': self.llm}
+        if router is not None:
+            self.llms['fast'] = self._create_llm(router.models['fast'], **llm_options)
+        self.prefix_caches = {tier: PromptPrefixCache() for tier in self.llms}
+        self.prefix_cache = self.prefix_caches['large']
         
         # Créer le prompt
+        self.prompt_template = self.DEFAULT_PROMPT_TEMPLATE
         self.prompt = ChatPromptTemplate.from_template(self.DEFAULT_PROMPT_TEMPLATE)
         
         # Créer la chaîne
@@ -80,10 +118,114 @@ Answer directly and naturally:"""
             | StrOutputParser()
         )
     
+    def _create_llm(
+        self,
+        model_name: str,
+        temperature: float,
+        max_tokens: int,
+        openai_api_key: Optional[str],
+        ollama_base_url: str,
+        keep_alive: Optional[str],
+        client_pool
+    ):
+        """Crée le client LLM d'un modèle (partagé par le pool s'il est fourni)"""
+        if client_pool is not None:
+            print(f"{'🦙' if self.use_ollama else '🤖'} LLM partagé (pool de connexions) : {model_name}")
+            return client_pool.llm(
+                model=model_name,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                use_ollama=self.use_ollama,
+                base_url=ollama_base_url,
+                api_key=openai_api_key,
+                keep_alive=keep_alive
+            )
+        if self.use_ollama:
+            print(f"🦙 Using Ollama for LLM: {model_name}")
+            return OllamaLLM(
+                model=model_name,
+                temperature=temperature,
+                base_url=ollama_base_url,
+                num_predict=max_tokens,
+                keep_alive=keep_alive
+            )
+        print(f"🤖 Utilisation d'OpenAI pour le LLM : {model_name}")
+        return ChatOpenAI(
+            model=model_name,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            api_key=openai_api_key
+        )
+    
+    def _route(
+        self,
+        question: str,
+        docs_and_scores: List[tuple],
+        context_chars: int,
+        tier: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Choisit le modèle d'une génération
+        
+        Args:
+            question: Question de l'utilisateur
+            docs_and_scores: Chunks récupérés avec leurs distances
+            context_chars: Taille du contexte envoyé au LLM
+            tier: Niveau imposé (sans classification de la question)
+            
+        Returns:
+            Dictionnaire {'tier', 'model', 'reason'} (niveau "large" sans routeur)
+        """
+        if self.router is None:
+            return {'tier': 'large', 'model': self.model_name, 'reason': 'single_model'}
+        queue_depth = self.scheduler.queue_depth() if self.scheduler is not None else 0
+        return self.router.route(question, docs_and_scores, context_chars, queue_depth, tier=tier)
+    
+    def _retrieve(
+        self,
+        question: str,
+        vaults: Optional[List[str]] = None,
+        query_vector: Optional[List[float]] = None
+    ) -> List[tuple]:
+        """
+        Récupère les documents pertinents selon le mode de récupération
+        
+        Args:
+            question: Question de l'utilisateur
+            vaults: Noms des vaults à interroger (ShardManager uniquement)
+            query_vector: Vecteur de la question, s'il est déjà calculé
+            
+        Returns:
+            Liste de tuples (Document, score)
+        """
+        if self.retriever is None:
+            if query_vector is not None:
+                return self.vector_store.similarity_search_with_score_by_vector(query_vector, k=self.top_k)
+            return self.vector_store.similarity_search_with_score(question, k=self.top_k)
+        
+        search_kwargs = {'vaults': vaults} if vaults else {}
+        if query_vector is not None:
+            if self.retrieval_mode == "graph":
+                return self.retriever.similarity_search_with_links_by_vector(query_vector, k=self.top_k, **search_kwargs)
+            return self.retriever.similarity_search_by_vector(query_vector, k=self.top_k, **search_kwargs)
+        
+        if self.retrieval_mode == "graph":
+            return self.retriever.similarity_search_with_links(question, k=self.top_k, **search_kwargs)
+        
+        return self.retriever.similarity_search(question, k=self.top_k, **search_kwargs)
+    
+    def _embed_query(self, question: str) -> List[float]:
+        """Calcule le vecteur de la question avec le modèle d'embeddings de l'index"""
+        if self.retriever is not None:
+            return self.retriever.embed_query(question)
+        return self.vector_store.embeddings.embed_query(question)
+    
     def _format_docs(self, question: str) -> str:
         """Formate les documents récupérés"""
-        docs = self.vector_store.similarity_search(question, k=self.top_k)
-        
+        return self._format_docs_list([doc for doc, _ in self._retrieve(question)])
+    
+    def _format_docs_list(self, docs: List[Document]) -> str:
+        """Formate une liste de documents en contexte"""
         context_parts = []
         for i, doc in enumerate(docs, 1):
             source = doc.metadata.get('source', 'Inconnu')
@@ -91,57 +233,398 @@ Answer directly and naturally:"""
         
         return "\n".join(context_parts)
     
-    def query(self, question: str) -> Dict[str, Any]:
+    def query(
+        self,
+        question: str,
+        vaults: Optional[List[str]] = None,
+        user: Optional[str] = None,
+        priority: str = "interactive",
+        deadline: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+        docs_and_scores: Optional[List[tuple]] = None
+    ) -> Dict[str, Any]:
         """
         Interroge le système RAG
         
         Args:
             question: Question de l'utilisateur
+            vaults: Noms des vaults à interroger (tous par défaut)
+            user: Identifiant de l'utilisateur (file équitable de l'ordonnanceur)
+            priority: "interactive" ou "batch"
+            deadline: Échéance (time.monotonic()) pour obtenir un créneau de génération
+            cancel: Événement positionné par l'appelant pour abandonner la requête
+            docs_and_scores: Documents déjà récupérés (recherche sautée), ex : suite d'une conversation
             
         Returns:
             Dictionnaire avec la réponse et les métadonnées
         """
-        # Récupérer les documents
-        docs = self.vector_store.similarity_search(question, k=self.top_k)
+        # Même préparation que query_with_scores (GENERATION_MODE, routage, prompt personnalisé)
+        docs_and_scores, prompt_text, shared_chars, route = self._prepare(question, vaults, docs_and_scores, user)
         
         # Générer la réponse
-        answer = self.chain.invoke(question)
+        with self._slot(user, priority, deadline, cancel):
+            answer, generation_info = self._generate(prompt_text, cancel, route)
         
-        response = {
+        response = self._build_response(answer, docs_and_scores, generation_info, prompt_text, shared_chars, route)
+        docs = response['source_documents']
+        response.pop('scores', None)
+        response['sources'] = self._format_sources(docs)
+        return response
+    
+    def query_with_scores(
+        self,
+        question: str,
+        vaults: Optional[List[str]] = None,
+        user: Optional[str] = None,
+        priority: str = "interactive",
+        deadline: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+        docs_and_scores: Optional[List[tuple]] = None
+    ) -> Dict[str, Any]:
+        """
+        Interroge avec les scores de similarité
+        
+        Args:
+            question: Question de l'utilisateur
+            vaults: Noms des vaults à interroger (tous par défaut)
+            user, priority, deadline, cancel, docs_and_scores: Voir query()
+            
+        Returns:
+            Dictionnaire avec réponse, sources et scores
+        """
+        docs_and_scores, prompt_text, shared_chars, route = self._prepare(question, vaults, docs_and_scores, user)
+        
+        # Générer la réponse
+        with self._slot(user, priority, deadline, cancel):
+            answer, generation_info = self._generate(prompt_text, cancel, route)
+        return self._build_response(answer, docs_and_scores, generation_info, prompt_text, shared_chars, route)
+    
+    def stream_query_with_scores(
+        self,
+        question: str,
+        vaults: Optional[List[str]] = None,
+        user: Optional[str] = None,
+        priority: str = "interactive",
+        deadline: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+        docs_and_scores: Optional[List[tuple]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Interroge avec les scores de similarité, en diffusant la réponse au fil de la génération
+        
+        Fermer l'itérateur (lecteur parti) interrompt la génération et libère
+        le créneau de l'ordonnanceur.
+        
+        Args:
+            question: Question de l'utilisateur
+            vaults: Noms des vaults à interroger (tous par défaut)
+            user, priority, deadline, cancel, docs_and_scores: Voir query()
+            
+        Returns:
+            Itérateur d'événements : {'type': 'token', 'text': ...} pour chaque fragment,
+            puis {'type': 'response', 'response': ...} avec la réponse complète
+        """
+        docs_and_scores, prompt_text, shared_chars, route = self._prepare(question, vaults, docs_and_scores, user)
+        
+        # Ollama ne renvoie pas les compteurs de tokens via stream()
+        yield from self._stream_answer(
+            prompt_text,
+            lambda answer: self._build_response(answer, docs_and_scores, {}, prompt_text, shared_chars, route),
+            user, priority, deadline, cancel, route
+        )
+    
+    def query_overview(
+        self,
+        question: str,
+        context: str,
+        sources: List[Dict[str, Any]],
+        user: Optional[str] = None,
+        priority: str = "interactive",
+        deadline: Optional[float] = None,
+        cancel: Optional[threading.Event] = None
+    ) -> Dict[str, Any]:
+        """
+        Répond à une question sur tout le vault à partir de l'index de sujets
+        
+        Une seule génération courte sur les sujets et résumés précalculés,
+        au lieu d'une recherche top-k sur quelques chunks.
+        
+        Args:
+            question: Question de l'utilisateur
+            context: Sujets et résumés de notes (TopicIndex.overview_context)
+            sources: Sujets cités, au format des sources
+            user, priority, deadline, cancel: Voir query()
+            
+        Returns:
+            Dictionnaire avec réponse et sources ('answer_mode' : "overview")
+        """
+        prompt_text = self.OVERVIEW_PROMPT_TEMPLATE.format(context=context, question=question)
+        route = self._route(question, [], len(context))
+        with self._slot(user, priority, deadline, cancel):
+            answer, generation_info = self._generate(prompt_text, cancel, route)
+        return self._build_overview_response(answer, sources, generation_info, route)
+    
+    def stream_query_overview(
+        self,
+        question: str,
+        context: str,
+        sources: List[Dict[str, Any]],
+        user: Optional[str] = None,
+        priority: str = "interactive",
+        deadline: Optional[float] = None,
+        cancel: Optional[threading.Event] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Version diffusée de query_overview (événements de stream_query_with_scores)
+        """
+        prompt_text = self.OVERVIEW_PROMPT_TEMPLATE.format(context=context, question=question)
+        route = self._route(question, [], len(context))
+        yield from self._stream_answer(
+            prompt_text,
+            lambda answer: self._build_overview_response(answer, sources, {}, route),
+            user, priority, deadline, cancel, route
+        )
+    
+    def complete(
+        self,
+        prompt_text: str,
+        user: Optional[str] = None,
+        priority: str = "batch",
+        deadline: Optional[float] = None,
+        tier: Optional[str] = "fast"
+    ) -> str:
+        """
+        Génération courte hors RAG (résumés, libellés), soumise à l'ordonnanceur
+        
+        Le prompt n'est pas une question : il n'est pas classifié, le niveau
+        est choisi par l'appelant (modèle rapide par défaut).
+        
+        Args:
+            prompt_text: Prompt complet
+            user, priority, deadline: Voir query() (priorité batch par défaut)
+            tier: Niveau de modèle ("fast" ou "large" ; None = classifier le prompt)
+            
+        Returns:
+            Texte généré
+        """
+        route = self._route(prompt_text, [], len(prompt_text), tier=tier)
+        with self._slot(user, priority, deadline, None):
+            return self._generate(prompt_text, route=route)[0]
+    
+    def _stream_answer(
+        self,
+        prompt_text: str,
+        build_response,
+        user: Optional[str],
+        priority: str,
+        deadline: Optional[float],
+        cancel: Optional[threading.Event],
+        route: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Diffuse la génération dans un créneau de l'ordonnanceur, puis la réponse complète"""
+        parts = []
+        with self._slot(user, priority, deadline, cancel):
+            tokens = self._stream_tokens(prompt_text, cancel, route)
+            try:
+                for text in tokens:
+                    parts.append(text)
+                    yield {'type': 'token', 'text': text}
+            finally:
+                tokens.close()
+        
+        yield {'type': 'response', 'response': build_response("".join(parts))}
+    
+    def _build_overview_response(
+        self,
+        answer: str,
+        sources: List[Dict[str, Any]],
+        generation_info: Dict[str, Any],
+        route: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Assemble la réponse d'une question sur tout le vault"""
+        prompt_tokens = generation_info.get('prompt_eval_count') or 0
+        completion_tokens = generation_info.get('eval_count') or 0
+        return {
             'answer': answer,
-            'source_documents': docs,
-            'sources': self._format_sources(docs),
+            'answer_mode': "overview",
+            'routing': route,
+            'source_documents': [],
+            'scores': [source['score'] for source in sources],
+            'sources': sources,
             'usage': {
-                'total_tokens': 0,
-                'prompt_tokens': 0,
-                'completion_tokens': 0,
+                'total_tokens': prompt_tokens + completion_tokens,
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
                 'total_cost': 0.0
             }
         }
+    
+    def query_extractive(
+        self,
+        question: str,
+        vaults: Optional[List[str]] = None,
+        min_confidence: Optional[float] = None,
+        user: Optional[str] = None,
+        priority: str = "interactive",
+        deadline: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+        docs_and_scores: Optional[List[tuple]] = None,
+        query_vector: Optional[List[float]] = None
+    ) -> Dict[str, Any]:
+        """
+        Répond sans LLM avec les phrases des chunks les plus proches de la question
+        
+        Le vecteur de la question sert à la fois à la recherche et au score
+        des phrases. Si min_confidence est fourni et que la meilleure phrase
+        n'atteint pas ce score, la réponse est générée par le LLM à partir
+        des mêmes chunks.
+        
+        Args:
+            question: Question de l'utilisateur
+            vaults: Noms des vaults à interroger (tous par défaut)
+            min_confidence: Similarité cosinus minimale de la meilleure phrase (None = jamais de génération)
+            user, priority, deadline, cancel: Voir query() (génération de repli)
+            docs_and_scores: Documents déjà récupérés (recherche sautée)
+            query_vector: Vecteur de la question, s'il est déjà calculé
+            
+        Returns:
+            Dictionnaire avec réponse, sources et scores, plus 'answer_mode'
+            ("extractive" ou "generate"), 'highlights' et 'confidence'
+        """
+        docs_and_scores, extraction = self._extract(question, vaults, docs_and_scores, query_vector)
+        
+        if min_confidence is not None and extraction['confidence'] < min_confidence:
+            # Repli : génération à partir des chunks déjà récupérés
+            docs_and_scores, prompt_text, shared_chars, route = self._prepare(question, vaults, docs_and_scores, user)
+            with self._slot(user, priority, deadline, cancel):
+                answer, generation_info = self._generate(prompt_text, cancel, route)
+            response = self._build_response(answer, docs_and_scores, generation_info, prompt_text, shared_chars, route)
+            response['answer_mode'] = "generate"
+        else:
+            return self._extractive_response(docs_and_scores, extraction)
         
+        response['highlights'] = extraction['highlights']
+        response['confidence'] = extraction['confidence']
         return response
     
-    def query_with_scores(self, question: str) -> Dict[str, Any]:
+    def stream_query_extractive(
+        self,
+        question: str,
+        vaults: Optional[List[str]] = None,
+        min_confidence: Optional[float] = None,
+        user: Optional[str] = None,
+        priority: str = "interactive",
+        deadline: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+        docs_and_scores: Optional[List[tuple]] = None,
+        query_vector: Optional[List[float]] = None
+    ) -> Iterator[Dict[str, Any]]:
         """
-        Interroge avec les scores de similarité
+        Version diffusée de query_extractive
+        
+        Une réponse extractive est émise d'un bloc (un seul événement
+        'response') ; seule la génération de repli est diffusée fragment par
+        fragment.
+        
+        Args:
+            Voir query_extractive()
+            
+        Returns:
+            Itérateur d'événements de stream_query_with_scores
+        """
+        docs_and_scores, extraction = self._extract(question, vaults, docs_and_scores, query_vector)
+        if min_confidence is None or extraction['confidence'] >= min_confidence:
+            yield {'type': 'response', 'response': self._extractive_response(docs_and_scores, extraction)}
+            return
+        
+        docs_and_scores, prompt_text, shared_chars, route = self._prepare(question, vaults, docs_and_scores, user)
+        
+        def build_response(answer: str) -> Dict[str, Any]:
+            response = self._build_response(answer, docs_and_scores, {}, prompt_text, shared_chars, route)
+            response['answer_mode'] = "generate"
+            response['highlights'] = extraction['highlights']
+            response['confidence'] = extraction['confidence']
+            return response
+        
+        yield from self._stream_answer(prompt_text, build_response, user, priority, deadline, cancel, route)
+    
+    def _extract(
+        self,
+        question: str,
+        vaults: Optional[List[str]],
+        docs_and_scores: Optional[List[tuple]],
+        query_vector: Optional[List[float]]
+    ) -> Tuple[List[tuple], Dict[str, Any]]:
+        """Récupère les chunks (si nécessaire) et sélectionne les phrases les plus proches de la question"""
+        if self.extractive is None:
+            raise RuntimeError("Mode extractif non configuré (aucun ExtractiveAnswerer)")
+        
+        if query_vector is None:
+            query_vector = self._embed_query(question)
+        if docs_and_scores is None:
+            docs_and_scores = self._retrieve(question, vaults, query_vector=query_vector)
+        return docs_and_scores, self.extractive.extract(query_vector, docs_and_scores)
+    
+    def _extractive_response(self, docs_and_scores: List[tuple], extraction: Dict[str, Any]) -> Dict[str, Any]:
+        """Assemble une réponse extractive (sans génération)"""
+        response = self._build_response(extraction['answer'], docs_and_scores, {}, "", 0)
+        response.pop('prefill', None)
+        response['answer_mode'] = "extractive"
+        response['highlights'] = extraction['highlights']
+        response['confidence'] = extraction['confidence']
+        return response
+    
+    def _prepare(
+        self,
+        question: str,
+        vaults: Optional[List[str]],
+        docs_and_scores: Optional[List[tuple]] = None,
+        user: Optional[str] = None
+    ) -> Tuple[List[tuple], str, int, Dict[str, Any]]:
+        """
+        Récupère les documents, choisit le modèle et construit le prompt
         
         Args:
             question: Question de l'utilisateur
+            vaults: Noms des vaults à interroger
+            docs_and_scores: Documents déjà récupérés (recherche sautée)
+            user: Identifiant de l'utilisateur (préfixe de prompt suivi par utilisateur)
             
         Returns:
-            Dictionnaire avec réponse, sources et scores
+            Tuple (documents avec scores, prompt, caractères communs avec le prompt
+            précédent du même utilisateur sur le même modèle, routage)
         """
         # Obtenir les documents pertinents avec scores
-        docs_and_scores = self.vector_store.similarity_search_with_score(
-            question, k=self.top_k
-        )
+        if docs_and_scores is None:
+            docs_and_scores = self._retrieve(question, vaults)
         
-        # Formater le contexte
-        context = self._format_context(docs_and_scores)
+        route = self._route(question, docs_and_scores, sum(len(doc.page_content) for doc, _ in docs_and_scores))
         
-        # Générer la réponse
-        prompt_text = self.DEFAULT_PROMPT_TEMPLATE.format(context=context, question=question)
-        answer = self.llm.invoke(prompt_text)
+        # Formater le prompt
+        shared_chars = 0
+        if self.generation_mode == "prefix_cache":
+            prompt_text, shared_chars = self.prefix_caches[route['tier']].build_prompt(
+                [doc for doc, _ in docs_and_scores], question, user
+            )
+        else:
+            context = self._format_context(docs_and_scores)
+            prompt_text = self.prompt_template.format(context=context, question=question)
+        
+        return docs_and_scores, prompt_text, shared_chars, route
+    
+    def _build_response(
+        self,
+        answer: str,
+        docs_and_scores: List[tuple],
+        generation_info: Dict[str, Any],
+        prompt_text: str,
+        shared_chars: int,
+        route: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Assemble la réponse avec sources, scores, consommation et modèle utilisé"""
+        # Ollama omet prompt_eval_count quand le prompt est entièrement servi par son cache KV
+        prompt_tokens = generation_info.get('prompt_eval_count') or 0
+        completion_tokens = generation_info.get('eval_count') or 0
         
         response = {
             'answer': answer,
@@ -149,15 +632,99 @@ Answer directly and naturally:"""
             'scores': [float(score) for _, score in docs_and_scores],
             'sources': self._format_sources_with_scores(docs_and_scores),
             'usage': {
-                'total_tokens': 0,
-                'prompt_tokens': 0,
-                'completion_tokens': 0,
+                'total_tokens': prompt_tokens + completion_tokens,
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
                 'total_cost': 0.0
             }
         }
         
+        if route is not None:
+            response['routing'] = route
+        if self.generation_mode == "prefix_cache":
+            prefix_cache = self.prefix_caches[route['tier']] if route is not None else self.prefix_cache
+            response['prefill'] = prefix_cache.prefill_report(prompt_text, shared_chars, generation_info)
+        
         return response
     
+    def _slot(self, user: Optional[str], priority: str, deadline: Optional[float], cancel: Optional[threading.Event]):
+        """Créneau de génération de l'ordonnanceur (sans effet si aucun ordonnanceur)"""
+        if self.scheduler is None:
+            return nullcontext()
+        return self.scheduler.slot(user=user, priority=priority, deadline=deadline, cancel=cancel)
+    
+    def _stream_tokens(
+        self,
+        prompt_text: str,
+        cancel: Optional[threading.Event] = None,
+        route: Optional[Dict[str, Any]] = None
+    ) -> Iterator[str]:
+        """
+        Diffuse les fragments générés par le LLM
+        
+        La génération s'arrête si cancel est positionné ou si l'itérateur est
+        fermé : le flux HTTP est fermé, ce qui interrompt la génération côté
+        serveur (Ollama arrête de générer quand le client se déconnecte).
+        """
+        start = time.perf_counter()
+        stream = self._llm_for(route).stream(prompt_text)
+        try:
+            for chunk in stream:
+                if cancel is not None and cancel.is_set():
+                    raise GenerationCancelled("Génération interrompue par l'appelant")
+                text = getattr(chunk, 'content', chunk)
+                if text:
+                    yield text
+            self._record_latency(route, time.perf_counter() - start)
+        except (GeneratorExit, GenerationCancelled):
+            if self.scheduler is not None:
+                self.scheduler.record_cancellation()
+            raise
+        finally:
+            stream.close()
+    
+    def _generate(
+        self,
+        prompt_text: str,
+        cancel: Optional[threading.Event] = None,
+        route: Optional[Dict[str, Any]] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Génère la réponse du LLM
+        
+        Args:
+            prompt_text: Prompt complet
+            cancel: Événement d'annulation ; la réponse est alors générée en flux
+                pour pouvoir être interrompue (sans compteurs de tokens)
+            route: Routage de la génération (voir _route) ; grand modèle par défaut
+            
+        Returns:
+            Tuple (réponse, informations de génération renvoyées par Ollama)
+        """
+        if cancel is not None:
+            return "".join(self._stream_tokens(prompt_text, cancel, route)), {}
+        
+        llm = self._llm_for(route)
+        start = time.perf_counter()
+        if self.use_ollama:
+            generation = llm.generate([prompt_text]).generations[0][0]
+            answer, generation_info = generation.text, generation.generation_info or {}
+        else:
+            message = llm.invoke(prompt_text)
+            answer, generation_info = getattr(message, 'content', message), {}
+        
+        self._record_latency(route, time.perf_counter() - start)
+        return answer, generation_info
+    
+    def _llm_for(self, route: Optional[Dict[str, Any]]):
+        """Client LLM du niveau choisi par le routage"""
+        return self.llms[route['tier']] if route is not None else self.llm
+    
+    def _record_latency(self, route: Optional[Dict[str, Any]], elapsed_s: float):
+        """Transmet la durée d'une génération terminée au routeur"""
+        if self.router is not None and route is not None:
+            self.router.record(route['tier'], elapsed_s)
+    
     def _format_context(self, docs_and_scores: List[tuple]) -> str:
         """Format documents into context string - no document labels"""
         context_parts = []
@@ -179,7 +746,8 @@ Answer directly and naturally:"""
                     'source': source,
                     'file_name': doc.metadata.get('file_name', 'Inconnu'),
                     'tags': doc.metadata.get('tags', []),
-                    'links': doc.metadata.get('links', [])
+                    'links': doc.metadata.get('links', []),
+                    'also_in': doc.metadata.get('sources', [])[1:]
                 })
                 seen.add(source)
         
@@ -196,11 +764,24 @@ Answer directly and naturally:"""
                 'score': float(score),
                 'tags': doc.metadata.get('tags', []),
                 'links': doc.metadata.get('links', []),
+                'also_in': doc.metadata.get('sources', [])[1:],
                 'preview': doc.page_content[:200] + '...' if len(doc.page_content) > 200 else doc.page_content
             })
         
         return sources
     
+    def update_vector_store(self, vector_store):
+        """
+        Remplace la base vectorielle après une reconstruction
+        
+        Les clients LLM, le routeur, les caches de préfixe et le prompt
+        personnalisé sont conservés.
+        
+        Args:
+            vector_store: Nouvelle base vectorielle FAISS (utilisée sans retriever)
+        """
+        self.vector_store = vector_store
+    
     def update_prompt(self, template: str):
         """
         Met à jour le template de prompt
@@ -208,6 +789,7 @@ Answer directly and naturally:"""
         Args:
             template: Nouveau template de prompt
         """
+        self.prompt_template = template
         self.prompt = ChatPromptTemplate.from_template(template)
         
         # Recréer la chaîne avec le nouveau prompt
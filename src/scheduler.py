@@ -0,0 +1,288 @@
+"""
+Ordonnanceur de génération
+Limite la concurrence du LLM, avec priorités, file équitable par utilisateur,
+rejet par échéance et annulation
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Optional
+
+
+PRIORITIES = ("interactive", "batch")
+
+
+class AdmissionRejected(RuntimeError):
+    """Requête refusée : file pleine ou échéance impossible à tenir"""
+
+
+class GenerationCancelled(RuntimeError):
+    """Requête annulée par l'appelant (en attente ou pendant la génération)"""
+
+
+class _Ticket:
+    """Requête en attente (ou en cours) d'un créneau de génération"""
+
+    __slots__ = ('user', 'priority', 'deadline', 'enqueued_at', 'started_at', 'granted')
+
+    def __init__(self, user: str, priority: str, deadline: Optional[float]):
+        self.user = user
+        self.priority = priority
+        self.deadline = deadline
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.granted = False
+
+
+class GenerationScheduler:
+    """
+    Contrôle d'admission et ordonnancement des générations LLM
+
+    Au plus max_concurrency générations s'exécutent en même temps ; les autres
+    attendent dans une file par classe de priorité. Les requêtes interactives
+    passent toujours avant les requêtes batch, qui sont en outre limitées à
+    batch_concurrency créneaux. Dans une même classe, les utilisateurs sont
+    servis à tour de rôle : un utilisateur qui envoie cent requêtes n'en fait
+    pas attendre cent aux autres.
+
+    Une requête est refusée (AdmissionRejected) si la file est pleine, si le
+    temps d'attente estimé dépasse son échéance, ou si l'échéance expire
+    avant qu'un créneau ne se libère.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 2,
+        max_queue: int = 32,
+        batch_concurrency: int = 1,
+        interactive_deadline_s: float = 30.0,
+        batch_deadline_s: float = 0.0
+    ):
+        """
+        Initialise l'ordonnanceur
+
+        Args:
+            max_concurrency: Nombre maximum de générations simultanées
+            max_queue: Nombre maximum de requêtes en attente (toutes classes confondues)
+            batch_concurrency: Nombre maximum de générations batch simultanées
+            interactive_deadline_s: Attente maximale par défaut d'une requête interactive (0 = illimitée)
+            batch_deadline_s: Attente maximale par défaut d'une requête batch (0 = illimitée)
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.batch_concurrency = max(1, min(batch_concurrency, self.max_concurrency))
+        self.default_deadlines = {
+            'interactive': interactive_deadline_s,
+            'batch': batch_deadline_s
+        }
+
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        # Par priorité : utilisateur -> file de tickets, dans l'ordre du tour de rôle
+        self._queues: Dict[str, "OrderedDict[str, Deque[_Ticket]]"] = {p: OrderedDict() for p in PRIORITIES}
+        self._queued = {p: 0 for p in PRIORITIES}
+        self._running = {p: 0 for p in PRIORITIES}
+
+        # Métriques
+        self._service_time: Optional[float] = None
+        self._waits: Deque[float] = deque(maxlen=500)
+        self.admitted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.rejected = {'queue_full': 0, 'deadline': 0}
+
+    @contextmanager
+    def slot(
+        self,
+        user: Optional[str] = None,
+        priority: str = "interactive",
+        deadline: Optional[float] = None,
+        cancel: Optional[threading.Event] = None
+    ) -> Iterator[None]:
+        """
+        Attend un créneau de génération et le libère en sortie de bloc
+
+        Args:
+            user: Identifiant de l'utilisateur (file équitable)
+            priority: "interactive" ou "batch"
+            deadline: Échéance absolue (time.monotonic()) pour obtenir un créneau
+            cancel: Événement positionné par l'appelant pour abandonner l'attente
+
+        Raises:
+            AdmissionRejected: File pleine ou échéance dépassée
+            GenerationCancelled: cancel positionné pendant l'attente
+        """
+        ticket = self.acquire(user, priority, deadline, cancel)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def acquire(
+        self,
+        user: Optional[str] = None,
+        priority: str = "interactive",
+        deadline: Optional[float] = None,
+        cancel: Optional[threading.Event] = None
+    ) -> _Ticket:
+        """
+        Attend un créneau de génération (voir slot)
+
+        Returns:
+            Ticket à rendre avec release()
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Priorité inconnue : {priority} (attendu : {', '.join(PRIORITIES)})")
+
+        if deadline is None and self.default_deadlines[priority] > 0:
+            deadline = time.monotonic() + self.default_deadlines[priority]
+        ticket = _Ticket(user or "anonymous", priority, deadline)
+
+        with self._lock:
+            self._admit(ticket)
+            self._enqueue(ticket)
+            self._dispatch()
+
+            while not ticket.granted:
+                if cancel is not None and cancel.is_set():
+                    self._abandon(ticket)
+                    self.cancelled += 1
+                    raise GenerationCancelled("Requête annulée pendant l'attente")
+
+                timeout = 0.1 if cancel is not None else None
+                if ticket.deadline is not None:
+                    remaining = ticket.deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._abandon(ticket)
+                        self.rejected['deadline'] += 1
+                        raise AdmissionRejected("Échéance dépassée avant qu'un créneau de génération ne se libère")
+                    timeout = min(timeout or remaining, remaining)
+
+                self._condition.wait(timeout)
+
+            self._waits.append(ticket.started_at - ticket.enqueued_at)
+            return ticket
+
+    def release(self, ticket: _Ticket):
+        """Libère le créneau d'un ticket et réveille les requêtes en attente"""
+        with self._lock:
+            if not ticket.granted:
+                return
+            ticket.granted = False
+            self._running[ticket.priority] -= 1
+            self.completed += 1
+
+            # Moyenne glissante du temps de génération, pour estimer l'attente
+            elapsed = time.monotonic() - ticket.started_at
+            self._service_time = elapsed if self._service_time is None else 0.8 * self._service_time + 0.2 * elapsed
+
+            self._dispatch()
+
+    def record_cancellation(self):
+        """Compte une génération interrompue par l'appelant"""
+        with self._lock:
+            self.cancelled += 1
+
+    def _admit(self, ticket: _Ticket):
+        """Contrôle d'admission (verrou tenu) : file pleine ou attente estimée au-delà de l'échéance"""
+        if sum(self._queued.values()) >= self.max_queue:
+            self.rejected['queue_full'] += 1
+            raise AdmissionRejected(f"File de génération pleine ({self.max_queue} requêtes en attente)")
+
+        estimated = self._estimated_wait(ticket.priority)
+        if ticket.deadline is not None and time.monotonic() + estimated > ticket.deadline:
+            self.rejected['deadline'] += 1
+            raise AdmissionRejected(f"Attente estimée ({estimated:.1f} s) au-delà de l'échéance")
+
+        self.admitted += 1
+
+    def _estimated_wait(self, priority: str) -> float:
+        """Attente estimée d'une nouvelle requête, d'après la file et le temps de génération moyen"""
+        if self._service_time is None:
+            return 0.0
+        # Les requêtes interactives ne passent qu'après les interactives déjà en file
+        ahead = self._queued['interactive'] + (self._queued['batch'] if priority == 'batch' else 0)
+        running = sum(self._running.values())
+        if running < self.max_concurrency and ahead == 0:
+            return 0.0
+        return (ahead + 1) / self.max_concurrency * self._service_time
+
+    def _enqueue(self, ticket: _Ticket):
+        users = self._queues[ticket.priority]
+        users.setdefault(ticket.user, deque()).append(ticket)
+        self._queued[ticket.priority] += 1
+
+    def _abandon(self, ticket: _Ticket):
+        """Retire un ticket de la file, ou rend son créneau s'il vient de l'obtenir"""
+        if ticket.granted:
+            ticket.granted = False
+            self._running[ticket.priority] -= 1
+            self._dispatch()
+            return
+
+        users = self._queues[ticket.priority]
+        queue = users.get(ticket.user)
+        if queue is not None and ticket in queue:
+            queue.remove(ticket)
+            self._queued[ticket.priority] -= 1
+            if not queue:
+                del users[ticket.user]
+
+    def _dispatch(self):
+        """Attribue les créneaux libres (verrou tenu) : priorité, puis tour de rôle entre utilisateurs"""
+        granted = False
+        while sum(self._running.values()) < self.max_concurrency:
+            ticket = self._next_ticket()
+            if ticket is None:
+                break
+            ticket.granted = True
+            ticket.started_at = time.monotonic()
+            self._running[ticket.priority] += 1
+            granted = True
+        if granted:
+            self._condition.notify_all()
+
+    def _next_ticket(self) -> Optional[_Ticket]:
+        for priority in PRIORITIES:
+            if priority == 'batch' and self._running['batch'] >= self.batch_concurrency:
+                continue
+            users = self._queues[priority]
+            if not users:
+                continue
+
+            user, queue = next(iter(users.items()))
+            ticket = queue.popleft()
+            self._queued[priority] -= 1
+            # L'utilisateur servi passe en fin de tour
+            if queue:
+                users.move_to_end(user)
+            else:
+                del users[user]
+            return ticket
+        return None
+
+    def queue_depth(self) -> int:
+        """Nombre de requêtes en attente d'un créneau, toutes priorités confondues"""
+        with self._lock:
+            return sum(self._queued.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiques : profondeur de file, créneaux occupés, temps d'attente et rejets"""
+        with self._lock:
+            waits = sorted(self._waits)
+            percentile = lambda q: waits[min(len(waits) - 1, int(q * len(waits)))] * 1000 if waits else 0.0
+            return {
+                'max_concurrency': self.max_concurrency,
+                'running': dict(self._running),
+                'queue_depth': dict(self._queued),
+                'waiting_users': {p: len(users) for p, users in self._queues.items()},
+                'wait_p50_ms': percentile(0.5),
+                'wait_p95_ms': percentile(0.95),
+                'avg_generation_ms': (self._service_time or 0.0) * 1000,
+                'admitted': self.admitted,
+                'completed': self.completed,
+                'cancelled': self.cancelled,
+                'rejected': dict(self.rejected)
+            }
@@ -0,0 +1,254 @@
+"""
+Serveur multi-processus
+Pool de workers pré-forkés partageant un index memory-mappé en lecture seule
+"""
+
+import copy
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+from .config import Config
+from .knowledge_assistant import KnowledgeAssistant
+
+
+# Méthodes de KnowledgeAssistant exposées aux workers
+WORKER_METHODS = ('ask', 'search_documents', 'get_status')
+
+
+def _worker_main(worker_id: int, config: Config, requests: mp.Queue, results: mp.Queue):
+    """
+    Boucle d'un worker : ouvre l'index en memory-mapping puis traite les requêtes
+
+    Args:
+        worker_id: Numéro du worker
+        config: Configuration (index_mmap activé)
+        requests: File des requêtes de ce worker
+        results: File des résultats, partagée par tous les workers
+    """
+    try:
+        assistant = KnowledgeAssistant(config)
+        assistant.initialize()
+    except Exception as e:
+        results.put((None, worker_id, False, f"Initialisation du worker {worker_id} échouée : {e}"))
+        return
+
+    # Index réellement memory-mappé (False si faiss a dû le lire en mémoire privée)
+    flags = [shard.manager.index_shared for shard in assistant.shards.shards.values()]
+    shared = False if False in flags else (True if True in flags else None)
+    results.put((None, worker_id, True, shared))
+
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+
+        request_id, method, args, kwargs = request
+        try:
+            result = getattr(assistant, method)(*args, **kwargs)
+            results.put((request_id, worker_id, True, result))
+        except Exception as e:
+            results.put((request_id, worker_id, False, f"{type(e).__name__}: {e}"))
+
+
+class WorkerPool:
+    """
+    Pool de workers KnowledgeAssistant
+
+    Chaque worker est un processus qui ouvre le même snapshot d'index en lecture
+    seule par memory-mapping : les pages de l'index FAISS et du docstore compact
+    sont partagées par le cache de pages, donc la mémoire reste à peu près
+    constante quand le nombre de workers augmente. Le répartiteur envoie chaque
+    requête au worker qui a le moins de requêtes en cours.
+    """
+
+    def __init__(self, config: Config, num_workers: Optional[int] = None):
+        """
+        Initialise le pool (les workers sont démarrés par start())
+
+        Args:
+            config: Configuration de l'assistant
+            num_workers: Nombre de workers (défaut : config.serving_workers)
+        """
+        self.config = copy.copy(config)
+        self.config.index_mmap = True
+        self.num_workers = num_workers or config.serving_workers
+
+        # fork partage les modules déjà importés ; spawn en repli (Windows)
+        methods = mp.get_all_start_methods()
+        self._context = mp.get_context('fork' if 'fork' in methods else 'spawn')
+
+        self._results = self._context.Queue()
+        self._request_queues: List[mp.Queue] = []
+        self._processes: List[mp.Process] = []
+        self._outstanding: List[set] = []
+        self._shared: Dict[int, Optional[bool]] = {}
+        self._futures: Dict[int, Future] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._dispatcher: Optional[threading.Thread] = None
+        self._running = False
+
+    def start(self):
+        """Construit les index manquants, puis démarre les workers"""
+        if self._running:
+            return
+
+        # Construire les index absents une seule fois, avant de forker
+        builder = KnowledgeAssistant(self.config)
+        builder.shards.ensure_built()
+        for shard in builder.shards.shards.values():
+            shard.manager.unload()
+        del builder
+
+        for worker_id in range(self.num_workers):
+            self._request_queues.append(self._context.Queue())
+            self._outstanding.append(set())
+            self._processes.append(self._spawn(worker_id))
+
+        # Attendre que chaque worker ait ouvert l'index
+        for _ in range(self.num_workers):
+            _, worker_id, ok, payload = self._results.get()
+            if not ok:
+                self.close()
+                raise RuntimeError(payload)
+            self._shared[worker_id] = payload
+        if False in self._shared.values():
+            print("⚠️ Index non memory-mappé : chaque worker en garde sa propre copie en mémoire")
+
+        self._running = True
+        self._dispatcher = threading.Thread(target=self._collect_results, daemon=True, name="serving-dispatcher")
+        self._dispatcher.start()
+        print(f"🚀 {self.num_workers} workers démarrés (index memory-mappé)")
+
+    def _spawn(self, worker_id: int) -> mp.Process:
+        """Démarre le processus d'un worker"""
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, self.config, self._request_queues[worker_id], self._results),
+            daemon=True,
+            name=f"knowledge-worker-{worker_id}"
+        )
+        process.start()
+        return process
+
+    def _collect_results(self):
+        """Reçoit les résultats des workers et surveille les workers arrêtés"""
+        last_check = time.monotonic()
+        while self._running:
+            if time.monotonic() - last_check >= 1.0:
+                self._check_workers()
+                last_check = time.monotonic()
+
+            try:
+                request_id, worker_id, ok, payload = self._results.get(timeout=1.0)
+            except queue.Empty:
+                continue
+
+            if request_id is None:
+                # Message de démarrage d'un worker relancé
+                if not ok:
+                    print(f"❌ {payload}")
+                else:
+                    self._shared[worker_id] = payload
+                continue
+
+            with self._lock:
+                self._outstanding[worker_id].discard(request_id)
+                future = self._futures.pop(request_id, None)
+
+            if future is None:
+                continue
+            if ok:
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+
+    def _check_workers(self):
+        """Relance les workers arrêtés et fait échouer leurs requêtes en cours"""
+        for worker_id, process in enumerate(self._processes):
+            if process.is_alive() or not self._running:
+                continue
+
+            print(f"⚠️ Worker {worker_id} arrêté (code {process.exitcode}), redémarrage...")
+            with self._lock:
+                lost = [self._futures.pop(rid, None) for rid in self._outstanding[worker_id]]
+                self._outstanding[worker_id].clear()
+                self._request_queues[worker_id] = self._context.Queue()
+                self._processes[worker_id] = self._spawn(worker_id)
+
+            for future in filter(None, lost):
+                future.set_exception(RuntimeError(f"Worker {worker_id} arrêté pendant la requête"))
+
+    def submit(self, method: str, *args, **kwargs) -> Future:
+        """
+        Envoie une requête au worker le moins chargé
+
+        Args:
+            method: Méthode de KnowledgeAssistant ('ask', 'search_documents', 'get_status')
+            *args, **kwargs: Arguments de la méthode
+
+        Returns:
+            Future résolue avec le résultat de la méthode
+        """
+        if method not in WORKER_METHODS:
+            raise ValueError(f"Méthode non supportée : {method}")
+        if not self._running:
+            raise RuntimeError("Pool de workers non démarré. Appelez start() d'abord.")
+
+        future: Future = Future()
+        with self._lock:
+            request_id = next(self._ids)
+            worker_id = min(range(self.num_workers), key=lambda w: len(self._outstanding[w]))
+            self._outstanding[worker_id].add(request_id)
+            self._futures[request_id] = future
+            self._request_queues[worker_id].put((request_id, method, args, kwargs))
+
+        return future
+
+    def ask(self, question: str, **kwargs) -> Dict[str, Any]:
+        """Pose une question (voir KnowledgeAssistant.ask)"""
+        return self.submit('ask', question, **kwargs).result()
+
+    def search_documents(self, query: str, k: int = 5, **kwargs) -> list:
+        """Recherche des documents (voir KnowledgeAssistant.search_documents)"""
+        return self.submit('search_documents', query, k=k, **kwargs).result()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiques du pool"""
+        with self._lock:
+            return {
+                'num_workers': self.num_workers,
+                'alive_workers': sum(p.is_alive() for p in self._processes),
+                'outstanding': [len(o) for o in self._outstanding],
+                # Index partagé par memory-mapping (None : aucun index chargé au démarrage)
+                'shared': False if False in self._shared.values() else (
+                    True if True in self._shared.values() else None
+                )
+            }
+
+    def close(self):
+        """Arrête les workers"""
+        self._running = False
+        for request_queue in self._request_queues:
+            request_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+        with self._lock:
+            pending = list(self._futures.values())
+            self._futures.clear()
+        for future in pending:
+            future.set_exception(RuntimeError("Pool de workers arrêté"))
+
+    def __enter__(self) -> "WorkerPool":
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
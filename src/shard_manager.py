@@ -0,0 +1,407 @@
+"""
+Gestionnaire de shards
+Un index FAISS par vault, chargé à la demande, avec recherche parallèle
+"""
+
+import heapq
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from langchain_community.docstore.document import Document
+from .bundles import IndexMismatchError
+from .obsidian_loader import ObsidianLoader
+from .vector_store import VectorStoreManager
+
+
+class VaultShard:
+    """Un vault et son index FAISS"""
+
+    def __init__(self, name: str, loader: ObsidianLoader, manager: VectorStoreManager):
+        """
+        Initialise le shard
+
+        Args:
+            name: Nom du vault
+            loader: Chargeur du vault
+            manager: Gestionnaire de l'index du vault
+        """
+        self.name = name
+        self.loader = loader
+        self.manager = manager
+        self.last_used = 0.0
+        self.in_use = 0
+        self.resident_bytes = 0
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.manager.vector_store is not None
+
+
+class ShardManager:
+    """Gestionnaire des index de plusieurs vaults"""
+
+    def __init__(
+        self,
+        shards: List[VaultShard],
+        memory_budget_mb: float = 1024,
+        max_workers: int = 4,
+        rebuild_on_mismatch: bool = True
+    ):
+        """
+        Initialise le gestionnaire de shards
+
+        Args:
+            shards: Shards à gérer (le premier est le vault par défaut)
+            memory_budget_mb: Mémoire maximale des shards chargés (Mo)
+            max_workers: Nombre de threads pour la recherche parallèle
+            rebuild_on_mismatch: Reconstruire un index incompatible avec la configuration
+                (sinon IndexMismatchError)
+        """
+        if not shards:
+            raise ValueError("Aucun vault configuré")
+
+        self.shards: Dict[str, VaultShard] = {shard.name: shard for shard in shards}
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shard-search")
+        self._budget_lock = threading.Lock()
+        self.rebuild_on_mismatch = rebuild_on_mismatch
+
+    @classmethod
+    def from_vaults(
+        cls,
+        vaults: Dict[str, Path],
+        loader_factory: Callable[[Path], ObsidianLoader],
+        manager_factory: Callable[[str], VectorStoreManager],
+        memory_budget_mb: float = 1024,
+        max_workers: int = 4,
+        rebuild_on_mismatch: bool = True
+    ) -> "ShardManager":
+        """
+        Crée les shards à partir des vaults configurés
+
+        Args:
+            vaults: Dictionnaire {nom: chemin du vault}
+            loader_factory: Crée le chargeur d'un vault à partir de son chemin
+            manager_factory: Crée le gestionnaire d'index d'un vault à partir de son nom
+            memory_budget_mb: Mémoire maximale des shards chargés (Mo)
+            max_workers: Nombre de threads pour la recherche parallèle
+            rebuild_on_mismatch: Reconstruire un index incompatible avec la configuration
+        """
+        shards = [
+            VaultShard(name, loader_factory(path), manager_factory(name))
+            for name, path in vaults.items()
+        ]
+        return cls(
+            shards,
+            memory_budget_mb=memory_budget_mb,
+            max_workers=max_workers,
+            rebuild_on_mismatch=rebuild_on_mismatch
+        )
+
+    @property
+    def default(self) -> VaultShard:
+        """Shard du vault par défaut"""
+        return next(iter(self.shards.values()))
+
+    def _select(self, vaults: Optional[List[str]]) -> List[VaultShard]:
+        """Retourne les shards ciblés par une requête"""
+        if not vaults:
+            return list(self.shards.values())
+
+        unknown = [name for name in vaults if name not in self.shards]
+        if unknown:
+            raise ValueError(f"Vault(s) inconnu(s) : {', '.join(unknown)}")
+        return [self.shards[name] for name in vaults]
+
+    def build(self, name: str):
+        """
+        Construit (ou reconstruit) l'index d'un vault
+
+        L'index actif du shard continue de servir les requêtes pendant la
+        construction, puis est remplacé par le nouveau snapshot.
+
+        Args:
+            name: Nom du vault
+        """
+        shard = self.shards[name]
+        with shard.build_lock:
+            documents = shard.loader.load_documents()
+            if not documents:
+                raise ValueError(f"Aucun document trouvé dans le vault '{name}'")
+
+            shard.manager.create_vector_store(documents)
+            shard.manager.save_vector_store(vault_hash=shard.loader.vault_hash())
+
+        with shard.lock:
+            shard.last_used = time.monotonic()
+            shard.resident_bytes = shard.manager.memory_bytes()
+        self._enforce_budget(keep=name)
+
+    def import_bundle(self, name: str, bundle_path: Path, force: bool = False) -> str:
+        """
+        Importe une archive d'index dans un vault (voir VectorStoreManager.import_bundle)
+
+        Args:
+            name: Nom du vault
+            bundle_path: Fichier d'archive
+            force: Importer malgré une configuration différente
+
+        Returns:
+            Version du snapshot importé
+        """
+        shard = self.shards[name]
+        with shard.build_lock:
+            version = shard.manager.import_bundle(bundle_path, force=force)
+
+        with shard.lock:
+            if shard.is_loaded:
+                shard.resident_bytes = shard.manager.memory_bytes()
+        return version
+
+    def ensure_built(self, force_rebuild: bool = False):
+        """
+        Construit les index absents du disque (sans charger les autres)
+
+        Args:
+            force_rebuild: Reconstruire tous les index
+        """
+        for name, shard in self.shards.items():
+            if force_rebuild or not shard.manager.index_path.exists():
+                print(f"🔨 Construction de l'index du vault '{name}'...")
+                self.build(name)
+
+    def acquire(self, name: str) -> VectorStoreManager:
+        """
+        Réserve un shard, en chargeant son index si nécessaire
+
+        Le shard ne peut pas être déchargé avant l'appel à release().
+
+        Args:
+            name: Nom du vault
+
+        Returns:
+            Gestionnaire d'index chargé
+        """
+        shard = self.shards[name]
+        mismatch = None
+        with shard.lock:
+            shard.last_used = time.monotonic()
+            shard.in_use += 1
+            if shard.is_loaded:
+                # Basculer sur un snapshot publié par un autre processus
+                try:
+                    if shard.manager.refresh():
+                        shard.resident_bytes = shard.manager.memory_bytes()
+                except IndexMismatchError as e:
+                    print(f"⚠️ Nouveau snapshot ignoré, l'index actuel reste servi : {e}")
+                return shard.manager
+
+            try:
+                loaded = shard.manager.load_vector_store()
+            except IndexMismatchError as e:
+                shard.in_use -= 1
+                if not self.rebuild_on_mismatch:
+                    raise
+                mismatch = e
+            else:
+                if not loaded:
+                    shard.in_use -= 1
+                    raise ValueError(f"Index du vault '{name}' introuvable")
+                shard.resident_bytes = shard.manager.memory_bytes()
+
+        if mismatch is not None:
+            # Index produit par un autre modèle ou un autre chunking : ne pas le servir
+            print(f"🔨 {mismatch} -> reconstruction de l'index du vault '{name}'")
+            self.build(name)
+            return self.acquire(name)
+
+        self._enforce_budget(keep=name)
+        return shard.manager
+
+    def release(self, name: str):
+        """Libère un shard réservé par acquire()"""
+        shard = self.shards[name]
+        with shard.lock:
+            shard.in_use -= 1
+
+    def _enforce_budget(self, keep: str):
+        """Décharge les shards les moins récemment utilisés au-delà du budget mémoire"""
+        with self._budget_lock:
+            loaded = [shard for shard in self.shards.values() if shard.is_loaded]
+            resident = sum(shard.resident_bytes for shard in loaded)
+
+            for shard in sorted(loaded, key=lambda s: s.last_used):
+                if resident <= self.memory_budget_bytes:
+                    break
+                if shard.name == keep or shard.in_use > 0:
+                    continue
+
+                with shard.lock:
+                    if shard.in_use > 0:
+                        continue
+                    resident -= shard.resident_bytes
+                    shard.resident_bytes = 0
+                    shard.manager.unload()
+                print(f"📤 Shard '{shard.name}' déchargé (budget mémoire)")
+
+    def _fan_out(
+        self,
+        vaults: Optional[List[str]],
+        k: int,
+        search: Callable[[VectorStoreManager], List[Tuple[Document, float]]]
+    ) -> List[Tuple[Document, float]]:
+        """Exécute une recherche sur chaque shard en parallèle et fusionne les résultats"""
+        shards = self._select(vaults)
+
+        def run(shard: VaultShard) -> List[Tuple[Document, float]]:
+            manager = self.acquire(shard.name)
+            try:
+                results = search(manager)
+            finally:
+                self.release(shard.name)
+            # Copie étiquetée : le docstore non compact renvoie ses propres Documents, partagés entre requêtes
+            results = [
+                (Document(id=doc.id, page_content=doc.page_content, metadata={**doc.metadata, 'vault': shard.name}), score)
+                for doc, score in results
+            ]
+            return sorted(results, key=lambda item: item[1])
+
+        if len(shards) == 1:
+            per_shard = [run(shards[0])]
+        else:
+            per_shard = list(self.executor.map(run, shards))
+
+        # Fusion k-way (distances, plus bas = meilleur)
+        merged = heapq.merge(*per_shard, key=lambda item: item[1])
+        return [item for _, item in zip(range(k), merged)]
+
+    def embed_query(self, query: str) -> List[float]:
+        """Calcule le vecteur de la requête une seule fois pour tous les shards"""
+        return self.default.manager.embeddings.embed_query(query)
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 5,
+        score_threshold: Optional[float] = None,
+        vaults: Optional[List[str]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Recherche des documents similaires dans les vaults sélectionnés
+
+        Args:
+            query: Requête de recherche
+            k: Nombre de résultats à retourner
+            score_threshold: Score minimum de similarité
+            vaults: Noms des vaults à interroger (tous par défaut)
+
+        Returns:
+            Liste de tuples (Document, score) fusionnés
+        """
+        return self.similarity_search_by_vector(
+            self.embed_query(query), k=k, score_threshold=score_threshold, vaults=vaults
+        )
+
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 5,
+        score_threshold: Optional[float] = None,
+        vaults: Optional[List[str]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Recherche à partir d'un vecteur de requête déjà calculé (voir similarity_search)
+        """
+        return self._fan_out(
+            vaults, k,
+            lambda manager: manager.similarity_search_by_vector(embedding, k=k, score_threshold=score_threshold)
+        )
+
+    def similarity_search_with_links(
+        self,
+        query: str,
+        k: int = 5,
+        vaults: Optional[List[str]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Recherche étendue aux notes liées dans les vaults sélectionnés
+
+        Args:
+            query: Requête de recherche
+            k: Nombre de résultats directs par vault
+            vaults: Noms des vaults à interroger (tous par défaut)
+
+        Returns:
+            Liste de tuples (Document, score) fusionnés
+        """
+        return self.similarity_search_with_links_by_vector(self.embed_query(query), k=k, vaults=vaults)
+
+    def similarity_search_with_links_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 5,
+        vaults: Optional[List[str]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Recherche étendue aux notes liées, à partir d'un vecteur de requête déjà calculé
+        """
+        max_results = k + self.default.manager.graph_max_extra
+        return self._fan_out(
+            vaults, max_results,
+            lambda manager: manager.similarity_search_with_links_by_vector(embedding, k=k)
+        )
+
+    def vectors_by_ids(self, keys: List[Tuple[Optional[str], str]]) -> Dict[Tuple[Optional[str], str], np.ndarray]:
+        """
+        Retourne les vecteurs de chunks déjà récupérés, groupés par vault
+
+        Args:
+            keys: Tuples (vault, ID du chunk) ; un vault None désigne le vault par défaut
+
+        Returns:
+            Dictionnaire {(vault, ID): vecteur} ; les chunks introuvables sont ignorés
+        """
+        by_vault: Dict[Optional[str], List[str]] = {}
+        for vault, doc_id in keys:
+            by_vault.setdefault(vault, []).append(doc_id)
+
+        vectors = {}
+        for vault, ids in by_vault.items():
+            name = vault if vault in self.shards else self.default.name
+            manager = self.acquire(name)
+            try:
+                found = manager.vectors_by_ids(ids)
+            finally:
+                self.release(name)
+            vectors.update({(vault, doc_id): vector for doc_id, vector in found.items()})
+        return vectors
+
+    def get_stats(self) -> Dict:
+        """
+        Obtient les statistiques des shards
+
+        Returns:
+            Dictionnaire avec les statistiques globales et par vault
+        """
+        shards = {}
+        resident = 0
+        for name, shard in self.shards.items():
+            if shard.is_loaded:
+                resident += shard.resident_bytes
+                shards[name] = shard.manager.get_stats()
+            else:
+                shards[name] = {'status': 'non_chargée', 'index_path': str(shard.manager.index_path)}
+
+        num_documents = sum(stats.get('num_documents', 0) for stats in shards.values())
+        return {
+            'status': 'initialisée' if any(s.is_loaded for s in self.shards.values()) else 'non_initialisée',
+            'num_documents': num_documents,
+            'resident_mb': resident / (1024 * 1024),
+            'memory_budget_mb': self.memory_budget_bytes / (1024 * 1024),
+            'shards': shards
+        }
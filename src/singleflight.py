@@ -0,0 +1,171 @@
+"""
+Coalescence des requêtes identiques
+Les appels concurrents de même clé partagent une seule exécution (single-flight)
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional
+
+
+class _Flight:
+    """Exécution en cours, partagée par le meneur et les appelants qui l'ont rejointe"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.events: List[Any] = []
+        self.done = False
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        # Flux : lecteurs actifs, et abandon quand le dernier est parti
+        self.readers = 0
+        self.abandoned = threading.Event()
+
+
+class SingleFlight:
+    """
+    Coalescence des requêtes en cours
+
+    Le premier appelant d'une clé (le meneur) exécute la fonction ; les appels
+    de même clé arrivés avant la fin de l'exécution l'attendent et reçoivent
+    le même résultat (ou la même exception). Une fois l'exécution terminée,
+    la clé est libérée : ce n'est pas un cache, une requête ultérieure est
+    exécutée à nouveau.
+    """
+
+    def __init__(self):
+        """Initialise le coalesceur (aucune exécution en cours)"""
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def _join(self, key: Hashable):
+        """Rejoint l'exécution en cours de la clé, ou en crée une ; retourne (flight, meneur)"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and not flight.abandoned.is_set():
+                self.coalesced += 1
+                return flight, False
+
+            flight = _Flight()
+            self._flights[key] = flight
+            self.executions += 1
+            return flight, True
+
+    def _finish(self, key: Hashable, flight: _Flight):
+        """Termine l'exécution et réveille les appelants en attente"""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        with flight.condition:
+            flight.done = True
+            flight.condition.notify_all()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Exécute fn une seule fois pour tous les appels concurrents de même clé
+
+        Args:
+            key: Clé de coalescence
+            fn: Fonction à exécuter
+
+        Returns:
+            Résultat de fn (partagé par tous les appelants)
+        """
+        flight, leader = self._join(key)
+
+        if leader:
+            try:
+                flight.result = fn()
+            except BaseException as e:
+                flight.error = e
+            finally:
+                self._finish(key, flight)
+        else:
+            with flight.condition:
+                flight.condition.wait_for(lambda: flight.done)
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def stream(self, key: Hashable, fn: Callable[[threading.Event], Iterable[Any]]) -> Iterator[Any]:
+        """
+        Partage un flux entre tous les appels concurrents de même clé
+
+        Le flux est produit dans un thread dédié, pour qu'un lecteur lent ne
+        ralentisse pas les autres. Chaque appelant reçoit tous les éléments
+        depuis le début, même s'il rejoint le flux en cours de route. Quand
+        tous les lecteurs ont fermé leur itérateur, le flux est abandonné :
+        l'événement passé à fn est positionné et le générateur est fermé.
+
+        Args:
+            key: Clé de coalescence
+            fn: Fonction recevant l'événement d'abandon et retournant le flux (générateur)
+
+        Returns:
+            Itérateur sur les éléments du flux
+        """
+        flight, leader = self._join(key)
+
+        if leader:
+            def produce():
+                events = None
+                try:
+                    events = fn(flight.abandoned)
+                    for event in events:
+                        if flight.abandoned.is_set():
+                            raise RuntimeError("Flux abandonné par tous ses lecteurs")
+                        with flight.condition:
+                            flight.events.append(event)
+                            flight.condition.notify_all()
+                except BaseException as e:
+                    flight.error = e
+                finally:
+                    # Fermer le générateur interrompt la production (génération LLM)
+                    if hasattr(events, 'close'):
+                        events.close()
+                    self._finish(key, flight)
+
+            threading.Thread(target=produce, daemon=True, name="singleflight-stream").start()
+
+        return self._follow(flight)
+
+    @staticmethod
+    def _follow(flight: _Flight) -> Iterator[Any]:
+        """Lit les éléments d'un flux partagé au fur et à mesure de leur production"""
+        position = 0
+        try:
+            # Compté à la première lecture : un itérateur jamais parcouru n'exécuterait
+            # pas le finally, et le flux ne serait jamais abandonné
+            with flight.condition:
+                flight.readers += 1
+            while True:
+                with flight.condition:
+                    flight.condition.wait_for(lambda: position < len(flight.events) or flight.done)
+                    pending = flight.events[position:]
+                    finished = flight.done
+
+                for event in pending:
+                    yield event
+                position += len(pending)
+
+                if finished:
+                    break
+        finally:
+            with flight.condition:
+                flight.readers -= 1
+                if flight.readers == 0 and not flight.done:
+                    flight.abandoned.set()
+
+        if flight.error is not None:
+            raise flight.error
+
+    def get_stats(self) -> Dict[str, int]:
+        """Statistiques de coalescence"""
+        with self._lock:
+            return {
+                'in_flight': len(self._flights),
+                'executions': self.executions,
+                'coalesced': self.coalesced
+            }
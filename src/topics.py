@@ -0,0 +1,376 @@
+"""
+Index de sujets
+Clusters de chunks et résumés de notes précalculés, pour les questions portant sur tout le vault
+"""
+
+import hashlib
+import json
+import re
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from langchain_community.docstore.document import Document
+
+
+TOPICS_FILE = "topics.json"
+
+# Questions sur l'ensemble du vault (anglais et français). La question entière doit
+# correspondre : "summarize my notes" en fait partie, pas "summarize my notes on
+# backpropagation" ni "which topics does Machine Learning.md cover?" (recherche habituelle)
+_SCOPE = r"(?:all\s+(?:of\s+)?)?(?:my|the)\s+(?:whole\s+|entire\s+)?(?:notes|vault|obsidian\s+vault|knowledge(?:\s+base)?)"
+_PORTEE = r"(?:toutes\s+)?(?:mes|les)\s+notes|(?:tout\s+)?(?:mon|le)\s+vault"
+_VAULT_WIDE = re.compile(
+    rf"""
+    (?:(?:can|could)\s+you\s+|please\s+|peux-tu\s+|pouvez-vous\s+)?
+    (?:
+        (?:summari[sz]e|give\s+me\s+a\s+summary\s+of)\s+(?:everything\s+in\s+)?{_SCOPE}
+      | (?:what|which)\s+(?:topics|subjects|themes)
+        (?:\s+(?:are\s+)?(?:in|across|covered\s+(?:in|by))\s+{_SCOPE}
+         | \s+(?:do|does)\s+{_SCOPE}\s+(?:cover|contain|include)
+         | \s+(?:have|did)\s+i\s+(?:study|studied|cover|covered|write\s+about|written\s+about))?
+      | (?:give\s+me\s+)?(?:an\s+)?overview\s+of\s+{_SCOPE}
+      | what\s+(?:have|did)\s+i\s+(?:study|studied|learn|learned|learnt)
+      | (?:résume[rz]?|résumé\s+de)\s+(?:{_PORTEE})
+      | quels?\s+(?:sont\s+les\s+)?(?:sujets|thèmes)
+        (?:\s+(?:de|dans|couverts\s+par|abordés\s+dans)\s+(?:{_PORTEE})
+         | \s+ai-je\s+(?:étudiés|abordés|couverts))?
+      | (?:une\s+)?vue\s+d'ensemble(?:\s+de\s+(?:{_PORTEE}))?
+    )
+    (?:\s+please|\s+s'il\s+(?:te|vous)\s+plaît)?
+    """,
+    re.IGNORECASE | re.VERBOSE
+)
+
+SUMMARY_PROMPT = """Summarize the following note in one or two sentences. Reply with the summary only.
+
+Title: {title}
+
+{text}
+
+Summary:"""
+
+LABEL_PROMPT = """These notes belong to the same topic:
+
+{notes}
+
+Give a short label (2 to 5 words) for this topic. Reply with the label only.
+
+Label:"""
+
+
+def is_vault_wide(question: str) -> bool:
+    """
+    Détecte les questions qui portent sur tout le vault plutôt que sur un passage
+
+    Args:
+        question: Question de l'utilisateur
+
+    Returns:
+        True pour les demandes de résumé global ou de liste des sujets
+    """
+    normalized = " ".join(question.split()).rstrip(" ?.!")
+    return bool(_VAULT_WIDE.fullmatch(normalized))
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray, block: int = 4096) -> np.ndarray:
+    """Index du centroïde le plus proche de chaque vecteur (par blocs pour borner la mémoire)"""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), block):
+        batch = vectors[start:start + block]
+        # |x - c|² = |x|² - 2 x·c + |c|², |x|² est constant par ligne
+        labels[start:start + block] = np.argmin(centroid_norms - 2 * batch @ centroids.T, axis=1)
+    return labels
+
+
+def _kmeans_plus_plus(sample: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """Centroïdes initiaux k-means++ : chaque nouveau centre est tiré loin des précédents"""
+    centroids = [sample[rng.integers(len(sample))]]
+    distances = ((sample - centroids[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = distances.sum()
+        index = rng.choice(len(sample), p=distances / total) if total > 0 else rng.integers(len(sample))
+        centroids.append(sample[index])
+        distances = np.minimum(distances, ((sample - sample[index]) ** 2).sum(axis=1))
+    return np.array(centroids, dtype=np.float32)
+
+
+def minibatch_kmeans(
+    vectors: np.ndarray,
+    n_clusters: int,
+    batch_size: int = 256,
+    max_iter: int = 100,
+    seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    K-means par mini-lots (Sculley, 2010), initialisé par k-means++
+
+    Chaque itération affecte un échantillon aléatoire aux centroïdes et les
+    déplace avec un pas qui décroît avec le nombre de points déjà vus.
+
+    Args:
+        vectors: Vecteurs (n, d)
+        n_clusters: Nombre de clusters (borné par n)
+        batch_size: Taille des mini-lots
+        max_iter: Nombre d'itérations
+        seed: Graine aléatoire (clusters reproductibles)
+
+    Returns:
+        Tuple (centroïdes (k, d), cluster de chaque vecteur (n,))
+    """
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    k = max(1, min(n_clusters, n))
+    centroids = _kmeans_plus_plus(vectors[rng.choice(n, min(n, 4096), replace=False)], k, rng)
+    counts = np.zeros(k)
+
+    for _ in range(max_iter):
+        batch = vectors[rng.choice(n, min(batch_size, n), replace=False)]
+        assignments = _nearest(batch, centroids)
+        for cluster in np.unique(assignments):
+            members = batch[assignments == cluster]
+            counts[cluster] += len(members)
+            rate = len(members) / counts[cluster]
+            centroids[cluster] = (1 - rate) * centroids[cluster] + rate * members.mean(axis=0)
+
+    return centroids, _nearest(vectors, centroids)
+
+
+class TopicIndex:
+    """
+    Index de sujets d'un vault
+
+    Contient un résumé par note (avec le hash de son contenu, pour ne
+    résumer à nouveau que les notes modifiées) et les clusters de chunks,
+    chacun avec un libellé et ses notes principales.
+    """
+
+    def __init__(
+        self,
+        clusters: Optional[List[Dict[str, Any]]] = None,
+        summaries: Optional[Dict[str, Dict[str, str]]] = None,
+        labels: Optional[Dict[str, str]] = None,
+        index_version: Optional[str] = None,
+        built_at: Optional[str] = None
+    ):
+        """
+        Initialise l'index de sujets
+
+        Args:
+            clusters: Clusters : {'label', 'size' (chunks), 'notes' (sources, les plus représentées d'abord)}
+            summaries: Résumés par source : {'hash', 'title', 'summary'}
+            labels: Libellés déjà générés, par signature de cluster (hash de ses notes)
+            index_version: Version du snapshot d'index à partir duquel l'index a été construit
+            built_at: Date de construction (ISO 8601)
+        """
+        self.clusters = clusters or []
+        self.summaries = summaries or {}
+        self.labels = labels or {}
+        self.index_version = index_version
+        self.built_at = built_at
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["TopicIndex"]:
+        """Charge l'index de sujets, ou None s'il n'existe pas (ou est illisible)"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def save(self, path: Path):
+        """Enregistre l'index de sujets (remplacement atomique)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'clusters': self.clusters,
+                'summaries': self.summaries,
+                'labels': self.labels,
+                'index_version': self.index_version,
+                'built_at': self.built_at
+            }, f, ensure_ascii=False)
+        tmp_path.replace(path)
+
+    def overview_context(self, max_chars: int = 6000, notes_per_cluster: int = 5) -> str:
+        """
+        Contexte compact pour une question sur tout le vault
+
+        Args:
+            max_chars: Taille maximale du contexte
+            notes_per_cluster: Nombre de notes résumées par sujet
+
+        Returns:
+            Sujets (du plus gros au plus petit) avec les résumés de leurs notes principales
+        """
+        parts = []
+        length = 0
+        for cluster in self.clusters:
+            lines = [f"Topic: {cluster['label']} ({len(cluster['notes'])} notes)"]
+            for source in cluster['notes'][:notes_per_cluster]:
+                note = self.summaries.get(source)
+                if note:
+                    lines.append(f"- {note['title']}: {note['summary']}")
+            block = "\n".join(lines)
+            if length + len(block) > max_chars and parts:
+                break
+            parts.append(block)
+            length += len(block) + 2
+        return "\n\n".join(parts)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiques de l'index de sujets"""
+        return {
+            'num_topics': len(self.clusters),
+            'num_notes': len(self.summaries),
+            'topics': [cluster['label'] for cluster in self.clusters],
+            'index_version': self.index_version,
+            'built_at': self.built_at
+        }
+
+
+def _group_notes(documents: List[Document]) -> Dict[str, Dict[str, str]]:
+    """Regroupe les chunks par note : titre, texte et hash du contenu"""
+    chunks = defaultdict(list)
+    titles = {}
+    for doc in documents:
+        source = doc.metadata.get('source', '')
+        # Un chunk dédoublonné appartient à toutes les notes de 'sources'
+        for owner in doc.metadata.get('sources') or [source]:
+            chunks[owner].append(doc.page_content)
+            titles.setdefault(owner, doc.metadata.get('file_name', source) if owner == source else Path(owner).stem)
+
+    notes = {}
+    for source, texts in chunks.items():
+        text = "\n\n".join(texts)
+        notes[source] = {
+            'title': titles[source],
+            'text': text,
+            'hash': hashlib.sha1(text.encode('utf-8')).hexdigest()
+        }
+    return notes
+
+
+def _fallback_summary(text: str, max_chars: int = 200) -> str:
+    """Résumé sans LLM : début de la note"""
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars].rsplit(' ', 1)[0] + "..."
+
+
+def _fallback_label(titles: List[str], max_words: int = 3) -> str:
+    """Libellé sans LLM : mots les plus fréquents des titres"""
+    words = Counter(
+        word for title in titles for word in re.findall(r"\w{4,}", title.lower())
+    )
+    return " / ".join(word for word, _ in words.most_common(max_words)) or (titles[0] if titles else "Divers")
+
+
+def build_topic_index(
+    documents: List[Document],
+    vectors: np.ndarray,
+    generate: Optional[Callable[[str], str]] = None,
+    previous: Optional[TopicIndex] = None,
+    n_clusters: int = 12,
+    summary_chars: int = 4000,
+    label_notes: int = 8,
+    index_version: Optional[str] = None
+) -> TopicIndex:
+    """
+    Construit l'index de sujets d'un vault
+
+    Seules les notes dont le contenu a changé depuis l'index précédent sont
+    résumées à nouveau ; un cluster dont les notes n'ont pas changé garde
+    son libellé.
+
+    Args:
+        documents: Chunks de l'index, dans l'ordre de l'index
+        vectors: Vecteurs des chunks (n, d), alignés sur documents
+        generate: Génération courte (prompt -> texte) ; sans LLM, résumés et libellés sont extraits
+        previous: Index de sujets précédent (résumés et libellés réutilisés)
+        n_clusters: Nombre de sujets
+        summary_chars: Nombre maximum de caractères d'une note envoyés pour son résumé
+        label_notes: Nombre de notes (les plus représentées) utilisées pour nommer un sujet
+        index_version: Version du snapshot d'index
+
+    Returns:
+        Nouvel index de sujets
+    """
+    previous = previous or TopicIndex()
+    notes = _group_notes(documents)
+
+    # Résumés par note, réutilisés si le contenu n'a pas changé
+    summaries = {}
+    regenerated = 0
+    for source, note in notes.items():
+        known = previous.summaries.get(source)
+        if known and known['hash'] == note['hash']:
+            summaries[source] = known
+            continue
+
+        summary = _fallback_summary(note['text'])
+        note_hash = note['hash']
+        if generate is not None:
+            try:
+                summary = generate(SUMMARY_PROMPT.format(title=note['title'], text=note['text'][:summary_chars])).strip()
+                regenerated += 1
+            except Exception as e:
+                # Résumé extrait en attendant : sans hash, la note est retentée à la prochaine construction
+                print(f"⚠️ Résumé de {note['title']} impossible : {e}")
+                note_hash = None
+        summaries[source] = {'hash': note_hash, 'title': note['title'], 'summary': summary}
+
+    # Clusters des chunks (vecteurs normalisés : distance cosinus)
+    normalized = np.asarray(vectors, dtype=np.float32)
+    normalized = normalized / np.maximum(np.linalg.norm(normalized, axis=1, keepdims=True), 1e-12)
+    _, assignments = minibatch_kmeans(normalized, n_clusters)
+
+    # Chaque note rejoint le cluster de la majorité de ses chunks
+    votes: Dict[str, Counter] = defaultdict(Counter)
+    for doc, cluster in zip(documents, assignments):
+        for owner in doc.metadata.get('sources') or [doc.metadata.get('source', '')]:
+            votes[owner][int(cluster)] += 1
+    members: Dict[int, List[Tuple[int, str]]] = defaultdict(list)
+    for source, counter in votes.items():
+        cluster, count = counter.most_common(1)[0]
+        members[cluster].append((count, source))
+
+    clusters = []
+    labels = {}
+    for cluster, notes_in_cluster in members.items():
+        ordered = [source for _, source in sorted(notes_in_cluster, key=lambda item: (-item[0], item[1]))]
+        signature = hashlib.sha1("\n".join(sorted(notes[s]['hash'] for s in ordered)).encode('utf-8')).hexdigest()
+
+        label = previous.labels.get(signature)
+        if label is None:
+            top = ordered[:label_notes]
+            label = _fallback_label([notes[s]['title'] for s in top])
+            if generate is not None:
+                listing = "\n".join(
+                    f"- {notes[s]['title']}: {summaries[s]['summary']}" if s in summaries else f"- {notes[s]['title']}"
+                    for s in top
+                )
+                try:
+                    label = generate(LABEL_PROMPT.format(notes=listing)).strip().strip('"').splitlines()[0]
+                except Exception as e:
+                    print(f"⚠️ Libellé de sujet impossible : {e}")
+        labels[signature] = label
+
+        clusters.append({
+            'label': label,
+            'size': int(sum(count for count, _ in notes_in_cluster)),
+            'notes': ordered
+        })
+
+    clusters.sort(key=lambda cluster: -cluster['size'])
+    print(f"🗂️ Index de sujets : {len(clusters)} sujets, {len(summaries)} notes ({regenerated} résumées)")
+
+    return TopicIndex(
+        clusters=clusters,
+        summaries=summaries,
+        labels=labels,
+        index_version=index_version,
+        built_at=datetime.now().isoformat(timespec='seconds')
+    )
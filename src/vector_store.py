@@ -3,13 +3,59 @@ Vector Store Manager
 Handles FAISS operations
 """
 
+import os
 import pickle
+import shutil
+import time
+from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+import faiss
+import numpy as np
 from langchain_community.vectorstores import FAISS
 from langchain_ollama import OllamaEmbeddings
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.docstore.document import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from .bundles import IndexMismatchError, export_bundle, import_bundle, manifest_mismatches, read_manifest, write_manifest
+from .compact_docstore import CompactDocstore, docstore_memory_report
+from .dedup import ChunkDeduplicator
+from .link_graph import LinkGraph
+from .quantization import (
+    benchmark, build_quantized_index, describe_index, index_memory_bytes,
+    load_full_vectors, save_full_vectors, search_with_rescoring
+)
+
+
+# Dossier de staging (.tmp-*) sans écriture depuis ce délai : écriture interrompue, supprimable
+STAGING_GRACE_S = 3600
+
+
+class IndexSnapshot:
+    """Index actif : base vectorielle, graphe de liens, vecteurs pleine précision et version, remplacés ensemble"""
+    
+    __slots__ = ('vector_store', 'link_graph', 'version', 'full_vectors', 'dedup', 'id_positions', 'memory_report')
+    
+    def __init__(
+        self,
+        vector_store: Optional[FAISS],
+        link_graph: Optional[LinkGraph],
+        version: Optional[str],
+        full_vectors: Optional[np.ndarray] = None,
+        dedup: Optional[Dict[str, Any]] = None,
+        memory_report: Optional[Dict[str, Any]] = None
+    ):
+        self.vector_store = vector_store
+        self.link_graph = link_graph
+        self.version = version
+        # Vecteurs float32 d'un index quantifié (memory-mappés une fois sauvegardés)
+        self.full_vectors = full_vectors
+        # Statistiques de déduplication des chunks à la construction
+        self.dedup = dedup
+        # ID du chunk -> position dans l'index, calculé à la première demande
+        self.id_positions: Optional[Dict[str, int]] = None
+        # Mémoire du docstore par chunk (parcours complet : une fois par snapshot)
+        self.memory_report = memory_report
 
 
 class VectorStoreManager:
@@ -21,7 +67,21 @@ class VectorStoreManager:
         embedding_model: str = "nomic-embed-text",
         openai_api_key: Optional[str] = None,
         use_ollama: bool = True,
-        ollama_base_url: str = "http://localhost:11434"
+        ollama_base_url: str = "http://localhost:11434",
+        graph_max_extra: int = 3,
+        graph_time_budget_ms: float = 50.0,
+        graph_link_penalty: float = 0.1,
+        graph_backlink_penalty: float = 0.2,
+        compact_docstore: bool = True,
+        snapshot_retention: int = 3,
+        index_mmap: bool = False,
+        quantization: str = "none",
+        pca_dim: int = 0,
+        rescore_factor: int = 4,
+        client_pool=None,
+        chunk_settings: Optional[Dict[str, Any]] = None,
+        dedup: str = "none",
+        dedup_threshold: float = 0.9
     ):
         """
         Initialise le gestionnaire de vector store
@@ -32,12 +92,36 @@ class VectorStoreManager:
             openai_api_key: Clé API OpenAI (si use_ollama=False)
             use_ollama: Utiliser Ollama au lieu d'OpenAI
             ollama_base_url: URL de base d'Ollama
+            graph_max_extra: Nombre maximum de chunks ajoutés par l'expansion par liens
+            graph_time_budget_ms: Budget de latence de l'expansion par liens (ms)
+            graph_link_penalty: Pénalité relative des notes liées (liens sortants)
+            graph_backlink_penalty: Pénalité relative des notes qui pointent vers un résultat
+            compact_docstore: Stocker les chunks dans un docstore compact (CompactDocstore)
+            snapshot_retention: Nombre de snapshots conservés sur disque (rollback)
+            index_mmap: Ouvrir l'index et le docstore en lecture seule par memory-mapping,
+                pour partager leurs pages entre plusieurs processus
+            quantization: Stockage de l'index de recherche : "none" (float32), "fp16" ou "int8"
+            pca_dim: Dimension après réduction PCA de l'index quantifié (0 = pas de PCA)
+            rescore_factor: Taille de la liste courte re-scorée en float32 (k * rescore_factor)
+            client_pool: Pool de clients partagé (ClientPool) ; un client dédié est créé sinon
+            chunk_settings: Paramètres de découpage du chargeur (chunk_size, chunk_overlap,
+                include_pdfs), enregistrés dans le manifeste et vérifiés au chargement
+            dedup: Fusion des chunks en double avant l'embedding : "none", "exact" ou "near" (MinHash/LSH)
+            dedup_threshold: Similarité de Jaccard minimale d'un quasi-doublon (mode "near")
         """
         self.store_path = Path(store_path)
         self.store_path.mkdir(parents=True, exist_ok=True)
         
         # Choose embeddings based on provider
-        if use_ollama:
+        if client_pool is not None:
+            print(f"{'🦙' if use_ollama else '🤖'} Embeddings partagés (pool de connexions) : {embedding_model}")
+            self.embeddings = client_pool.embeddings(
+                model=embedding_model,
+                use_ollama=use_ollama,
+                base_url=ollama_base_url,
+                api_key=openai_api_key
+            )
+        elif use_ollama:
             print(f"🦙 Using Ollama for embeddings: {embedding_model}")
             self.embeddings = OllamaEmbeddings(
                 model=embedding_model,
@@ -50,14 +134,117 @@ class VectorStoreManager:
                 openai_api_key=openai_api_key
             )
         
-        self.vector_store: Optional[FAISS] = None
-        self.index_path = self.store_path / "faiss_index"
-        self.metadata_path = self.store_path / "metadata.pkl"
+        self.snapshots_path = self.store_path / "snapshots"
+        self.current_pointer_path = self.store_path / "CURRENT"
+        self.snapshot_retention = snapshot_retention
+        self.index_mmap = index_mmap
+        # Index chargé par memory-mapping, donc partagé entre processus (None : non chargé ainsi)
+        self.index_shared: Optional[bool] = None
+        
+        # Index actif, remplacé d'un bloc lors d'une reconstruction
+        self._active = IndexSnapshot(None, None, None)
+        self._pointer_mtime_ns: Optional[int] = None
+        
+        # Expansion de la recherche par le graphe de liens
+        self.graph_max_extra = graph_max_extra
+        self.graph_time_budget_ms = graph_time_budget_ms
+        self.graph_link_penalty = graph_link_penalty
+        self.graph_backlink_penalty = graph_backlink_penalty
+        self.compact_docstore = compact_docstore
+        
+        # Index quantifié et re-scoring exact
+        self.quantization = quantization
+        self.pca_dim = pca_dim
+        self.rescore_factor = rescore_factor
+        
+        # Paramètres attendus d'un index chargé (manifeste)
+        self.chunk_settings = dict(chunk_settings or {})
+        
+        # Chunks identiques ou quasi identiques (modèles, copier-coller) fusionnés à la construction
+        self.deduplicator = ChunkDeduplicator(dedup, dedup_threshold)
+    
+    def expected_manifest(self) -> Dict[str, Any]:
+        """Paramètres de la configuration courante, comparés au manifeste des index chargés ou importés"""
+        return {
+            'embedding_model': getattr(self.embeddings, 'model', None),
+            **self.chunk_settings,
+            'dedup_mode': self._dedup_mode()
+        }
+    
+    def _dedup_mode(self) -> str:
+        """Mode de déduplication (avec son seuil en mode near) : il détermine les chunks indexés"""
+        deduplicator = self.deduplicator
+        return f"near:{deduplicator.threshold}" if deduplicator.mode == "near" else deduplicator.mode
+    
+    @property
+    def vector_store(self) -> Optional[FAISS]:
+        """Base vectorielle FAISS active"""
+        return self._active.vector_store
+    
+    @vector_store.setter
+    def vector_store(self, vector_store: Optional[FAISS]):
+        link_graph = LinkGraph.from_vector_store(vector_store) if vector_store is not None else None
+        self._active = IndexSnapshot(vector_store, link_graph, self._active.version, dedup=self._active.dedup)
+    
+    @property
+    def link_graph(self) -> Optional[LinkGraph]:
+        """Graphe de liens de l'index actif"""
+        return self._active.link_graph
+    
+    @property
+    def current_version(self) -> Optional[str]:
+        """Version du snapshot actif (None pour un index non publié ou ancien format)"""
+        return self._active.version
+    
+    def published_version(self) -> Optional[str]:
+        """Version publiée sur disque (sans charger l'index)"""
+        return self._read_pointer()
+    
+    def _read_pointer(self) -> Optional[str]:
+        """Lit la version publiée dans le fichier CURRENT"""
+        if not self.current_pointer_path.exists():
+            return None
+        version = self.current_pointer_path.read_text(encoding='utf-8').strip()
+        return version or None
+    
+    def _snapshot_dir(self, version: Optional[str]) -> Path:
+        """Dossier d'un snapshot (store_path pour l'ancien format non versionné)"""
+        return self.snapshots_path / version if version else self.store_path
+    
+    @property
+    def snapshot_dir(self) -> Path:
+        """Dossier du snapshot publié"""
+        return self._snapshot_dir(self._read_pointer())
+    
+    @property
+    def index_path(self) -> Path:
+        return self.snapshot_dir / "faiss_index"
+    
+    @property
+    def metadata_path(self) -> Path:
+        return self.snapshot_dir / "metadata.pkl"
+    
+    def list_snapshots(self) -> List[str]:
+        """
+        Liste les snapshots publiés, du plus ancien au plus récent
+        
+        Returns:
+            Liste des versions
+        """
+        if not self.snapshots_path.exists():
+            return []
+        return sorted(
+            p.name for p in self.snapshots_path.iterdir()
+            if p.is_dir() and not p.name.startswith('.')
+        )
     
     def create_vector_store(self, documents: List[Document]) -> FAISS:
         """
         Crée une nouvelle base vectorielle à partir des documents
         
+        L'index actif continue de servir les requêtes pendant la construction ;
+        le nouvel index le remplace d'un bloc une fois terminé.
+        
         Args:
             documents: Liste de documents à indexer
             
@@ -67,81 +254,450 @@ class VectorStoreManager:
         if not documents:
             raise ValueError("Aucun document fourni pour l'indexation")
         
+        # IDs calculés avant la déduplication : un chunk canonique garde son ID
+        ids = self._stable_chunk_ids(documents)
+        documents, kept, dedup_stats = self.deduplicator.deduplicate(documents)
+        ids = [ids[position] for position in kept]
+        removed = dedup_stats['input_chunks'] - dedup_stats['unique_chunks']
+        if removed:
+            print(
+                f"🧹 {removed} chunks en double fusionnés ({dedup_stats['dedup_ratio']:.1%} : "
+                f"{dedup_stats['exact_duplicates']} identiques, {dedup_stats['near_duplicates']} quasi identiques)"
+            )
+        
         print(f"🔨 Création de la base vectorielle à partir de {len(documents)} documents...")
         
-        self.vector_store = FAISS.from_documents(
+        vector_store = FAISS.from_documents(
             documents=documents,
-            embedding=self.embeddings
+            embedding=self.embeddings,
+            ids=ids
+        )
+        self._compact_docstore(vector_store)
+        full_vectors = self._quantize(vector_store)
+        self._active = IndexSnapshot(
+            vector_store, LinkGraph.from_vector_store(vector_store), None, full_vectors, dedup_stats,
+            self._docstore_report(vector_store)
         )
         
         print("✅ Base vectorielle créée avec succès")
-        return self.vector_store
+        return vector_store
     
-    def save_vector_store(self):
-        """Sauvegarde la base vectorielle sur disque"""
-        if self.vector_store is None:
+    def _quantize(self, vector_store: FAISS) -> Optional[np.ndarray]:
+        """
+        Remplace l'index plat par un index quantifié (si configuré)
+        
+        Args:
+            vector_store: Base vectorielle avec un index plat float32
+            
+        Returns:
+            Vecteurs pleine précision conservés pour le re-scoring, None sans quantification
+        """
+        if self.quantization == "none" and not self.pca_dim:
+            return None
+        
+        full_vectors = vector_store.index.reconstruct_n(0, vector_store.index.ntotal)
+        vector_store.index = build_quantized_index(full_vectors, self.quantization, self.pca_dim)
+        
+        description = describe_index(vector_store.index)
+        print(
+            f"🗜️ Index quantifié ({description['mode']}"
+            + (f", PCA {description['pca_dim']}" if description['pca_dim'] else "")
+            + f") : {index_memory_bytes(vector_store.index) / (1024 * 1024):.1f} Mo "
+            f"au lieu de {full_vectors.nbytes / (1024 * 1024):.1f} Mo"
+        )
+        return full_vectors
+    
+    @staticmethod
+    def _stable_chunk_ids(documents: List[Document]) -> List[str]:
+        """
+        Génère des IDs de chunks stables d'une reconstruction à l'autre
+        
+        Args:
+            documents: Chunks dans l'ordre du chargeur
+            
+        Returns:
+            IDs de la forme "<source>#<numéro du chunk dans la note>"
+        """
+        counters = {}
+        ids = []
+        for doc in documents:
+            source = doc.metadata.get('source', '')
+            counters[source] = counters.get(source, -1) + 1
+            ids.append(f"{source}#{counters[source]}")
+        return ids
+    
+    def save_vector_store(self, vault_hash: Optional[str] = None):
+        """
+        Sauvegarde la base vectorielle dans un nouveau snapshot versionné
+        
+        Le snapshot est écrit dans un dossier temporaire, renommé, puis publié
+        en remplaçant atomiquement le fichier CURRENT. Un arrêt brutal laisse
+        le snapshot précédent intact.
+        
+        Args:
+            vault_hash: Empreinte du contenu du vault indexé (enregistrée dans le manifeste)
+        """
+        active = self._active
+        if active.vector_store is None:
             raise ValueError("Aucune base vectorielle à sauvegarder")
         
-        print(f"💾 Sauvegarde de la base vectorielle dans {self.store_path}...")
+        version = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        staging_dir = self.snapshots_path / f".tmp-{version}"
+        staging_dir.mkdir(parents=True)
+        
+        print(f"💾 Sauvegarde de la base vectorielle dans {self.snapshots_path / version}...")
         
         # Sauvegarder l'index FAISS
-        self.vector_store.save_local(str(self.index_path))
+        vector_store = active.vector_store
+        index_path = staging_dir / "faiss_index"
+        if isinstance(vector_store.docstore, CompactDocstore):
+            # Les textes sont dans les fichiers du docstore compact (ouvrables par
+            # memory-mapping) : index.pkl ne garde que la correspondance des IDs
+            index_path.mkdir()
+            faiss.write_index(vector_store.index, str(index_path / "index.faiss"))
+            ids = [vector_store.index_to_docstore_id[i] for i in range(vector_store.index.ntotal)]
+            vector_store.docstore.save(index_path, ids)
+            with open(index_path / "index.pkl", 'wb') as f:
+                pickle.dump((InMemoryDocstore(), dict(vector_store.index_to_docstore_id)), f)
+        else:
+            vector_store.save_local(str(index_path))
+        
+        # Vecteurs pleine précision d'un index quantifié, pour le re-scoring
+        if active.full_vectors is not None:
+            save_full_vectors(active.full_vectors, staging_dir / "faiss_index")
         
-        # Sauvegarder les métadonnées supplémentaires
+        # Sauvegarder le graphe de liens
+        if active.link_graph is not None:
+            active.link_graph.save(staging_dir)
+        
+        # Manifeste : modèle, dimension et paramètres de chunking qui ont produit l'index
         metadata = {
-            'num_documents': len(self.vector_store.docstore._dict),
-            'embedding_model': getattr(self.embeddings, 'model', 'unknown')
+            'num_documents': active.vector_store.index.ntotal,
+            'embedding_model': getattr(self.embeddings, 'model', 'unknown'),
+            'embedding_dim': active.vector_store.index.d,
+            **self.chunk_settings,
+            'quantization': describe_index(active.vector_store.index),
+            'vault_hash': vault_hash,
+            'dedup': active.dedup,
+            'dedup_mode': self._dedup_mode(),
+            'version': version,
+            'created_at': datetime.now().isoformat(timespec='seconds')
         }
+        write_manifest(staging_dir, metadata)
         
-        with open(self.metadata_path, 'wb') as f:
+        with open(staging_dir / "metadata.pkl", 'wb') as f:
             pickle.dump(metadata, f)
         
-        print("✅ Base vectorielle sauvegardée avec succès")
+        # Publier : renommage du dossier puis remplacement du pointeur
+        os.rename(staging_dir, self.snapshots_path / version)
+        self._publish(version)
+        # Les vecteurs pleine précision sont désormais lus depuis le fichier memory-mappé
+        full_vectors = load_full_vectors(self.snapshots_path / version / "faiss_index")
+        self._active = IndexSnapshot(
+            active.vector_store, active.link_graph, version, full_vectors, active.dedup, active.memory_report
+        )
+        
+        self._remove_legacy_index()
+        self._prune_snapshots()
+        
+        print(f"✅ Base vectorielle sauvegardée avec succès (version {version})")
+    
+    def _publish(self, version: str):
+        """Remplace atomiquement le pointeur CURRENT"""
+        tmp_path = self.current_pointer_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.current_pointer_path)
+        self._pointer_mtime_ns = self.current_pointer_path.stat().st_mtime_ns
+    
+    def _prune_snapshots(self):
+        """Supprime les snapshots au-delà de la rétention (et les écritures interrompues)"""
+        # Un dossier de staging récent peut être l'écriture en cours d'un autre processus
+        # partageant VECTOR_STORE_PATH : seuls les dossiers abandonnés sont supprimés
+        for leftover in self.snapshots_path.glob(".tmp-*"):
+            if self._is_abandoned(leftover):
+                shutil.rmtree(leftover, ignore_errors=True)
+        
+        current = self._read_pointer()
+        snapshots = [v for v in self.list_snapshots() if v != current]
+        excess = len(snapshots) - max(self.snapshot_retention - 1, 0)
+        for version in snapshots[:max(excess, 0)]:
+            shutil.rmtree(self.snapshots_path / version, ignore_errors=True)
+    
+    @staticmethod
+    def _is_abandoned(staging_dir: Path) -> bool:
+        """Dossier de staging sans écriture depuis STAGING_GRACE_S (écriture interrompue)"""
+        try:
+            last_write = max(path.stat().st_mtime for path in [staging_dir, *staging_dir.rglob("*")])
+        except OSError:
+            # Dossier renommé ou supprimé pendant le parcours : il n'est pas abandonné
+            return False
+        return time.time() - last_write > STAGING_GRACE_S
     
-    def load_vector_store(self) -> bool:
+    def _remove_legacy_index(self):
+        """Supprime l'index de l'ancien format non versionné, remplacé par les snapshots"""
+        legacy_index = self.store_path / "faiss_index"
+        if legacy_index.exists():
+            shutil.rmtree(legacy_index)
+        for name in ("metadata.pkl", LinkGraph.FILE_NAME):
+            legacy_file = self.store_path / name
+            if legacy_file.exists():
+                legacy_file.unlink()
+    
+    def load_vector_store(self, version: Optional[str] = None) -> bool:
         """
         Charge la base vectorielle depuis le disque
         
+        Args:
+            version: Version du snapshot à charger (par défaut : version publiée)
+        
         Returns:
             True si chargée avec succès, False sinon
+            
+        Raises:
+            IndexMismatchError: Index construit avec un autre modèle d'embeddings,
+                une autre dimension ou d'autres paramètres de chunking que la configuration
         """
-        if not self.index_path.exists():
+        if self.current_pointer_path.exists():
+            self._pointer_mtime_ns = self.current_pointer_path.stat().st_mtime_ns
+        version = version or self._read_pointer()
+        snapshot_dir = self._snapshot_dir(version)
+        index_path = snapshot_dir / "faiss_index"
+        
+        if not index_path.exists():
             print("ℹ️ Aucune base vectorielle existante trouvée")
             return False
         
+        # Vérifier le manifeste avant de charger quoi que ce soit
+        manifest = read_manifest(snapshot_dir) or {}
+        mismatches = manifest_mismatches(manifest, self.expected_manifest())
+        if mismatches:
+            raise IndexMismatchError(f"Index {snapshot_dir} incompatible avec la configuration : " + " ; ".join(mismatches))
+        
         try:
-            print(f"📂 Chargement de la base vectorielle depuis {self.store_path}...")
+            print(f"📂 Chargement de la base vectorielle depuis {snapshot_dir}...")
             
-            self.vector_store = FAISS.load_local(
-                str(self.index_path),
-                self.embeddings,
-                allow_dangerous_deserialization=True
-            )
+            if CompactDocstore.exists(index_path):
+                vector_store = self._load_compact(index_path)
+            else:
+                vector_store = FAISS.load_local(
+                    str(index_path),
+                    self.embeddings,
+                    allow_dangerous_deserialization=True
+                )
+                self._compact_docstore(vector_store)
+            
+            if vector_store.index.d != manifest.get('embedding_dim', vector_store.index.d):
+                raise IndexMismatchError(
+                    f"Index {snapshot_dir} corrompu : dimension {vector_store.index.d}, "
+                    f"manifeste {manifest['embedding_dim']}"
+                )
             
-            # Charger les métadonnées
-            if self.metadata_path.exists():
-                with open(self.metadata_path, 'rb') as f:
-                    metadata = pickle.load(f)
-                print(f"✅ Base vectorielle chargée avec {metadata.get('num_documents', 'N/A')} documents")
+            # Charger le graphe de liens (reconstruit s'il est absent)
+            link_graph = LinkGraph.load(snapshot_dir)
+            if link_graph is None:
+                link_graph = LinkGraph.from_vector_store(vector_store)
             
+            # Remplacer l'index actif ; les requêtes en cours terminent sur l'ancien
+            self._active = IndexSnapshot(
+                vector_store, link_graph, version, load_full_vectors(index_path), manifest.get('dedup'),
+                self._docstore_report(vector_store)
+            )
+            
+            print(f"✅ Base vectorielle chargée avec {manifest.get('num_documents', 'N/A')} documents")
             return True
         
+        except IndexMismatchError:
+            raise
         except Exception as e:
             print(f"❌ Erreur lors du chargement de la base vectorielle : {e}")
             return False
     
+    def _load_compact(self, index_path: Path) -> FAISS:
+        """
+        Ouvre un snapshot dont les textes sont dans un docstore compact
+        
+        Avec index_mmap, l'index FAISS et le docstore compact sont ouverts en
+        lecture seule par memory-mapping : leurs pages sont partagées, via le
+        cache de pages, entre tous les processus qui ouvrent le même snapshot.
+        Sinon ils sont lus en mémoire.
+        
+        Args:
+            index_path: Dossier faiss_index du snapshot
+            
+        Returns:
+            Base vectorielle FAISS
+        """
+        index_file = str(index_path / "index.faiss")
+        if not self.index_mmap:
+            index = faiss.read_index(index_file)
+        elif not hasattr(faiss, 'IO_FLAG_MMAP_IFC'):
+            print("⚠️ Cette version de faiss ne memory-mappe pas les index plats (IO_FLAG_MMAP_IFC absent) : "
+                  "index lu en mémoire privée, non partagé entre processus")
+            index = faiss.read_index(index_file)
+            self.index_shared = False
+        else:
+            try:
+                index = faiss.read_index(
+                    index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+                )
+                self.index_shared = True
+            except RuntimeError as e:
+                print(f"⚠️ Memory-mapping de l'index impossible ({e}) : index lu en mémoire privée, non partagé entre processus")
+                index = faiss.read_index(index_file)
+                self.index_shared = False
+        docstore, ids = CompactDocstore.open(index_path)
+        if not self.index_mmap:
+            # Copie en mémoire, modifiable et sans fichier ouvert sur le snapshot
+            docstore = CompactDocstore.from_docstore(docstore, ids)
+        
+        return FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=dict(enumerate(ids))
+        )
+    
+    def refresh(self) -> bool:
+        """
+        Recharge l'index si un autre processus a publié un nouveau snapshot
+        
+        Returns:
+            True si un nouveau snapshot a été chargé
+        """
+        if self._active.vector_store is None or not self.current_pointer_path.exists():
+            return False
+        
+        mtime_ns = self.current_pointer_path.stat().st_mtime_ns
+        if mtime_ns == self._pointer_mtime_ns:
+            return False
+        
+        self._pointer_mtime_ns = mtime_ns
+        version = self._read_pointer()
+        if version == self._active.version:
+            return False
+        return self.load_vector_store(version)
+    
+    def rollback(self, version: Optional[str] = None) -> bool:
+        """
+        Republie un snapshot précédent et le charge
+        
+        Args:
+            version: Version à restaurer (par défaut : celle qui précède la version publiée)
+            
+        Returns:
+            True si le snapshot a été restauré
+        """
+        snapshots = self.list_snapshots()
+        current = self._read_pointer()
+        
+        if version is None:
+            older = [v for v in snapshots if current is None or v < current]
+            if not older:
+                print("ℹ️ Aucun snapshot précédent disponible")
+                return False
+            version = older[-1]
+        elif version not in snapshots:
+            raise ValueError(f"Snapshot inconnu : {version}")
+        
+        if not self.load_vector_store(version):
+            return False
+        self._publish(version)
+        print(f"⏪ Snapshot {version} restauré")
+        return True
+    
+    def export_bundle(self, output_path: Path, version: Optional[str] = None, compression: str = "gz") -> Dict[str, Any]:
+        """
+        Exporte un snapshot dans une archive unique (voir bundles.export_bundle)
+        
+        Args:
+            output_path: Fichier d'archive à créer
+            version: Version à exporter (par défaut : version publiée)
+            compression: "gz", "xz" ou "bz2"
+            
+        Returns:
+            Manifeste du bundle
+        """
+        version = version or self._read_pointer()
+        if version is None or not (self.snapshots_path / version).exists():
+            raise ValueError("Aucun snapshot publié à exporter")
+        return export_bundle(self.snapshots_path / version, output_path, compression)
+    
+    def import_bundle(self, bundle_path: Path, force: bool = False) -> str:
+        """
+        Importe une archive comme nouveau snapshot et la publie
+        
+        L'index actif est remplacé par le snapshot importé s'il était chargé.
+        
+        Args:
+            bundle_path: Fichier d'archive
+            force: Importer malgré un modèle ou des paramètres de chunking différents ;
+                le snapshot est publié mais ne sera chargé qu'une fois la configuration alignée
+            
+        Returns:
+            Version du snapshot importé
+        """
+        version, manifest = import_bundle(bundle_path, self.snapshots_path, self.expected_manifest(), force=force)
+        self._publish(version)
+        self._prune_snapshots()
+        
+        compatible = not manifest_mismatches(manifest, self.expected_manifest())
+        if compatible and self._active.vector_store is not None and not self.load_vector_store(version):
+            raise ValueError(f"Snapshot importé {version} illisible")
+        return version
+    
     def add_documents(self, documents: List[Document]):
         """
         Ajoute des documents à la base vectorielle existante
         
+        Les documents sont ajoutés à une copie de l'index, du docstore et des
+        vecteurs pleine précision, puis le nouvel index remplace l'actif d'un
+        bloc : les recherches en cours terminent sur l'ancien, et les fichiers
+        memory-mappés du snapshot ne sont pas modifiés. L'index obtenu reste en
+        mémoire jusqu'au prochain save_vector_store().
+        
         Args:
             documents: Documents à ajouter
         """
-        if self.vector_store is None:
+        active = self._active
+        if active.vector_store is None:
             raise ValueError("Base vectorielle non initialisée")
         
         print(f"➕ Ajout de {len(documents)} documents à la base vectorielle...")
-        self.vector_store.add_documents(documents)
+        current = active.vector_store
+        ids = [current.index_to_docstore_id[i] for i in range(current.index.ntotal)]
+        if isinstance(current.docstore, CompactDocstore):
+            docstore = CompactDocstore.from_docstore(current.docstore, ids)
+        else:
+            docstore = InMemoryDocstore({doc_id: current.docstore.search(doc_id) for doc_id in ids})
+        vector_store = FAISS(
+            embedding_function=self.embeddings,
+            # Copie possédée : un index memory-mappé ne peut pas grandir
+            index=faiss.deserialize_index(faiss.serialize_index(current.index)),
+            docstore=docstore,
+            index_to_docstore_id=dict(current.index_to_docstore_id)
+        )
+        
+        texts = [doc.page_content for doc in documents]
+        embeddings = np.array(self.embeddings.embed_documents(texts), dtype=np.float32)
+        vector_store.add_embeddings(
+            list(zip(texts, embeddings.tolist())),
+            metadatas=[doc.metadata for doc in documents],
+            ids=[doc.id for doc in documents] if all(doc.id for doc in documents) else None
+        )
+        
+        # Index quantifié : les vecteurs pleine précision du re-scoring sont complétés
+        # dans un nouveau tableau (le fichier memory-mappé du snapshot reste intact)
+        full_vectors = None
+        if active.full_vectors is not None:
+            full_vectors = np.concatenate([active.full_vectors, embeddings])
+        
+        self._active = IndexSnapshot(
+            vector_store, LinkGraph.from_vector_store(vector_store), None, full_vectors, active.dedup,
+            self._docstore_report(vector_store)
+        )
         print("✅ Documents ajoutés avec succès")
     
     def similarity_search(
@@ -164,8 +720,34 @@ class VectorStoreManager:
         if self.vector_store is None:
             raise ValueError("Base vectorielle non initialisée")
         
+        return self.similarity_search_by_vector(
+            self.embeddings.embed_query(query), k=k, score_threshold=score_threshold
+        )
+    
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 5,
+        score_threshold: Optional[float] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Recherche des documents similaires à un vecteur de requête déjà calculé
+        
+        Args:
+            embedding: Vecteur de la requête
+            k: Nombre de résultats à retourner
+            score_threshold: Score minimum de similarité
+            
+        Returns:
+            Liste de tuples (Document, score)
+        """
+        active = self._active
+        if active.vector_store is None:
+            raise ValueError("Base vectorielle non initialisée")
+        
         # Obtenir les documents avec scores
-        docs_and_scores = self.vector_store.similarity_search_with_score(query, k=k)
+        hits = self._search_positions(active, np.array([embedding], dtype=np.float32), k)
+        docs_and_scores = [(self._document_at(active.vector_store, p), d) for p, d in hits]
         
         # Filtrer par seuil de score si fourni
         if score_threshold is not None:
@@ -176,6 +758,173 @@ class VectorStoreManager:
         
         return docs_and_scores
     
+    def similarity_search_with_links(
+        self,
+        query: str,
+        k: int = 5,
+        max_extra: Optional[int] = None,
+        time_budget_ms: Optional[float] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Recherche des documents similaires, étendue aux notes liées à 1 saut
+        
+        Les k meilleurs résultats sont complétés par des chunks des notes liées
+        ou qui pointent vers eux (backlinks). Leur score combine la distance
+        vectorielle et une pénalité de proximité dans le graphe.
+        
+        Args:
+            query: Requête de recherche
+            k: Nombre de résultats directs
+            max_extra: Nombre maximum de chunks ajoutés (défaut : graph_max_extra)
+            time_budget_ms: Budget de latence de l'expansion (défaut : graph_time_budget_ms)
+            
+        Returns:
+            Liste de tuples (Document, score), résultats directs puis chunks liés
+        """
+        if self.vector_store is None:
+            raise ValueError("Base vectorielle non initialisée")
+        
+        return self.similarity_search_with_links_by_vector(
+            self.embeddings.embed_query(query), k=k, max_extra=max_extra, time_budget_ms=time_budget_ms
+        )
+    
+    def similarity_search_with_links_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 5,
+        max_extra: Optional[int] = None,
+        time_budget_ms: Optional[float] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Recherche étendue aux notes liées, à partir d'un vecteur de requête déjà calculé
+        
+        Args:
+            embedding: Vecteur de la requête
+            k: Nombre de résultats directs
+            max_extra: Nombre maximum de chunks ajoutés (défaut : graph_max_extra)
+            time_budget_ms: Budget de latence de l'expansion (défaut : graph_time_budget_ms)
+            
+        Returns:
+            Liste de tuples (Document, score), résultats directs puis chunks liés
+        """
+        active = self._active
+        vector_store, link_graph = active.vector_store, active.link_graph
+        if vector_store is None:
+            raise ValueError("Base vectorielle non initialisée")
+        
+        max_extra = self.graph_max_extra if max_extra is None else max_extra
+        time_budget_ms = self.graph_time_budget_ms if time_budget_ms is None else time_budget_ms
+        
+        query_vector = np.array([embedding], dtype=np.float32)
+        hits = self._search_positions(active, query_vector, k)
+        results = [(self._document_at(vector_store, p), d) for p, d in hits]
+        
+        if link_graph is None or max_extra <= 0 or not hits:
+            return results
+        
+        start = time.perf_counter()
+        
+        # Notes voisines des résultats, avec la plus faible pénalité rencontrée
+        hit_positions = {p for p, _ in hits}
+        hit_files = {link_graph.file_of(p) for p, _ in hits} - {-1}
+        penalties = {}
+        for file_id in hit_files:
+            links, backlinks = link_graph.neighbors(file_id)
+            for neighbor in backlinks.tolist():
+                penalties[neighbor] = min(penalties.get(neighbor, np.inf), self.graph_backlink_penalty)
+            for neighbor in links.tolist():
+                penalties[neighbor] = min(penalties.get(neighbor, np.inf), self.graph_link_penalty)
+        
+        # Chunks candidats, bornés pour tenir le budget de latence
+        max_candidates = max_extra * 16
+        candidates, candidate_penalties = [], []
+        for file_id, penalty in sorted(penalties.items(), key=lambda item: item[1]):
+            for position in link_graph.chunks_of(file_id).tolist():
+                if position not in hit_positions:
+                    candidates.append(position)
+                    candidate_penalties.append(penalty)
+            if len(candidates) >= max_candidates:
+                break
+        candidates = candidates[:max_candidates]
+        
+        if not candidates or (time.perf_counter() - start) * 1000 > time_budget_ms:
+            return results
+        
+        if active.full_vectors is not None:
+            vectors = np.asarray(active.full_vectors[np.array(candidates, dtype=np.int64)], dtype=np.float32)
+        else:
+            try:
+                vectors = vector_store.index.reconstruct_batch(np.array(candidates, dtype=np.int64))
+            except RuntimeError:
+                # Index ne supportant pas la reconstruction des vecteurs
+                return results
+        
+        candidate_distances = np.sum((vectors - query_vector) ** 2, axis=1)
+        scores = candidate_distances * (1.0 + np.array(candidate_penalties, dtype=np.float32))
+        
+        if (time.perf_counter() - start) * 1000 > time_budget_ms:
+            return results
+        
+        for idx in np.argsort(scores)[:max_extra]:
+            results.append((self._document_at(vector_store, candidates[idx]), float(scores[idx])))
+        
+        return results
+    
+    def _search_positions(self, active: IndexSnapshot, query_vector: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """
+        Recherche les k plus proches voisins dans l'index actif
+        
+        Un index quantifié est interrogé pour une liste courte de
+        k * rescore_factor candidats, re-scorés avec les vecteurs float32.
+        
+        Args:
+            active: Index actif
+            query_vector: Vecteur de requête (1, d)
+            k: Nombre de résultats
+            
+        Returns:
+            Liste de tuples (position, distance L2 au carré), du plus proche au plus éloigné
+        """
+        if query_vector.shape[1] != active.vector_store.index.d:
+            raise IndexMismatchError(
+                f"Vecteur de requête de dimension {query_vector.shape[1]}, index de dimension "
+                f"{active.vector_store.index.d} : modèle d'embeddings différent de celui de l'index"
+            )
+        
+        if active.full_vectors is not None:
+            distances, positions = search_with_rescoring(
+                active.vector_store.index, active.full_vectors, query_vector, k, self.rescore_factor
+            )
+            return [(int(p), float(d)) for p, d in zip(positions, distances)]
+        
+        distances, positions = active.vector_store.index.search(query_vector, k)
+        return [(int(p), float(d)) for p, d in zip(positions[0], distances[0]) if p != -1]
+    
+    def _compact_docstore(self, vector_store: FAISS):
+        """Remplace le docstore de Documents par un docstore compact"""
+        if not self.compact_docstore or isinstance(vector_store.docstore, CompactDocstore):
+            return
+        
+        ids = [vector_store.index_to_docstore_id[i] for i in range(vector_store.index.ntotal)]
+        vector_store.docstore = CompactDocstore.from_docstore(vector_store.docstore, ids)
+    
+    @staticmethod
+    def _docstore_report(vector_store: FAISS) -> Dict[str, Any]:
+        """Mémoire du docstore par chunk (parcourt tous les chunks : calculé à la construction ou au chargement)"""
+        ids = [vector_store.index_to_docstore_id[i] for i in range(vector_store.index.ntotal)]
+        return docstore_memory_report(vector_store.docstore, ids)
+    
+    def _memory_report(self, active: IndexSnapshot) -> Dict[str, Any]:
+        """Rapport mémoire du snapshot, calculé une seule fois"""
+        if active.memory_report is None:
+            active.memory_report = self._docstore_report(active.vector_store)
+        return active.memory_report
+    
+    @staticmethod
+    def _document_at(vector_store: FAISS, position: int) -> Document:
+        """Retourne le Document stocké à une position de l'index FAISS"""
+        return vector_store.docstore.search(vector_store.index_to_docstore_id[position])
+    
     def get_stats(self) -> dict:
         """
         Obtient les statistiques de la base vectorielle
@@ -183,26 +932,166 @@ class VectorStoreManager:
         Returns:
             Dictionnaire avec les statistiques
         """
-        if self.vector_store is None:
+        active = self._active
+        if active.vector_store is None:
             return {'status': 'non_initialisée'}
         
+        vector_store = active.vector_store
+        
         return {
             'status': 'initialisée',
-            'num_documents': len(self.vector_store.docstore._dict),
+            'num_documents': vector_store.index.ntotal,
             'embedding_model': getattr(self.embeddings, 'model', 'unknown'),
-            'index_path': str(self.index_path)
+            'index_path': str(self._snapshot_dir(active.version) / "faiss_index"),
+            'version': active.version,
+            'snapshots': self.list_snapshots(),
+            'link_graph': active.link_graph.get_stats() if active.link_graph else {},
+            'dedup': active.dedup or {},
+            'docstore': type(vector_store.docstore).__name__,
+            'index_shared': self.index_shared,
+            'memory_per_chunk': self._memory_report(active),
+            'quantization': {
+                **describe_index(vector_store.index),
+                'index_mb': index_memory_bytes(vector_store.index) / (1024 * 1024),
+                'rescore_factor': self.rescore_factor if active.full_vectors is not None else None
+            }
         }
     
+    def full_precision_vectors(self) -> np.ndarray:
+        """
+        Retourne les vecteurs float32 de l'index actif, dans l'ordre de l'index
+
+        Returns:
+            Tableau (n, d) : fichier annexe d'un index quantifié, sinon reconstruit depuis l'index plat
+        """
+        active = self._active
+        if active.vector_store is None:
+            raise ValueError("Base vectorielle non initialisée")
+
+        if active.full_vectors is not None:
+            return np.asarray(active.full_vectors, dtype=np.float32)
+        index = active.vector_store.index
+        return index.reconstruct_n(0, index.ntotal)
+
+    def vectors_by_ids(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Retourne les vecteurs float32 de chunks de l'index actif
+
+        Args:
+            ids: IDs des chunks (Document.id)
+
+        Returns:
+            Dictionnaire {ID: vecteur} ; les IDs absents de l'index sont ignorés
+        """
+        active = self._active
+        if active.vector_store is None:
+            raise ValueError("Base vectorielle non initialisée")
+
+        if active.id_positions is None:
+            active.id_positions = {doc_id: p for p, doc_id in active.vector_store.index_to_docstore_id.items()}
+        found = [(doc_id, active.id_positions[doc_id]) for doc_id in ids if doc_id in active.id_positions]
+        if not found:
+            return {}
+
+        positions = np.array([p for _, p in found], dtype=np.int64)
+        if active.full_vectors is not None:
+            vectors = np.asarray(active.full_vectors[positions], dtype=np.float32)
+        else:
+            try:
+                vectors = active.vector_store.index.reconstruct_batch(positions)
+            except RuntimeError:
+                # Index ne supportant pas la reconstruction des vecteurs
+                return {}
+        return {doc_id: vectors[i] for i, (doc_id, _) in enumerate(found)}
+
+    def all_documents(self) -> List[Document]:
+        """
+        Retourne les chunks de l'index actif, dans l'ordre de l'index
+
+        Returns:
+            Liste de Documents alignée sur full_precision_vectors()
+        """
+        active = self._active
+        if active.vector_store is None:
+            raise ValueError("Base vectorielle non initialisée")
+
+        vector_store = active.vector_store
+        return [self._document_at(vector_store, i) for i in range(vector_store.index.ntotal)]
+
+    def benchmark_quantization(
+        self,
+        queries: Optional[List[str]] = None,
+        num_queries: int = 50,
+        k: int = 5,
+        modes: Optional[List[str]] = None,
+        pca_dims: Optional[List[int]] = None
+    ) -> List[dict]:
+        """
+        Compare mémoire, latence et recall@k des modes de quantification à l'index plat
+
+        Args:
+            queries: Requêtes de test (par défaut : vecteurs de l'index bruités)
+            num_queries: Nombre de requêtes générées si queries n'est pas fourni
+            k: Nombre de résultats
+            modes: Modes à comparer (défaut : fp16 et int8)
+            pca_dims: Dimensions PCA à comparer (défaut : sans PCA)
+
+        Returns:
+            Une ligne par configuration (voir quantization.benchmark)
+        """
+        full_vectors = self.full_precision_vectors()
+
+        if queries:
+            query_vectors = np.array([self.embeddings.embed_query(query) for query in queries], dtype=np.float32)
+        else:
+            rng = np.random.default_rng(0)
+            sample = rng.choice(len(full_vectors), size=min(num_queries, len(full_vectors)), replace=False)
+            noise = rng.normal(scale=0.1 * float(full_vectors.std()), size=(len(sample), full_vectors.shape[1]))
+            query_vectors = (full_vectors[sample] + noise).astype(np.float32)
+
+        return benchmark(full_vectors, query_vectors, k=k, modes=modes, pca_dims=pca_dims, rescore_factor=self.rescore_factor)
+
+    def memory_bytes(self) -> int:
+        """
+        Estime la mémoire résidente de la base vectorielle chargée
+        
+        Returns:
+            Taille estimée en octets (0 si non chargée)
+        """
+        active = self._active
+        vector_store = active.vector_store
+        if vector_store is None:
+            return 0
+        
+        index = vector_store.index
+        total = index_memory_bytes(index)
+        
+        # Vecteurs pleine précision encore en mémoire (avant sauvegarde ou après ajout)
+        if active.full_vectors is not None and not isinstance(active.full_vectors, np.memmap):
+            total += active.full_vectors.nbytes
+        
+        if isinstance(vector_store.docstore, CompactDocstore):
+            total += vector_store.docstore.memory_bytes()
+        else:
+            total += int(self._memory_report(active).get('documents_bytes_per_chunk', 0) * index.ntotal)
+        
+        return total
+    
+    def unload(self):
+        """Libère la base vectorielle de la mémoire sans supprimer les fichiers"""
+        self._active = IndexSnapshot(None, None, None)
+    
     def clear_vector_store(self):
-        """Efface la base vectorielle"""
-        self.vector_store = None
+        """Efface la base vectorielle et tous ses snapshots"""
+        self.unload()
         
         # Supprimer les fichiers
-        if self.index_path.exists():
-            import shutil
-            shutil.rmtree(self.index_path)
+        if self.snapshots_path.exists():
+            shutil.rmtree(self.snapshots_path)
+        
+        if self.current_pointer_path.exists():
+            self.current_pointer_path.unlink()
         
-        if self.metadata_path.exists():
-            self.metadata_path.unlink()
+        self._remove_legacy_index()
         
         print("🗑️ Base vectorielle effacée")
\ No newline at end of file